@@ -1,6 +1,72 @@
-from django.contrib import admin
-from .models import Category, Tag, Post
+from django.contrib import admin, messages
+from django.utils.html import format_html
+from .models import Category, Tag, Post, Broadcast, SlowQuery, StudentIDUpload
+from .verification import review_uploads
 
 admin.site.register(Category)
 admin.site.register(Tag)
-admin.site.register(Post)
\ No newline at end of file
+admin.site.register(Post)
+admin.site.register(Broadcast)
+
+
+@admin.register(StudentIDUpload)
+class StudentIDUploadAdmin(admin.ModelAdmin):
+    """
+    学生证审核：列表显示缩略图，通过/拒绝为批量操作，与 API 共用 review_uploads。
+    """
+    list_display = ['id', 'user', 'preview', 'status', 'uploaded_at', 'processed_at']
+    list_filter = ['status']
+    list_select_related = ['user']
+    search_fields = ['user__username', 'user__nickname', 'user__student_id']
+    ordering = ['uploaded_at', 'id']
+    list_per_page = 50
+    readonly_fields = ['preview', 'content_hash', 'processed_at']
+    actions = ['approve_selected', 'reject_selected']
+
+    @admin.display(description="缩略图")
+    def preview(self, obj):
+        image = obj.thumbnail or obj.image
+        if not image:
+            return "-"
+        return format_html(
+            '<a href="{}" target="_blank"><img src="{}" style="max-height: 120px"></a>',
+            obj.image.url, image.url,
+        )
+
+    def _review(self, request, queryset, approve):
+        ids = list(queryset.values_list('id', flat=True))
+        result = review_uploads(approve_ids=ids if approve else (), reject_ids=() if approve else ids)
+        self.message_user(
+            request,
+            f"通过 {result['approved']} 条，拒绝 {result['rejected']} 条，新认证用户 {result['verified_users']} 人",
+            messages.SUCCESS,
+        )
+
+    @admin.action(description="通过所选的待审核上传")
+    def approve_selected(self, request, queryset):
+        self._review(request, queryset, approve=True)
+
+    @admin.action(description="拒绝所选的待审核上传")
+    def reject_selected(self, request, queryset):
+        self._review(request, queryset, approve=False)
+
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    """
+    慢查询按总耗时排序，只读；数据由 core.slowlog 写入。
+    """
+    list_display = ['fingerprint_short', 'count', 'total_time', 'max_time', 'last_view', 'last_seen']
+    list_filter = ['last_view']
+    search_fields = ['sql', 'last_view']
+    readonly_fields = [f.name for f in SlowQuery._meta.fields]
+
+    @admin.display(description="指纹")
+    def fingerprint_short(self, obj):
+        return obj.fingerprint[:8]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
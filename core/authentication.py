@@ -0,0 +1,149 @@
+"""
+无状态 JWT 身份。
+
+签发 token 时把权限判断需要的字段（is_verified_user、is_staff）和用户的 token_version
+写入声明，认证时直接据此构造轻量的 TokenPrincipal，不查询 User 表。
+视图真正需要完整用户（序列化、作为外键赋值、ORM 过滤）时，TokenPrincipal 才从数据库加载；
+完整用户不放进缓存，避免把过期的实例交给会 save() 的代码。
+
+认证状态或权限变化时 User.token_version 递增，旧 token 中的版本号不再匹配，
+认证回退到按数据库最新状态加载用户。版本号缓存在 CACHES['default'] 中，
+最多 TOKEN_VERSION_CACHE_TIMEOUT 秒；多 worker 部署需要配置共享缓存（REDIS_URL），
+否则其它 worker 要等缓存过期才能看到撤销。
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils.functional import SimpleLazyObject, empty
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+VERIFIED_CLAIM = 'verified'
+STAFF_CLAIM = 'staff'
+VERSION_CLAIM = 'tv'
+
+
+def version_cache_key(user_id):
+    return f"auth:tv:{user_id}"
+
+
+def version_cache_timeout():
+    return getattr(settings, 'TOKEN_VERSION_CACHE_TIMEOUT', 60)
+
+
+def get_token_version(user_id):
+    key = version_cache_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        User = get_user_model()
+        version = User.objects.filter(pk=user_id).values_list('token_version', flat=True).first()
+        if version is None:
+            return None
+        cache.set(key, version, version_cache_timeout())
+    return version
+
+
+def load_user(user_id):
+    User = get_user_model()
+    try:
+        return User.objects.get(pk=user_id)
+    except User.DoesNotExist:
+        raise AuthenticationFailed("User not found", code="user_not_found")
+
+
+def invalidate_principal(user_id, token_version):
+    """
+    User 的 token_version 变化后调用，同步缓存中的版本号。
+    """
+    cache.set(version_cache_key(user_id), token_version, version_cache_timeout())
+
+
+def invalidate_principals(user_ids):
+    """
+    绕过 User.save 的批量更新（如批量审核认证）之后调用，使这些用户的旧 token 回退到查库。
+    版本号随调用方的事务一起更新，缓存在提交后才删除：提交前删除的话，并发请求会把旧版本号重新读进缓存。
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    get_user_model().objects.filter(pk__in=user_ids).update(token_version=F('token_version') + 1)
+    keys = [version_cache_key(pk) for pk in user_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def _claim(name):
+    """
+    完整用户尚未加载时取 token 声明；加载之后以用户对象为准（请求中可能已被修改，如邮箱认证）。
+    """
+    def get(self):
+        if self._wrapped is empty:
+            return self._claims[name]
+        return getattr(self._wrapped, name)
+    return property(get)
+
+
+class TokenPrincipal(SimpleLazyObject):
+    """
+    由 token 声明构造的用户。权限相关属性直接来自声明；
+    访问其它属性或做 isinstance(User) 判断时才加载完整用户。
+    """
+    def __init__(self, user_id, is_verified_user, is_staff):
+        super().__init__(lambda: load_user(user_id))
+        self.__dict__['_claims'] = {
+            'id': user_id,
+            'is_verified_user': is_verified_user,
+            'is_staff': is_staff,
+            'is_active': True,
+        }
+
+    id = property(lambda self: self._claims['id'])
+    pk = property(lambda self: self._claims['id'])
+    is_verified_user = _claim('is_verified_user')
+    is_staff = _claim('is_staff')
+    is_active = _claim('is_active')
+    is_authenticated = True
+    is_anonymous = False
+
+    def __bool__(self):
+        return True
+
+    def __repr__(self):
+        return f"<TokenPrincipal: {self._claims['id']}>"
+
+
+class PrincipalRefreshToken(RefreshToken):
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token[VERIFIED_CLAIM] = bool(user.is_verified_user)
+        token[STAFF_CLAIM] = bool(user.is_staff)
+        token[VERSION_CLAIM] = user.token_version
+        cache.add(version_cache_key(user.pk), user.token_version, version_cache_timeout())
+        return token
+
+
+class PrincipalTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = PrincipalRefreshToken
+
+
+class PrincipalJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        if VERSION_CLAIM not in validated_token:
+            # 旧格式的 token 没有身份声明
+            return super().get_user(validated_token)
+
+        user_id = self.user_model._meta.pk.to_python(validated_token[api_settings.USER_ID_CLAIM])
+        if get_token_version(user_id) != validated_token[VERSION_CLAIM]:
+            # 声明已过时（认证状态/权限变化或用户已删除），按数据库最新状态认证
+            return super().get_user(validated_token)
+
+        return TokenPrincipal(
+            user_id,
+            is_verified_user=validated_token.get(VERIFIED_CLAIM, False),
+            is_staff=validated_token.get(STAFF_CLAIM, False),
+        )
@@ -0,0 +1,121 @@
+"""
+上传媒体文件的内容去重。
+
+上传流经 HashingUploadHandler 时按块计算 sha256（不额外缓冲文件），
+文件按哈希存到内容寻址的路径（<prefix>/<哈希前两位>/<哈希><扩展名>），并在 StoredObject 中记录引用数。
+相同内容再次上传时只增加引用数，不再写存储；引用数降到 0 时删除文件。
+"""
+import hashlib
+import os
+
+from django.core.files.uploadhandler import FileUploadHandler
+from django.db import transaction
+from django.db.models import F
+
+from .models import StoredObject
+
+CHUNK_SIZE = 64 * 1024
+
+
+class HashingUploadHandler(FileUploadHandler):
+    """
+    放在上传处理器链的最前面，只计算哈希并把数据原样交给后面的处理器；
+    结果写入 request.upload_digests[字段名]。
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.hasher = None
+        if request is not None:
+            request.upload_digests = {}
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.hasher = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.hasher.update(raw_data)
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self.request is not None:
+            self.request.upload_digests[self.field_name] = self.hasher.hexdigest()
+        return None
+
+
+def install_hashing_handler(request):
+    """
+    必须在访问 request.data / request.FILES 之前调用。
+    """
+    request.upload_handlers.insert(0, HashingUploadHandler(request))
+
+
+def file_digest(f):
+    hasher = hashlib.sha256()
+    for chunk in f.chunks(CHUNK_SIZE):
+        hasher.update(chunk)
+    f.seek(0)
+    return hasher.hexdigest()
+
+
+def upload_digest(request, field_name, f):
+    """
+    取上传时计算好的哈希；没有安装 HashingUploadHandler 时退化为重新读一遍文件。
+    """
+    digest = getattr(request, 'upload_digests', {}).get(field_name)
+    return digest or file_digest(f)
+
+
+def content_name(prefix, digest, ext):
+    return f"{prefix}/{digest[:2]}/{digest}{ext.lower()}"
+
+
+def store(storage, prefix, content, digest=None, ext=''):
+    """
+    按内容寻址保存文件，返回 (存储路径, 是否实际写入了存储)。
+    """
+    digest = digest or file_digest(content)
+    name = content_name(prefix, digest, ext)
+    with transaction.atomic():
+        obj, created = StoredObject.objects.select_for_update().get_or_create(
+            sha256=digest, defaults={'name': name, 'size': content.size},
+        )
+        if not created:
+            StoredObject.objects.filter(pk=obj.pk).update(ref_count=F('ref_count') + 1)
+            return obj.name, False
+        # 之前的写入成功但事务回滚时会留下同内容的文件，直接复用
+        if storage.exists(name):
+            return name, False
+        saved = storage.save(name, content)
+        if saved != name:
+            StoredObject.objects.filter(pk=obj.pk).update(name=saved)
+        return saved, True
+
+
+def acquire(name):
+    """
+    为已存在的内容寻址文件增加一个引用；不是内容寻址文件时返回 False。
+    """
+    return StoredObject.objects.filter(name=name).update(ref_count=F('ref_count') + 1) > 0
+
+
+def release(storage, name, delete_untracked=True):
+    """
+    释放一个引用，最后一个引用释放后（事务提交时）删除文件。
+    不在 StoredObject 中的旧文件按 delete_untracked 决定是否直接删除。
+    """
+    with transaction.atomic():
+        obj = StoredObject.objects.select_for_update().filter(name=name).first()
+        if obj is None:
+            if delete_untracked:
+                transaction.on_commit(lambda: storage.delete(name))
+            return
+        if obj.ref_count > 1:
+            StoredObject.objects.filter(pk=obj.pk).update(ref_count=F('ref_count') - 1)
+            return
+        obj.delete()
+        transaction.on_commit(lambda: storage.delete(name))
+
+
+def extension(filename):
+    return os.path.splitext(filename or '')[1].lower()
@@ -0,0 +1,149 @@
+"""
+学生证图片直传对象存储。
+
+客户端先向 presign 接口申请预签名的 POST（或 PUT）地址，直接把图片传到 MediaStorage 所在的桶，
+上传完成后调用 complete 接口；服务端 HEAD/Range GET 检查对象的大小、类型和文件头后
+才创建 StudentIDUpload 记录，并交给后台处理（core.imaging）。
+上传凭证是带签名和有效期的 token，绑定了用户、对象 key 和声明的 Content-Type，不需要额外的表。
+"""
+import uuid
+
+from botocore.exceptions import ClientError
+from django.conf import settings
+from django.core import signing
+from django.db import IntegrityError, transaction
+from rest_framework.exceptions import ValidationError
+from storages.utils import clean_name
+
+from .imaging import schedule_processing
+from .models import StudentIDUpload
+
+TOKEN_SALT = 'core.direct_upload'
+
+DEFAULT_MAX_SIZE = 10 * 1024 * 1024
+DEFAULT_EXPIRES = 600
+
+# Content-Type -> (扩展名, 文件头判断)
+CONTENT_TYPES = {
+    'image/jpeg': ('.jpg', lambda head: head.startswith(b'\xff\xd8\xff')),
+    'image/png': ('.png', lambda head: head.startswith(b'\x89PNG\r\n\x1a\n')),
+    'image/webp': ('.webp', lambda head: head[:4] == b'RIFF' and head[8:12] == b'WEBP'),
+}
+
+
+def max_size():
+    return getattr(settings, 'DIRECT_UPLOAD_MAX_SIZE', DEFAULT_MAX_SIZE)
+
+
+def expires_in():
+    return getattr(settings, 'DIRECT_UPLOAD_EXPIRES', DEFAULT_EXPIRES)
+
+
+def get_storage():
+    return StudentIDUpload._meta.get_field('image').storage
+
+
+def is_available(storage=None):
+    """
+    只有 S3 兼容的存储（生产环境的 MediaStorage）才支持直传，本地文件存储仍走 upload-idcard。
+    """
+    storage = storage or get_storage()
+    return hasattr(storage, 'bucket_name') and hasattr(storage, 'connection')
+
+
+def _object_key(storage, name):
+    # 与 S3Boto3Storage 保存文件时的规则一致（加上 location 前缀）
+    return storage._normalize_name(clean_name(name))
+
+
+def presign(user, content_type, method='post'):
+    """
+    为用户生成一次直传的预签名地址，返回 {'upload_token', 'method', 'url', 'fields'/'headers', 'expires_in'}。
+    """
+    if content_type not in CONTENT_TYPES:
+        raise ValidationError({'content_type': f"Unsupported content type: {content_type}"})
+
+    storage = get_storage()
+    ext = CONTENT_TYPES[content_type][0]
+    name = f"student_ids/direct/{user.pk}/{uuid.uuid4().hex}{ext}"
+    key = _object_key(storage, name)
+    client = storage.connection.meta.client
+    expires = expires_in()
+
+    result = {'method': method, 'expires_in': expires}
+    if method == 'put':
+        # PUT 无法在签名中限制大小，由 complete 时的 HEAD 检查兜底
+        result['url'] = client.generate_presigned_url(
+            'put_object',
+            Params={'Bucket': storage.bucket_name, 'Key': key, 'ContentType': content_type},
+            ExpiresIn=expires,
+        )
+        result['headers'] = {'Content-Type': content_type}
+    else:
+        post = client.generate_presigned_post(
+            storage.bucket_name, key,
+            Fields={'Content-Type': content_type},
+            Conditions=[
+                {'Content-Type': content_type},
+                ['content-length-range', 1, max_size()],
+            ],
+            ExpiresIn=expires,
+        )
+        result['url'] = post['url']
+        result['fields'] = post['fields']
+
+    result['upload_token'] = signing.dumps(
+        {'user': user.pk, 'name': name, 'content_type': content_type}, salt=TOKEN_SALT,
+    )
+    return result
+
+
+def _reject(storage, key, message):
+    storage.connection.meta.client.delete_object(Bucket=storage.bucket_name, Key=key)
+    raise ValidationError({'upload_token': message})
+
+
+def complete(user, upload_token):
+    """
+    校验已直传的对象并创建 StudentIDUpload；同一 token 重复调用返回同一条记录。
+    """
+    try:
+        payload = signing.loads(upload_token, salt=TOKEN_SALT, max_age=expires_in() * 2)
+    except signing.BadSignature:
+        raise ValidationError({'upload_token': "Invalid or expired upload token."})
+    if payload['user'] != user.pk:
+        raise ValidationError({'upload_token': "Upload token does not belong to this user."})
+
+    name = payload['name']
+    # 不能按 image 查：后台处理后 image 会换成压缩图（或去重后复用的对象）
+    existing = StudentIDUpload.objects.filter(user_id=user.pk, source_name=name).first()
+    if existing is not None:
+        return existing, False
+
+    storage = get_storage()
+    key = _object_key(storage, name)
+    client = storage.connection.meta.client
+    try:
+        head = client.head_object(Bucket=storage.bucket_name, Key=key)
+    except ClientError:
+        raise ValidationError({'upload_token': "Uploaded object not found."})
+
+    size = head['ContentLength']
+    if not 0 < size <= max_size():
+        _reject(storage, key, f"Uploaded file must be between 1 byte and {max_size()} bytes.")
+    if head.get('ContentType') != payload['content_type']:
+        _reject(storage, key, "Uploaded file type does not match the requested content type.")
+    first_bytes = client.get_object(
+        Bucket=storage.bucket_name, Key=key, Range='bytes=0-15',
+    )['Body'].read()
+    if not CONTENT_TYPES[payload['content_type']][1](first_bytes):
+        _reject(storage, key, "Uploaded file is not a valid image.")
+
+    try:
+        with transaction.atomic():
+            upload = StudentIDUpload.objects.create(user_id=user.pk, image=name, source_name=name)
+    except IntegrityError:
+        # 并发的另一次 complete 已经创建了记录
+        return StudentIDUpload.objects.get(source_name=name), False
+    schedule_processing(upload.id)
+    return upload, True
@@ -0,0 +1,125 @@
+"""
+根据序列化器声明的字段自动预加载关联数据。
+
+- 嵌套的单个 ModelSerializer（外键/一对一）       -> select_related，并递归规划其字段
+- many=True 的嵌套序列化器（多对多/反向外键）     -> Prefetch，子查询同样按子序列化器规划
+- UserSummaryField（单个）                         -> select_related，并用 only() 只取摘要字段
+- UserSummaryField(many=True)                      -> Prefetch，用户只取摘要字段
+- SerializerMethodField 无法推断，由序列化器 Meta.eager_load 补充：
+      eager_load = {'select': ['author'], 'prefetch': ['target']}
+
+规划结果按序列化器类缓存。
+"""
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+from .serializers import UserSummaryField, UserSummarySerializer
+
+SUMMARY_FIELDS = UserSummarySerializer.Meta.fields
+
+_plans = {}
+
+
+class Plan:
+    def __init__(self):
+        self.select = []
+        self.prefetch = []
+        # select_related 路径 -> 需要的字段（None 表示全部字段）
+        self.only = {}
+
+    def apply(self, queryset):
+        if self.select:
+            queryset = queryset.select_related(*self.select)
+        if self.prefetch:
+            queryset = queryset.prefetch_related(*self.prefetch)
+        if any(fields is not None for fields in self.only.values()):
+            queryset = queryset.only(*self._only_fields(queryset.model))
+        return queryset
+
+    def _only_fields(self, model):
+        # 主模型和非摘要关联取全部字段，只有用户摘要关联被裁剪
+        names = [f.attname for f in model._meta.concrete_fields]
+        for path, fields in self.only.items():
+            if fields is None:
+                related = _related_model(model, path)
+                fields = [f.attname for f in related._meta.concrete_fields]
+            names.extend(f"{path}__{name}" for name in fields)
+        return names
+
+
+def _related_model(model, path):
+    for name in path.split('__'):
+        model = model._meta.get_field(name).related_model
+    return model
+
+
+def _relation(model, source):
+    if model is None or '.' in source or source == '*':
+        return None
+    try:
+        field = model._meta.get_field(source)
+    except Exception:
+        return None
+    return field if field.is_relation else None
+
+
+def _plan_fields(plan, serializer, model, prefix):
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        relation = _relation(model, field.source)
+        if relation is None:
+            continue
+        path = f"{prefix}{field.source}"
+        single = relation.many_to_one or relation.one_to_one
+
+        if isinstance(field, UserSummaryField):
+            if field.many:
+                plan.prefetch.append(Prefetch(
+                    path, queryset=relation.related_model._default_manager.only(*SUMMARY_FIELDS),
+                ))
+            elif single:
+                plan.select.append(path)
+                plan.only[path] = list(SUMMARY_FIELDS)
+        elif isinstance(field, serializers.ListSerializer) and not single:
+            child = field.child
+            queryset = relation.related_model._default_manager.all()
+            if isinstance(child, serializers.ModelSerializer):
+                queryset = plan_for(type(child)).apply(queryset)
+            plan.prefetch.append(Prefetch(path, queryset=queryset))
+        elif isinstance(field, serializers.ModelSerializer) and single:
+            plan.select.append(path)
+            plan.only[path] = None
+            _plan_fields(plan, field, relation.related_model, f"{path}__")
+
+    extra = getattr(getattr(serializer, 'Meta', None), 'eager_load', {})
+    for path in extra.get('select', []):
+        plan.select.append(f"{prefix}{path}")
+        plan.only.setdefault(f"{prefix}{path}", None)
+    for lookup in extra.get('prefetch', []):
+        plan.prefetch.append(f"{prefix}{lookup}" if isinstance(lookup, str) else lookup)
+
+
+def plan_for(serializer_class):
+    plan = _plans.get(serializer_class)
+    if plan is None:
+        plan = Plan()
+        _plan_fields(plan, serializer_class(), serializer_class.Meta.model, '')
+        _plans[serializer_class] = plan
+    return plan
+
+
+def eager_load(queryset, serializer_class):
+    if getattr(getattr(serializer_class, 'Meta', None), 'model', None) is not queryset.model:
+        return queryset
+    return plan_for(serializer_class).apply(queryset)
+
+
+class EagerLoadingMixin:
+    """
+    视图集混入：列表和详情的 queryset 按 get_serializer_class() 的字段自动预加载，
+    列表接口的查询数不随分页大小增长。
+    """
+
+    def filter_queryset(self, queryset):
+        return eager_load(super().filter_queryset(queryset), self.get_serializer_class())
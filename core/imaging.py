@@ -0,0 +1,153 @@
+"""
+学生证图片的后台处理。
+
+上传接口只负责把原图落盘并立即返回，事务提交后把处理任务交给线程池：
+按 EXIF 方向摆正、去掉 EXIF（包括可能的定位信息）、缩到不超过 STUDENT_ID_MAX_DIMENSION、
+重新压缩为 JPEG，并生成供审核列表使用的缩略图；处理完成后释放原图。
+原图和处理结果都按内容寻址保存（core.dedup），重复上传同一张照片时直接复用已处理的结果。
+"""
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from . import dedup
+from .models import StudentIDUpload
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_DIMENSION = 2048
+DEFAULT_THUMBNAIL_SIZE = 400
+DEFAULT_JPEG_QUALITY = 85
+
+
+def _encode_jpeg(image, quality):
+    buf = io.BytesIO()
+    # 不传 exif 参数，写出的文件不带任何 EXIF
+    image.save(buf, 'JPEG', quality=quality, optimize=True, progressive=True)
+    return buf.getvalue()
+
+
+def process_image(fileobj):
+    """
+    纯函数：读入原图，返回 (处理后的 JPEG 字节, 缩略图 JPEG 字节)。
+    """
+    max_dimension = getattr(settings, 'STUDENT_ID_MAX_DIMENSION', DEFAULT_MAX_DIMENSION)
+    thumbnail_size = getattr(settings, 'STUDENT_ID_THUMBNAIL_SIZE', DEFAULT_THUMBNAIL_SIZE)
+    quality = getattr(settings, 'STUDENT_ID_JPEG_QUALITY', DEFAULT_JPEG_QUALITY)
+
+    with Image.open(fileobj) as original:
+        # JPEG 解码时直接按目标尺寸降采样，大图可省去大部分解码开销
+        original.draft('RGB', (max_dimension, max_dimension))
+        image = ImageOps.exif_transpose(original)
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+        main = _encode_jpeg(image, quality)
+
+        thumb = image.copy()
+        thumb.thumbnail((thumbnail_size, thumbnail_size), Image.Resampling.BILINEAR)
+        return main, _encode_jpeg(thumb, quality)
+
+
+def process_upload(upload_id):
+    """
+    处理一条上传记录；在线程池中运行，也可直接调用。
+    """
+    upload = StudentIDUpload.objects.filter(pk=upload_id).first()
+    if upload is None or upload.processed_at is not None:
+        return
+
+    original_name = upload.image.name
+    storage = upload.image.storage
+    with storage.open(original_name, 'rb') as f:
+        main, thumb = process_image(f)
+
+    image_name, _ = dedup.store(storage, 'student_ids', ContentFile(main), ext='.jpg')
+    thumbnail_name, _ = dedup.store(storage, 'student_ids/thumbs', ContentFile(thumb), ext='.jpg')
+    # 只更新处理产生的字段，不覆盖审核期间可能被修改的状态
+    StudentIDUpload.objects.filter(pk=upload_id).update(
+        image=image_name,
+        thumbnail=thumbnail_name,
+        processed_at=timezone.now(),
+    )
+    if image_name != original_name:
+        dedup.release(storage, original_name)
+
+
+def create_upload(user, image_file, digest):
+    """
+    保存上传的学生证图片并创建记录。
+    同一内容已经处理过时直接引用已有的压缩图和缩略图，不写存储也不再处理。
+    """
+    field = StudentIDUpload._meta.get_field('image')
+    previous = (
+        StudentIDUpload.objects
+        .filter(content_hash=digest, processed_at__isnull=False)
+        .exclude(thumbnail='')
+        .order_by('-processed_at')
+        .first()
+    )
+    if previous is not None and dedup.acquire(previous.image.name):
+        if not dedup.acquire(previous.thumbnail.name):
+            dedup.release(field.storage, previous.image.name)
+        else:
+            return StudentIDUpload.objects.create(
+                user=user,
+                image=previous.image.name,
+                thumbnail=previous.thumbnail.name,
+                processed_at=timezone.now(),
+                content_hash=digest,
+            )
+
+    name, _ = dedup.store(
+        field.storage, 'student_ids', image_file, digest, dedup.extension(image_file.name),
+    )
+    upload = StudentIDUpload.objects.create(user=user, image=name, content_hash=digest)
+    schedule_processing(upload.id)
+    return upload
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'IMAGE_PROCESSING_WORKERS', 2),
+                    thread_name_prefix='image-processing',
+                )
+    return _executor
+
+
+def _run(upload_id):
+    close_old_connections()
+    try:
+        process_upload(upload_id)
+    except Exception as e:
+        logger.error(f"Processing StudentIDUpload {upload_id} failed: {str(e)}")
+    finally:
+        close_old_connections()
+
+
+def schedule_processing(upload_id):
+    """
+    在当前事务提交后处理上传的图片；IMAGE_PROCESSING_EAGER 为 True 时在当前线程处理。
+    """
+    def submit():
+        if getattr(settings, 'IMAGE_PROCESSING_EAGER', False):
+            process_upload(upload_id)
+        else:
+            _get_executor().submit(_run, upload_id)
+
+    transaction.on_commit(submit)
@@ -0,0 +1,69 @@
+"""
+后台发信队列。
+
+SMTP 往返可能长达数秒，请求线程只负责入队，由后台线程调用 send_mail 发送。
+EMAIL_QUEUE_EAGER 为 True 时在当前线程直接发送（便于调试）；
+开发/测试环境配合 console、filebased 或 locmem 邮件后端使用。
+"""
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.core.mail import send_mail
+
+logger = logging.getLogger(__name__)
+
+
+class MailQueue:
+    def __init__(self, workers=1, maxsize=1000):
+        self.workers = workers
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"mail-queue-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self):
+        while True:
+            kwargs = self._queue.get()
+            try:
+                send_mail(fail_silently=False, **kwargs)
+            except Exception as e:
+                logger.error(f"Sending mail to {kwargs.get('recipient_list')} failed: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def enqueue(self, subject, message, recipient_list, from_email=None):
+        """
+        入队一封邮件；队列已满时抛出 queue.Full，由调用方决定如何提示用户。
+        """
+        kwargs = {
+            'subject': subject,
+            'message': message,
+            'from_email': from_email,
+            'recipient_list': recipient_list,
+        }
+        if getattr(settings, 'EMAIL_QUEUE_EAGER', False):
+            send_mail(fail_silently=False, **kwargs)
+            return
+        self._ensure_started()
+        self._queue.put_nowait(kwargs)
+
+    def join(self):
+        """
+        等待已入队的邮件全部处理完。
+        """
+        self._queue.join()
+
+
+mail_queue = MailQueue()
@@ -0,0 +1,208 @@
+import json
+import random
+import subprocess
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.authentication import PrincipalRefreshToken
+from core.metrics import QueryStats
+from core.models import Action, Comment, Conversation, Notification, Post, PrivateMessage, User
+
+from .bench_wx_login import percentile
+
+DEFAULT_MIX = 'feed=30,detail=25,comments=25,like=10,messages=10'
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in SCENARIOS:
+            raise CommandError(f"Unknown scenario {name!r}, choose from {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class Workload:
+    """
+    从现有数据中抽样请求目标：已发布的帖子、以及参与了会话的用户（每个用户一个 JWT 客户端）。
+    """
+
+    def __init__(self, rng, n_users):
+        self.rng = rng
+        self.post_ids = list(Post.objects.filter(status='published').values_list('pk', flat=True))
+        through = Conversation.participants.through
+        pairs = list(through.objects.order_by('?').values_list('user_id', 'conversation_id')[:n_users])
+        if not self.post_ids or not pairs:
+            raise CommandError("No data to replay, run generate_synthetic_data first.")
+        self.sessions = [(self._client(user_id), conversation_id) for user_id, conversation_id in pairs]
+
+    def _client(self, user_id):
+        client = APIClient()
+        token = PrincipalRefreshToken.for_user(User.objects.get(pk=user_id)).access_token
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return client
+
+    def session(self):
+        return self.rng.choice(self.sessions)
+
+    def post(self):
+        return self.rng.choice(self.post_ids)
+
+
+def feed(workload):
+    client, _ = workload.session()
+    return client.get(reverse('api_v1:post-list'), {'status': 'published'})
+
+
+def detail(workload):
+    client, _ = workload.session()
+    return client.get(reverse('api_v1:post-detail', kwargs={'pk': workload.post()}))
+
+
+def comments(workload):
+    client, _ = workload.session()
+    return client.get(reverse('api_v1:post-comments-list', kwargs={'post_pk': workload.post()}))
+
+
+def like(workload):
+    client, _ = workload.session()
+    return client.post(reverse('api_v1:post-like', kwargs={'pk': workload.post()}))
+
+
+def messages(workload):
+    client, conversation_id = workload.session()
+    return client.get(reverse('api_v1:conversation-messages-list', kwargs={'conversation_pk': conversation_id}))
+
+
+SCENARIOS = {
+    'feed': feed,
+    'detail': detail,
+    'comments': comments,
+    'like': like,
+    'messages': messages,
+}
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    """
+    按接近真实的比例回放信息流、帖子详情、评论、点赞和私信请求，统计各场景的延迟和每请求 SQL 数：
+    python manage.py bench_api --requests 2000 --label after-index
+
+    请求在进程内经过完整的中间件和 JWT 认证，数据先用 generate_synthetic_data 生成。
+    每次结果追加一行 JSON 到 --output（默认 BENCHMARK_RESULTS_PATH），并与上一次结果对比。
+    点赞请求会切换点赞状态，会修改数据。
+    """
+    help = "Replay a realistic API request mix and record p50/p99 latency and queries per request."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--warmup', type=int, default=50, help="预热请求数，不计入结果")
+        parser.add_argument('--mix', default=DEFAULT_MIX, help="场景权重，例如 feed=30,detail=25")
+        parser.add_argument('--users', type=int, default=50, help="参与回放的用户数")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--label', default='', help="写入结果的备注，便于对比")
+        parser.add_argument('--output', default=None, help="结果文件（JSON Lines）")
+
+    def handle(self, *args, **options):
+        mix = parse_mix(options['mix'])
+        rng = random.Random(options['seed'])
+        output = Path(options['output'] or settings.BENCHMARK_RESULTS_PATH)
+
+        # 回放请求都来自同一进程，关闭限流，允许测试客户端的 Host
+        overrides = override_settings(
+            ALLOWED_HOSTS=['*'],
+            REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}},
+        )
+        with overrides:
+            workload = Workload(rng, options['users'])
+            names = list(mix)
+            weights = list(mix.values())
+            for _ in range(options['warmup']):
+                SCENARIOS[rng.choices(names, weights)[0]](workload)
+
+            samples = defaultdict(list)
+            for _ in range(options['requests']):
+                name = rng.choices(names, weights)[0]
+                stats = QueryStats()
+                started = time.perf_counter()
+                with connection.execute_wrapper(stats):
+                    response = SCENARIOS[name](workload)
+                samples[name].append((time.perf_counter() - started, stats.count, response.status_code))
+
+        result = {
+            'timestamp': timezone.now().isoformat(),
+            'label': options['label'],
+            'revision': git_revision(),
+            'database': connection.vendor,
+            'dataset': self._dataset(),
+            'requests': options['requests'],
+            'mix': mix,
+            'scenarios': {name: self._summarize(rows) for name, rows in sorted(samples.items())},
+        }
+        previous = self._previous(output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with output.open('a') as f:
+            f.write(json.dumps(result) + '\n')
+        self._report(result, previous)
+        self.stdout.write(f"Results appended to {output}")
+
+    def _dataset(self):
+        return {
+            model._meta.model_name: model.objects.count()
+            for model in (User, Post, Comment, Action, Conversation, PrivateMessage, Notification)
+        }
+
+    def _summarize(self, rows):
+        latencies = [elapsed for elapsed, _, _ in rows]
+        queries = [count for _, count, _ in rows]
+        return {
+            'count': len(rows),
+            'errors': sum(1 for _, _, status in rows if status >= 400),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            'queries_mean': round(sum(queries) / len(queries), 2),
+            'queries_max': max(queries),
+        }
+
+    def _previous(self, output):
+        if not output.exists():
+            return None
+        lines = output.read_text().splitlines()
+        return json.loads(lines[-1]) if lines else None
+
+    def _report(self, result, previous):
+        before = previous['scenarios'] if previous else {}
+        if previous:
+            self.stdout.write(f"Compared with {previous['timestamp']} {previous['label']} ({previous['revision']})")
+        for name, row in result['scenarios'].items():
+            line = (
+                f"{name:>9}: n {row['count']:5d}  p50 {row['p50_ms']:8.1f} ms  p99 {row['p99_ms']:8.1f} ms  "
+                f"queries {row['queries_mean']:5.1f} (max {row['queries_max']})  errors {row['errors']}"
+            )
+            if name in before:
+                old = before[name]
+                line += (
+                    f"  | p50 {row['p50_ms'] - old['p50_ms']:+.1f} ms  p99 {row['p99_ms'] - old['p99_ms']:+.1f} ms  "
+                    f"queries {row['queries_mean'] - old['queries_mean']:+.1f}"
+                )
+            self.stdout.write(line)
@@ -0,0 +1,81 @@
+import copy
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.utils import load_backend
+
+from .bench_wx_login import percentile
+
+
+class Command(BaseCommand):
+    """
+    模拟请求生命周期，比较三种连接方式下每个请求的数据库开销：
+    python manage.py bench_db_connections --requests 500 --queries 3
+
+    - per-request：CONN_MAX_AGE=0、不用连接池，每个请求新建并关闭连接（原来的配置）
+    - persistent：CONN_MAX_AGE + 健康检查，连接跨请求复用
+    - pool：psycopg 3 连接池（仅 PostgreSQL）
+
+    每个"请求"执行 --queries 条 SELECT 1，前后与 close_old_connections 一样调用
+    close_if_unusable_or_obsolete 决定连接是否关闭。各方式使用 --database 的连接参数，
+    在单独的连接对象上运行，不影响进程中已有的连接。
+    """
+    help = "Measure per-request database connection overhead with and without persistent connections/pooling."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=300)
+        parser.add_argument('--queries', type=int, default=1, help="每个请求执行的查询数")
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        base = connections.settings[options['database']]
+        modes = {
+            'per-request': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False, 'pool': None},
+            'persistent': {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True, 'pool': None},
+        }
+        if connections[options['database']].vendor == 'postgresql':
+            pool = base['OPTIONS'].get('pool') or {'min_size': 1, 'max_size': 4}
+            modes['pool'] = {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': True, 'pool': pool}
+        else:
+            self.stdout.write("Connection pooling needs PostgreSQL, skipping the pool mode.")
+
+        results = {}
+        for name, mode in modes.items():
+            results[name] = self._run(name, base, mode, options['requests'], options['queries'])
+
+        baseline = percentile(results['per-request'], 50)
+        for name, latencies in results.items():
+            p50 = percentile(latencies, 50)
+            self.stdout.write(
+                f"{name:>11}: p50 {p50 * 1000:7.3f} ms  p99 {percentile(latencies, 99) * 1000:7.3f} ms  "
+                f"saved per request {(baseline - p50) * 1000:7.3f} ms"
+            )
+
+    def _run(self, name, base, mode, requests, queries):
+        alias = f'bench_{name}'
+        settings_dict = copy.deepcopy(base)
+        settings_dict['CONN_MAX_AGE'] = mode['CONN_MAX_AGE']
+        settings_dict['CONN_HEALTH_CHECKS'] = mode['CONN_HEALTH_CHECKS']
+        settings_dict['OPTIONS'].pop('pool', None)
+        if mode['pool']:
+            settings_dict['OPTIONS']['pool'] = mode['pool']
+        connection = load_backend(settings_dict['ENGINE']).DatabaseWrapper(settings_dict, alias)
+
+        def one_request():
+            started = time.perf_counter()
+            connection.close_if_unusable_or_obsolete()  # request_started
+            with connection.cursor() as cursor:
+                for _ in range(queries):
+                    cursor.execute('SELECT 1')
+                    cursor.fetchone()
+            connection.close_if_unusable_or_obsolete()  # request_finished
+            return time.perf_counter() - started
+
+        try:
+            one_request()  # 预热：连接池打开、首个持久连接建立
+            return [one_request() for _ in range(requests)]
+        finally:
+            connection.close()
+            if mode['pool']:
+                connection.close_pool()
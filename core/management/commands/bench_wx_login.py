@@ -0,0 +1,111 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import AsyncRequestFactory, RequestFactory, override_settings
+
+from core import wechat
+from core.models import User
+from core.views import AsyncWXLoginView, WXLoginView
+from core.wechat_stub import StubServer
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    """
+    在本地微信替身服务下比较同步与异步登录视图的吞吐：
+    python manage.py bench_wx_login --requests 400 --latency 0.1 --sync-workers 4
+
+    同步视图用固定大小的线程池模拟 WSGI worker 的线程数，异步视图在单个事件循环上并发。
+    比较的是老用户登录（先预热创建用户），结束后删除压测用户。
+    """
+    help = "Benchmark WXLoginView against AsyncWXLoginView using the WeChat stub server."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--latency', type=float, default=0.1, help="替身服务的响应延迟（秒）")
+        parser.add_argument('--sync-workers', type=int, default=4, help="同步视图的并发线程数")
+        parser.add_argument('--concurrency', type=int, default=100, help="异步视图的最大并发请求数")
+
+    def handle(self, *args, **options):
+        server = StubServer(latency=options['latency'])
+        server.start_in_thread()
+        original_base = settings.WECHAT_API_BASE
+        settings.WECHAT_API_BASE = server.base_url
+        wechat.reset_client()
+
+        factory = RequestFactory()
+        # 异步视图按 ASGI 部署压测：ASGIRequest 下复用事件循环上的连接池
+        async_factory = AsyncRequestFactory()
+        codes = [f"bench-{i}" for i in range(options['requests'])]
+
+        def make_request(code, path, factory=factory):
+            return factory.post(path, json.dumps({'code': code}), content_type='application/json')
+
+        sync_view = WXLoginView.as_view()
+        async_view = AsyncWXLoginView.as_view()
+
+        def call_sync(code):
+            started = time.perf_counter()
+            response = sync_view(make_request(code, '/api/v1/wx/login/'))
+            elapsed = time.perf_counter() - started
+            connection.close()
+            return response.status_code, elapsed
+
+        async def call_async(code, semaphore):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await async_view(make_request(code, '/api/v1/wx/login-async/', async_factory))
+                return response.status_code, time.perf_counter() - started
+
+        async def run_async():
+            semaphore = asyncio.Semaphore(options['concurrency'])
+            return await asyncio.gather(*(call_async(code, semaphore) for code in codes))
+
+        # 压测请求都来自同一 IP，关闭登录限流
+        no_throttle = override_settings(
+            REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}}
+        )
+        no_throttle.enable()
+        try:
+            # 预热：创建压测用户，之后两轮都是老用户登录
+            for code in codes:
+                sync_view(make_request(code, '/api/v1/wx/login/'))
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['sync_workers']) as pool:
+                sync_results = list(pool.map(call_sync, codes))
+            sync_wall = time.perf_counter() - started
+
+            started = time.perf_counter()
+            async_results = asyncio.run(run_async())
+            async_wall = time.perf_counter() - started
+
+            self._report('sync', sync_results, sync_wall)
+            self._report('async', async_results, async_wall)
+        finally:
+            no_throttle.disable()
+            User.objects.filter(openid__startswith='stub_', username__startswith='stub_').delete()
+            settings.WECHAT_API_BASE = original_base
+            wechat.reset_client()
+            server.shutdown()
+            server.server_close()
+
+    def _report(self, label, results, wall):
+        latencies = [elapsed for _, elapsed in results]
+        errors = sum(1 for status, _ in results if status != 200)
+        self.stdout.write(
+            f"{label:>5}: {len(results) / wall:8.1f} req/s  "
+            f"p50 {percentile(latencies, 50) * 1000:7.1f} ms  "
+            f"p99 {percentile(latencies, 99) * 1000:7.1f} ms  "
+            f"errors {errors}"
+        )
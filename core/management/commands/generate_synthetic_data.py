@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.synthetic import DEFAULT_VOLUMES, Generator
+
+
+class Command(BaseCommand):
+    """
+    用 bulk_create 批量生成压测数据，例如：
+    python manage.py generate_synthetic_data --posts 100000 --actions 10000000
+
+    每类数据的数量都可以单独指定，未指定的取 core.synthetic.DEFAULT_VOLUMES。
+    数据追加到当前库中，每批单独提交，可以重复执行；请只在压测库上使用。
+    """
+    help = "Generate a large synthetic dataset with bulk_create for benchmarking."
+
+    def add_arguments(self, parser):
+        for name, default in DEFAULT_VOLUMES.items():
+            parser.add_argument(f'--{name}', type=int, default=default)
+        parser.add_argument('--batch-size', type=int, default=5000, help="每批 bulk_create 的行数")
+        parser.add_argument('--seed', type=int, default=0, help="随机种子，相同种子生成相同分布")
+        parser.add_argument('--days', type=int, default=365, help="创建时间分布在最近多少天内")
+
+    def handle(self, *args, **options):
+        generator = Generator(
+            {name: options[name] for name in DEFAULT_VOLUMES},
+            batch_size=options['batch_size'], seed=options['seed'], days=options['days'],
+            log=self.stdout.write,
+        )
+        started = time.perf_counter()
+        generator.run()
+        self.stdout.write(self.style.SUCCESS(f"Done in {time.perf_counter() - started:.1f}s"))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from core.retention import prune
+
+
+class Command(BaseCommand):
+    """
+    按 settings.DATA_RETENTION 清理过期的通知、私信和邮箱验证码，可通过 cron 定期执行：
+    python manage.py prune_expired_data --chunk-size 5000 --pause 0.05
+    """
+    help = "Delete notifications, private messages and email codes past their retention period."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help="每个事务覆盖的主键区间宽度",
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0,
+            help="两个区间之间暂停的秒数，降低对线上库的压力",
+        )
+
+    def handle(self, *args, **options):
+        stats = prune(chunk_size=options['chunk_size'], pause=options['pause'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Pruned {stats['notifications']} notifications, "
+            f"{stats['messages']} private messages and "
+            f"{stats['email_codes']} email codes in {stats['elapsed']:.2f}s."
+        ))
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from core.models import Notification, NotificationCounter
+
+
+class Command(BaseCommand):
+    """
+    用 Notification 表的真实未读数校正 NotificationCounter。
+    建议通过 cron 定期执行，例如：python manage.py reconcile_unread_counts
+    """
+    help = "Reconcile per-user unread notification counters with the Notification table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help="每批写回的计数行数量",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        actual = dict(
+            Notification.objects.filter(is_read=False)
+            .order_by()
+            .values_list('recipient_id')
+            .annotate(n=Count('id'))
+        )
+
+        to_update = []
+        fixed = 0
+        for counter in NotificationCounter.objects.all().iterator(chunk_size=batch_size):
+            expected = actual.pop(counter.user_id, 0)
+            if counter.unread_count != expected:
+                counter.unread_count = expected
+                to_update.append(counter)
+            if len(to_update) >= batch_size:
+                NotificationCounter.objects.bulk_update(to_update, ['unread_count'])
+                fixed += len(to_update)
+                to_update = []
+        if to_update:
+            NotificationCounter.objects.bulk_update(to_update, ['unread_count'])
+            fixed += len(to_update)
+
+        # 有未读通知但还没有计数行的用户
+        missing = [
+            NotificationCounter(user_id=user_id, unread_count=n)
+            for user_id, n in actual.items()
+        ]
+        NotificationCounter.objects.bulk_create(
+            missing, batch_size=batch_size, ignore_conflicts=True
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Reconciled unread counters: {fixed} fixed, {len(missing)} created."
+        ))
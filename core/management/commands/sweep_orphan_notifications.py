@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from core.notifications import sweep_orphans
+
+
+class Command(BaseCommand):
+    """
+    批量清理关联帖子/评论已被删除的通知，可通过 cron 定期执行：
+    python manage.py sweep_orphan_notifications --delete
+    """
+    help = "Mark (or delete) notifications whose target object no longer exists."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--delete', action='store_true',
+            help="直接删除失效通知，默认仅标记为已读",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help="每个事务处理的通知数量",
+        )
+
+    def handle(self, *args, **options):
+        stats = sweep_orphans(delete=options['delete'], batch_size=options['batch_size'])
+        verb = "deleted" if options['delete'] else "marked read"
+        rate = stats['matched'] / stats['elapsed'] if stats['elapsed'] else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['matched']} orphan notifications {verb} in {stats['batches']} batches, "
+            f"{stats['elapsed']:.2f}s ({rate:.0f} rows/s)."
+        ))
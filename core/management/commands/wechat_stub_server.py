@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from core.wechat_stub import StubServer
+
+
+class Command(BaseCommand):
+    """
+    启动本地 jscode2session 替身服务，配合 WECHAT_API_BASE 离线压测登录：
+    python manage.py wechat_stub_server --port 8765 --latency 0.08
+    WECHAT_API_BASE=http://127.0.0.1:8765 python manage.py runserver
+    """
+    help = "Run a local stand-in for the WeChat jscode2session API."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency', type=float, default=0.0, help="每个请求的固定延迟（秒）")
+        parser.add_argument('--error-rate', type=float, default=0.0, help="返回 503 的概率")
+        parser.add_argument('--verbose', action='store_true', help="打印每个请求")
+
+    def handle(self, *args, **options):
+        server = StubServer(
+            host=options['host'], port=options['port'],
+            latency=options['latency'], error_rate=options['error_rate'],
+            verbose=options['verbose'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"WeChat stub listening on {server.base_url}"))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
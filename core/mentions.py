@@ -0,0 +1,175 @@
+"""
+@昵称 提及解析。
+
+昵称可以包含中文和空格，正文中 @ 之后没有明确的分隔符，因此用一棵昵称前缀树
+在每个 @ 处做最长匹配；匹配到的昵称再用一次批量查询解析成用户。
+前缀树在进程内惰性构建，User 修改昵称时增量更新，并按 MENTION_INDEX_TTL 定期整体重建，
+以兼顾其它进程中的改名和 bulk_create 创建的用户。
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from .notifications import notify
+
+# 前缀树节点中表示「到此为一个完整昵称」的键，值为持有该昵称的用户数
+_END = ''
+# 与 User.nickname 的 max_length 一致
+MAX_NICKNAME_LENGTH = 30
+# 单条内容最多解析的提及数
+MAX_MENTIONS = 20
+DEFAULT_INDEX_TTL = 600
+
+
+def _is_word(ch):
+    return ch.isascii() and ch.isalnum()
+
+
+class NicknameTrie:
+    def __init__(self):
+        self.root = {}
+
+    def add(self, nickname):
+        if not nickname:
+            return
+        node = self.root
+        for ch in nickname:
+            node = node.setdefault(ch, {})
+        node[_END] = node.get(_END, 0) + 1
+
+    def discard(self, nickname):
+        if not nickname:
+            return
+        path = [self.root]
+        for ch in nickname:
+            node = path[-1].get(ch)
+            if node is None:
+                return
+            path.append(node)
+        node = path[-1]
+        if _END not in node:
+            return
+        node[_END] -= 1
+        if node[_END] > 0:
+            return
+        del node[_END]
+        # 自底向上剪掉空节点
+        for ch, parent in zip(reversed(nickname), reversed(path[:-1])):
+            if parent[ch]:
+                break
+            del parent[ch]
+
+    def longest_match(self, text, start):
+        """
+        从 start 开始的最长昵称。以 ASCII 字母数字结尾的昵称后面不能紧跟 ASCII 字母数字，
+        否则 @alicebob 会被解析成 alice；中文正文通常不加空格，紧跟中文仍视为结束。
+        """
+        node = self.root
+        end = None
+        for i in range(start, min(len(text), start + MAX_NICKNAME_LENGTH)):
+            node = node.get(text[i])
+            if node is None:
+                break
+            if _END in node and not (_is_word(text[i]) and i + 1 < len(text) and _is_word(text[i + 1])):
+                end = i + 1
+        return text[start:end] if end else None
+
+    def find_mentions(self, text):
+        """
+        返回正文中按出现顺序去重后的被提及昵称。
+        紧跟在字母数字之后的 @（如邮箱地址）不视为提及。
+        """
+        found = []
+        i = text.find('@')
+        while i != -1 and len(found) < MAX_MENTIONS:
+            name = None
+            if not (i > 0 and _is_word(text[i - 1])):
+                name = self.longest_match(text, i + 1)
+            if name:
+                if name not in found:
+                    found.append(name)
+                i = text.find('@', i + 1 + len(name))
+            else:
+                i = text.find('@', i + 1)
+        return found
+
+
+class MentionIndex:
+    def __init__(self, ttl=None):
+        self._ttl = ttl
+        self._trie = None
+        self._built_at = 0
+        self._lock = threading.Lock()
+
+    @property
+    def ttl(self):
+        if self._ttl is not None:
+            return self._ttl
+        return getattr(settings, 'MENTION_INDEX_TTL', DEFAULT_INDEX_TTL)
+
+    def rebuild(self):
+        User = get_user_model()
+        trie = NicknameTrie()
+        nicknames = (
+            User.objects.filter(is_active=True).exclude(nickname='')
+            .values_list('nickname', flat=True).iterator(chunk_size=5000)
+        )
+        for nickname in nicknames:
+            trie.add(nickname)
+        with self._lock:
+            self._trie = trie
+            self._built_at = time.monotonic()
+
+    def _get_trie(self):
+        if self._trie is None or time.monotonic() - self._built_at > self.ttl:
+            self.rebuild()
+        return self._trie
+
+    def rename(self, old, new):
+        """
+        User 昵称变更时调用；索引尚未构建时无需处理。
+        """
+        if self._trie is None or old == new:
+            return
+        with self._lock:
+            self._trie.discard(old)
+            self._trie.add(new)
+
+    def clear(self):
+        with self._lock:
+            self._trie = None
+
+    def extract(self, text):
+        if not text or '@' not in text:
+            return []
+        return self._get_trie().find_mentions(text)
+
+    def resolve(self, text):
+        """
+        返回正文中提及的用户，所有昵称通过一次查询解析；
+        重名的昵称无法确定指向谁，直接忽略。
+        """
+        nicknames = self.extract(text)
+        if not nicknames:
+            return []
+        User = get_user_model()
+        by_nickname = {}
+        for user in User.objects.filter(nickname__in=nicknames, is_active=True).only('id', 'nickname'):
+            by_nickname.setdefault(user.nickname, []).append(user)
+        return [
+            by_nickname[name][0] for name in nicknames
+            if len(by_nickname.get(name, [])) == 1
+        ]
+
+
+mention_index = MentionIndex()
+
+
+def notify_mentions(text, target, actor, is_anonymous=False):
+    """
+    为正文中提及的用户发送 mention 通知。
+    """
+    for user in mention_index.resolve(text):
+        notify(user, 'mention', target=target, actor=actor, is_anonymous=is_anonymous)
@@ -0,0 +1,205 @@
+"""
+按路由统计请求延迟、SQL 查询数和耗时、响应大小与状态码，并以 Prometheus 格式暴露在 /metrics。
+
+路由标签使用 URL 名称（如 api_v1:post-list），不会因为路径参数产生大量时间序列。
+SQL 统计通过 execute_wrapper 实现，不依赖 DEBUG 下的 queries_log。数据库连接是线程局部的，
+ASGI 下同步视图在另一个线程中执行，因此每个线程的连接上都常驻一个分发函数，
+由它调用 contextvar 中当前请求登记的 wrapper（contextvar 会随 sync_to_async 带到执行视图的线程）。
+
+/metrics 默认拒绝访问：需要设置 METRICS_TOKEN 并带 Bearer token，或者来源地址在 METRICS_ALLOWED_IPS 中。
+
+多进程部署（gunicorn/uwsgi 多 worker）时设置环境变量 PROMETHEUS_MULTIPROC_DIR
+指向一个每次启动前清空的目录，各进程把指标写入该目录，/metrics 汇总所有进程；
+gunicorn 还需要在 child_exit 钩子中调用 prometheus_client.multiprocess.mark_process_dead(worker.pid)。
+"""
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest,
+    multiprocess,
+)
+
+LABELS = ['method', 'route']
+
+# /metrics 自身不计入统计
+METRICS_ROUTE = 'metrics'
+
+REQUESTS = Counter(
+    'http_requests', "Requests by route and status code.", LABELS + ['status'],
+)
+LATENCY = Histogram(
+    'http_request_duration_seconds', "Request latency.", LABELS,
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DB_QUERIES = Histogram(
+    'http_request_db_queries', "SQL queries per request.", LABELS,
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144),
+)
+DB_TIME = Histogram(
+    'http_request_db_duration_seconds', "Time spent in SQL per request.", LABELS,
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+RESPONSE_SIZE = Histogram(
+    'http_response_size_bytes', "Response body size.", LABELS,
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+
+# 微信 jscode2session 调用（core.wechat）：按结果（ok / error）的耗时，按类型的错误数
+WECHAT_LATENCY = Histogram(
+    'wechat_code2session_duration_seconds', "WeChat jscode2session latency by outcome.", ['outcome'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+WECHAT_ERRORS = Counter(
+    'wechat_code2session_errors', "WeChat jscode2session failures by kind.", ['kind'],
+)
+
+
+class QueryStats:
+    """
+    execute_wrapper：记录本次请求执行的 SQL 条数和总耗时。
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+# 当前请求登记的 execute_wrapper，按登记顺序由外到内调用
+_wrappers = ContextVar('core_metrics_wrappers', default=())
+
+
+def _dispatch(execute, sql, params, many, context):
+    for wrapper in reversed(_wrappers.get()):
+        execute = partial(wrapper, execute)
+    return execute(sql, params, many, context)
+
+
+def _install(connection):
+    # 放在最前面：connection.execute_wrapper() 退出时弹出的是列表最后一个
+    if _dispatch not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _dispatch)
+
+
+@receiver(request_started)
+def install_dispatch(**kwargs):
+    """
+    ASGI 下 request_started 的同步接收者和同步视图在同一个线程中执行，在这里给该线程的连接装上分发函数。
+    """
+    for alias in connections:
+        _install(connections[alias])
+
+
+@receiver(connection_created)
+def install_dispatch_on_connect(sender, connection, **kwargs):
+    # 请求中在其它线程新建的连接
+    _install(connection)
+
+
+@contextmanager
+def wrap_queries(wrapper):
+    """
+    在当前上下文（包括其中 sync_to_async 调用的线程）执行的 SQL 上应用 wrapper。
+    """
+    install_dispatch()
+    token = _wrappers.set(_wrappers.get() + (wrapper,))
+    try:
+        yield
+    finally:
+        _wrappers.reset(token)
+
+
+def route_label(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else 'unmatched'
+
+
+def response_size(response):
+    if response.streaming:
+        return int(response.get('Content-Length') or 0)
+    return len(response.content)
+
+
+class MetricsMiddleware:
+    """
+    同时支持同步和异步请求，异步视图（如 AsyncWXLoginView）不会被强制切回同步线程。
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        stats = QueryStats()
+        with wrap_queries(stats):
+            response = self.get_response(request)
+        self.observe(request, response, stats, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        stats = QueryStats()
+        with wrap_queries(stats):
+            response = await self.get_response(request)
+        self.observe(request, response, stats, time.perf_counter() - started)
+        return response
+
+    def observe(self, request, response, stats, elapsed):
+        route = route_label(request)
+        if route == METRICS_ROUTE:
+            return
+        method = request.method
+        REQUESTS.labels(method, route, str(response.status_code)).inc()
+        LATENCY.labels(method, route).observe(elapsed)
+        DB_QUERIES.labels(method, route).observe(stats.count)
+        DB_TIME.labels(method, route).observe(stats.duration)
+        RESPONSE_SIZE.labels(method, route).observe(response_size(response))
+
+
+def metrics_allowed(request):
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and constant_time_compare(request.headers.get('Authorization', ''), f"Bearer {token}"):
+        return True
+    return request.META.get('REMOTE_ADDR') in getattr(settings, 'METRICS_ALLOWED_IPS', ())
+
+
+def metrics_view(request):
+    """
+    Prometheus 抓取端点。要求 Authorization: Bearer <METRICS_TOKEN>，或来源地址在 METRICS_ALLOWED_IPS 中；
+    两者都没有配置时一律拒绝。
+    """
+    if not metrics_allowed(request):
+        return HttpResponseForbidden()
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("core", "0002_notification_unread_counter"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="notification",
+            name="notif_type",
+            field=models.CharField(
+                choices=[
+                    ("like", "点赞通知"),
+                    ("comment", "评论通知"),
+                    ("reply", "回复通知"),
+                    ("mention", "@ 通知"),
+                    ("system", "系统通知"),
+                ],
+                max_length=10,
+                verbose_name="通知类型",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                condition=models.Q(("is_read", False)),
+                fields=["recipient", "content_type", "object_id"],
+                name="notif_unread_target_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:24
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0003_notification_aggregation"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Broadcast",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("content", models.TextField(verbose_name="公告内容")),
+                (
+                    "extra_data",
+                    models.JSONField(blank=True, null=True, verbose_name="扩展数据"),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        db_index=True,
+                        default=django.utils.timezone.now,
+                        verbose_name="发布时间",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "系统公告",
+                "verbose_name_plural": "系统公告",
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.AddField(
+            model_name="notificationcounter",
+            name="broadcast_watermark",
+            field=models.PositiveBigIntegerField(
+                default=0, verbose_name="公告已读水位"
+            ),
+        ),
+    ]
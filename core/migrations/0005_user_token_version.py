@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0004_broadcast"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="token_version",
+            field=models.PositiveIntegerField(default=0, verbose_name="令牌版本"),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0005_user_token_version"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="emailverification",
+            name="core_emailv_email_8edf0e_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="emailverification",
+            name="core_emailv_code_46b072_idx",
+        ),
+        migrations.AddIndex(
+            model_name="emailverification",
+            index=models.Index(
+                fields=["email", "code", "is_used", "sent_at"],
+                name="emailcode_lookup_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="emailverification",
+            index=models.Index(fields=["sent_at"], name="emailcode_sent_at_idx"),
+        ),
+    ]
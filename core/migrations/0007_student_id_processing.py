@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0006_email_verification_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="studentidupload",
+            name="processed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="studentidupload",
+            name="thumbnail",
+            field=models.ImageField(blank=True, upload_to="student_ids/thumbs/"),
+        ),
+    ]
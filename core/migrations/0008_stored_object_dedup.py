@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0007_student_id_processing"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StoredObject",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "sha256",
+                    models.CharField(
+                        max_length=64, unique=True, verbose_name="内容哈希"
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        max_length=255, unique=True, verbose_name="存储路径"
+                    ),
+                ),
+                ("size", models.PositiveBigIntegerField(verbose_name="文件大小")),
+                (
+                    "ref_count",
+                    models.PositiveIntegerField(default=1, verbose_name="引用数"),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="创建时间"),
+                ),
+            ],
+            options={
+                "verbose_name": "存储对象",
+                "verbose_name_plural": "存储对象",
+            },
+        ),
+        migrations.AddField(
+            model_name="studentidupload",
+            name="content_hash",
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+    ]
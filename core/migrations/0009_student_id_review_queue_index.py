@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0008_stored_object_dedup"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="studentidupload",
+            index=models.Index(
+                fields=["status", "uploaded_at", "id"], name="idupload_review_queue_idx"
+            ),
+        ),
+    ]
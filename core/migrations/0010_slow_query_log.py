@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0009_student_id_review_queue_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SlowQuery",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "fingerprint",
+                    models.CharField(max_length=40, unique=True, verbose_name="指纹"),
+                ),
+                ("sql", models.TextField(verbose_name="归一化 SQL")),
+                ("count", models.PositiveIntegerField(default=0, verbose_name="次数")),
+                (
+                    "total_time",
+                    models.FloatField(default=0, verbose_name="总耗时（毫秒）"),
+                ),
+                (
+                    "max_time",
+                    models.FloatField(default=0, verbose_name="最大耗时（毫秒）"),
+                ),
+                (
+                    "last_view",
+                    models.CharField(
+                        blank=True, max_length=200, verbose_name="最近来源视图"
+                    ),
+                ),
+                (
+                    "stack",
+                    models.TextField(blank=True, verbose_name="最慢一次的调用栈"),
+                ),
+                ("plan", models.TextField(blank=True, verbose_name="执行计划")),
+                (
+                    "first_seen",
+                    models.DateTimeField(auto_now_add=True, verbose_name="首次出现"),
+                ),
+                (
+                    "last_seen",
+                    models.DateTimeField(auto_now=True, verbose_name="最近出现"),
+                ),
+            ],
+            options={
+                "verbose_name": "慢查询",
+                "verbose_name_plural": "慢查询",
+                "ordering": ["-total_time"],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0010_slow_query_log"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="studentidupload",
+            name="source_name",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddConstraint(
+            model_name="studentidupload",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("source_name", ""), _negated=True),
+                fields=("source_name",),
+                name="idupload_source_name_uniq",
+            ),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
 from django.utils import timezone
 from django.utils.text import slugify
 from django.contrib.contenttypes.models import ContentType
@@ -38,8 +40,48 @@ class User(AbstractUser):
     verification_submitted_at = models.DateTimeField("认证提交时间", blank=True, null=True)
     verification_approved_at = models.DateTimeField("认证审核时间", blank=True, null=True)
 
+    # JWT 中身份声明的版本号，认证状态/权限变化时递增，使旧 token 回退到查库
+    token_version = models.PositiveIntegerField("令牌版本", default=0)
+
+    # 保存时与加载时的值比较的字段
+    TRACKED_FIELDS = ('nickname', 'is_verified_user', 'is_staff', 'is_active')
+    # 写入 JWT 声明、影响权限判断的字段
+    PRINCIPAL_FIELDS = ('is_verified_user', 'is_staff', 'is_active')
+
     def __str__(self):
         return self.nickname or self.username
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: getattr(instance, name)
+            for name in cls.TRACKED_FIELDS if name in field_names
+        }
+        return instance
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        loaded = getattr(self, '_loaded_values', {})
+        principal_changed = not adding and any(
+            name in loaded and getattr(self, name) != loaded[name]
+            for name in self.PRINCIPAL_FIELDS
+        )
+        if principal_changed:
+            self.token_version += 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'token_version'}
+
+        super().save(*args, **kwargs)
+
+        # 增量更新 @ 提及索引
+        if (adding or 'nickname' in loaded) and self.nickname != loaded.get('nickname'):
+            from .mentions import mention_index
+            mention_index.rename(loaded.get('nickname'), self.nickname)
+        if principal_changed:
+            from .authentication import invalidate_principal
+            invalidate_principal(self.pk, self.token_version)
+        self._loaded_values = {name: getattr(self, name) for name in self.TRACKED_FIELDS}
     
 class Category(models.Model):
     """
@@ -213,6 +255,7 @@ class PrivateMessage(models.Model):
 
 class Notification(models.Model):
     NOTIF_TYPES = (
+        ("like", "点赞通知"),
         ("comment", "评论通知"),
         ("reply", "回复通知"),
         ("mention", "@ 通知"),
@@ -243,10 +286,30 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # 未读角标 / 未读列表只扫描未读行
+            models.Index(
+                fields=['recipient', '-created_at'],
+                condition=Q(is_read=False),
+                name='notif_unread_recipient_idx',
+            ),
+            # 聚合通知按目标查找窗口内的未读行
+            models.Index(
+                fields=['recipient', 'content_type', 'object_id'],
+                condition=Q(is_read=False),
+                name='notif_unread_target_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"Notification(type={self.notif_type}, recipient={self.recipient.username})"
 
+    def save(self, *args, **kwargs):
+        is_new = self._state.adding
+        super().save(*args, **kwargs)
+        if is_new and not self.is_read:
+            NotificationCounter.incr(self.recipient_id)
+
     def is_orphan(self):
         """
         判断当前通知是否已失效（关联对象被删除）。
@@ -258,8 +321,82 @@ class Notification(models.Model):
         通知失效处理，例如标记为已读或归档。
         """
         if self.is_orphan():
+            was_unread = not self.is_read
             self.is_read = True
             self.save()
+            if was_unread:
+                NotificationCounter.decr(self.recipient_id)
+
+
+class NotificationCounter(models.Model):
+    """
+    每个用户的未读通知计数，随通知创建/已读增量维护。
+    计数行缺失时从 Notification 表惰性初始化，reconcile_unread_counts 命令定期校正。
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+        primary_key=True, related_name='notification_counter'
+    )
+    unread_count = models.PositiveIntegerField("未读通知数", default=0)
+    # 已读到的最新 Broadcast.id，大于该值的公告视为未读
+    broadcast_watermark = models.PositiveBigIntegerField("公告已读水位", default=0)
+    updated_at = models.DateTimeField("更新时间", auto_now=True)
+
+    def __str__(self):
+        return f"NotificationCounter(user={self.user_id}, unread={self.unread_count})"
+
+    @classmethod
+    def _init_from_source(cls, user_id):
+        """
+        计数行不存在时，按真实未读数创建；并发创建冲突时返回已存在的行。
+        """
+        count = Notification.objects.filter(recipient_id=user_id, is_read=False).count()
+        try:
+            with transaction.atomic():
+                return cls.objects.create(user_id=user_id, unread_count=count)
+        except IntegrityError:
+            return cls.objects.get(user_id=user_id)
+
+    @classmethod
+    def for_user(cls, user_id):
+        counter = cls.objects.filter(user_id=user_id).first()
+        if counter is None:
+            counter = cls._init_from_source(user_id)
+        return counter
+
+    @classmethod
+    def get_count(cls, user_id):
+        return cls.for_user(user_id).unread_count
+
+    @classmethod
+    def incr(cls, user_id, delta=1):
+        # 计数行不存在时不在写路径上初始化：首次读取时按真实未读数创建，已包含本次新增的通知
+        cls.objects.filter(user_id=user_id).update(unread_count=F('unread_count') + delta)
+
+    @classmethod
+    def decr(cls, user_id, delta=1):
+        if delta <= 0:
+            return
+        cls.objects.filter(user_id=user_id).update(
+            unread_count=Greatest(F('unread_count') - delta, 0)
+        )
+
+class Broadcast(models.Model):
+    """
+    全站系统公告，只存一行而不为每个用户生成 Notification；
+    阅读状态由 NotificationCounter.broadcast_watermark 表示。
+    """
+    content = models.TextField("公告内容")
+    extra_data = models.JSONField("扩展数据", blank=True, null=True)
+    created_at = models.DateTimeField("发布时间", default=timezone.now, db_index=True)
+
+    class Meta:
+        verbose_name = "系统公告"
+        verbose_name_plural = "系统公告"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return self.content[:50]
 
 class EmailVerification(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='email_codes')
@@ -269,7 +406,31 @@ class EmailVerification(models.Model):
     is_used = models.BooleanField(default=False)
 
     class Meta:
-        indexes = [models.Index(fields=['email']), models.Index(fields=['code'])]
+        indexes = [
+            # 校验：email + code + 未使用 等值匹配，再按 sent_at 判断是否过期
+            models.Index(fields=['email', 'code', 'is_used', 'sent_at'], name='emailcode_lookup_idx'),
+            # 批量清理过期验证码
+            models.Index(fields=['sent_at'], name='emailcode_sent_at_idx'),
+        ]
+
+
+class StoredObject(models.Model):
+    """
+    按内容寻址存储的媒体文件：同一内容（sha256）只在存储中保存一份，
+    ref_count 记录引用它的记录数，降到 0 时删除文件，见 core.dedup。
+    """
+    sha256 = models.CharField("内容哈希", max_length=64, unique=True)
+    name = models.CharField("存储路径", max_length=255, unique=True)
+    size = models.PositiveBigIntegerField("文件大小")
+    ref_count = models.PositiveIntegerField("引用数", default=1)
+    created_at = models.DateTimeField("创建时间", auto_now_add=True)
+
+    class Meta:
+        verbose_name = "存储对象"
+        verbose_name_plural = "存储对象"
+
+    def __str__(self):
+        return self.name
 
 
 class StudentIDUpload(models.Model):
@@ -278,4 +439,46 @@ class StudentIDUpload(models.Model):
     uploaded_at = models.DateTimeField(auto_now_add=True)
     STATUS_CHOICES = [('pending','待审核'),('approved','通过'),('rejected','拒绝')]
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
-    review_note = models.TextField(blank=True, null=True)  # 管理员审核备注
\ No newline at end of file
+    review_note = models.TextField(blank=True, null=True)  # 管理员审核备注
+    # 后台处理（摆正、去 EXIF、缩放）后生成的审核缩略图，见 core.imaging
+    thumbnail = models.ImageField(upload_to='student_ids/thumbs/', blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    # 上传原图的 sha256，用于重复上传时直接复用已处理的图片
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    # 直传时预签名的对象名；处理后 image 会换成压缩图，重复 complete 按它找回同一条记录
+    source_name = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        indexes = [
+            # 审核队列：按状态过滤，按上传时间先进先出翻页
+            models.Index(fields=['status', 'uploaded_at', 'id'], name='idupload_review_queue_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['source_name'], condition=~Q(source_name=''), name='idupload_source_name_uniq'
+            ),
+        ]
+
+
+class SlowQuery(models.Model):
+    """
+    按归一化 SQL 指纹聚合的慢查询，由 core.slowlog 在请求结束时写入。
+    """
+    fingerprint = models.CharField("指纹", max_length=40, unique=True)
+    sql = models.TextField("归一化 SQL")
+    count = models.PositiveIntegerField("次数", default=0)
+    total_time = models.FloatField("总耗时（毫秒）", default=0)
+    max_time = models.FloatField("最大耗时（毫秒）", default=0)
+    last_view = models.CharField("最近来源视图", max_length=200, blank=True)
+    stack = models.TextField("最慢一次的调用栈", blank=True)
+    plan = models.TextField("执行计划", blank=True)
+    first_seen = models.DateTimeField("首次出现", auto_now_add=True)
+    last_seen = models.DateTimeField("最近出现", auto_now=True)
+
+    class Meta:
+        verbose_name = "慢查询"
+        verbose_name_plural = "慢查询"
+        ordering = ['-total_time']
+
+    def __str__(self):
+        return f"{self.fingerprint[:8]} x{self.count} ({self.max_time:.0f}ms)"
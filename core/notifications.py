@@ -0,0 +1,290 @@
+"""
+通知的创建与批量维护。
+
+点赞、评论这类高频通知按 (recipient, notif_type, target) 在时间窗口内聚合成一行，
+extra_data 中记录参与人数和少量示例用户，前端据此展示「A、B 等 42 人赞了你的帖子」；
+参与人数按 actor_keys 中的去重集合计算，同一用户反复点赞/取消或多次评论只算一次。
+关联对象被删除后的失效通知由 sweep_orphans 按块集合处理。
+系统公告存为一行 Broadcast，读取时合并进通知列表，不为每个用户写入通知；
+合并后的列表按 (created_at, 类型, id) 游标分页，每页两边各只查 limit + 1 行。
+"""
+import base64
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Count, Exists, Max, OuterRef, Q
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+
+from .models import Broadcast, Notification, NotificationCounter
+
+# 默认聚合的通知类型及窗口，可在 settings 中覆盖
+DEFAULT_AGGREGATE_TYPES = ('like', 'comment')
+DEFAULT_AGGREGATION_WINDOW = timedelta(hours=24)
+# extra_data 中最多保留的示例用户数
+SAMPLE_ACTORS = 3
+
+ANONYMOUS_ACTOR = {'id': None, 'nickname': '匿名用户'}
+
+
+def _actor_summary(actor, is_anonymous=False):
+    if actor is None or is_anonymous:
+        return dict(ANONYMOUS_ACTOR)
+    return {'id': actor.id, 'nickname': str(actor)}
+
+
+def _actor_key(actor):
+    """
+    参与人去重用的标识。extra_data 会原样返回给接收者，匿名用户也在集合中，
+    因此存 HMAC 而不是用户 id。
+    """
+    return salted_hmac('core.notifications.actor', str(actor.pk)).hexdigest()[:16]
+
+
+def _should_aggregate(notif_type):
+    types = getattr(settings, 'NOTIFICATION_AGGREGATE_TYPES', DEFAULT_AGGREGATE_TYPES)
+    return notif_type in types
+
+
+def notify(recipient, notif_type, target=None, actor=None, is_anonymous=False, extra_data=None):
+    """
+    给 recipient 发送一条通知，返回新建或被合并的 Notification。
+
+    可聚合类型会合并到窗口内同一目标的未读通知上（upsert），
+    已读的旧通知不再合并，下一次动作会生成新的一行。
+    """
+    if actor is not None and actor.pk == recipient.pk:
+        # 自己对自己的操作不通知
+        return None
+
+    summary = _actor_summary(actor, is_anonymous)
+
+    if target is None or not _should_aggregate(notif_type):
+        data = dict(extra_data or {})
+        data.setdefault('actor_count', 1)
+        data.setdefault('actors', [summary])
+        return Notification.objects.create(
+            recipient=recipient,
+            notif_type=notif_type,
+            content_type=ContentType.objects.get_for_model(target) if target is not None else None,
+            object_id=target.pk if target is not None else None,
+            extra_data=data,
+        )
+
+    window = getattr(settings, 'NOTIFICATION_AGGREGATION_WINDOW', DEFAULT_AGGREGATION_WINDOW)
+    content_type = ContentType.objects.get_for_model(target)
+    now = timezone.now()
+
+    with transaction.atomic():
+        existing = (
+            Notification.objects.select_for_update()
+            .filter(
+                recipient=recipient,
+                notif_type=notif_type,
+                content_type=content_type,
+                object_id=target.pk,
+                is_read=False,
+                created_at__gte=now - window,
+            )
+            .order_by('-created_at')
+            .first()
+        )
+        key = _actor_key(actor) if actor is not None else None
+        if existing is None:
+            data = dict(extra_data or {})
+            data.update({'actor_count': 1, 'actors': [summary], 'actor_keys': [key] if key else []})
+            return Notification.objects.create(
+                recipient=recipient,
+                notif_type=notif_type,
+                content_type=content_type,
+                object_id=target.pk,
+                extra_data=data,
+            )
+
+        data = dict(existing.extra_data or {})
+        actor_keys = list(data.get('actor_keys', []))
+        # 已参与过的用户重复操作（如取消后再点赞、多次评论）不重复计数；没有 actor 的每次都计
+        actors = list(data.get('actors', []))
+        if key is None or key not in actor_keys:
+            if key is not None:
+                actor_keys.append(key)
+            data['actor_count'] = data.get('actor_count', 0) + 1
+            actors = ([summary] + [a for a in actors if a != summary])[:SAMPLE_ACTORS]
+        data['actors'] = actors
+        data['actor_keys'] = actor_keys
+        if extra_data:
+            data.update(extra_data)
+
+        existing.extra_data = data
+        # 更新时间让聚合通知排到列表顶部
+        existing.created_at = now
+        existing.save(update_fields=['extra_data', 'created_at'])
+        return existing
+
+
+def broadcast(content, extra_data=None):
+    """
+    发布一条全站系统公告。
+    """
+    return Broadcast.objects.create(content=content, extra_data=extra_data)
+
+
+def visible_broadcasts(user):
+    """
+    用户注册之后发布的公告。
+    """
+    return Broadcast.objects.filter(created_at__gte=user.date_joined)
+
+
+# 合并排序中同一时刻的先后顺序
+_NOTIFICATION, _BROADCAST = 0, 1
+
+
+def encode_cursor(created_at, rank, pk):
+    raw = f"{created_at.isoformat()}|{rank}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(value):
+    """
+    解析 encode_cursor 生成的游标，格式不对时抛出 ValueError。
+    """
+    created_at, rank, pk = base64.urlsafe_b64decode(value.encode()).decode().split('|')
+    return datetime.fromisoformat(created_at), int(rank), int(pk)
+
+
+def _after_cursor(queryset, cursor, rank, newest_first):
+    """
+    排序中位于游标之后的行：(created_at, rank, pk) 逐项比较。
+    """
+    if cursor is None:
+        return queryset
+    created_at, cursor_rank, pk = cursor
+    op = 'lt' if newest_first else 'gt'
+    condition = Q(**{f'created_at__{op}': created_at})
+    if rank == cursor_rank:
+        condition |= Q(created_at=created_at, **{f'pk__{op}': pk})
+    elif (rank < cursor_rank) == newest_first:
+        condition |= Q(created_at=created_at)
+    return queryset.filter(condition)
+
+
+def notification_page(user, notifications, cursor=None, limit=20, newest_first=True):
+    """
+    个人通知（notifications 查询集）与公告合并后的一页，
+    返回 (Notification/Broadcast 列表, 下一页游标或 None)。
+
+    聚合通知被合并时 created_at 会更新到当前时间，行在排序中只会往"更新"的方向移动。
+    游标按键值比较而不是偏移量，因此其它行既不会被跳过也不会重复：
+    按时间倒序（默认）翻页时，翻页期间被顶到最前的聚合通知本轮不再出现，重新从首页拉取时位于顶部；
+    按时间正序（ordering=created_at）翻页时，已经看过的聚合通知可能在后面的页中再出现一次，
+    客户端应按 id 去重。
+    """
+    order = ('-created_at', '-pk') if newest_first else ('created_at', 'pk')
+    rows = []
+    for rank, queryset in ((_NOTIFICATION, notifications), (_BROADCAST, visible_broadcasts(user))):
+        queryset = _after_cursor(queryset.order_by(*order), cursor, rank, newest_first)
+        rows += [((obj.created_at, rank, obj.pk), obj) for obj in queryset[:limit + 1]]
+    rows.sort(key=lambda row: row[0], reverse=newest_first)
+    page = rows[:limit]
+    next_cursor = encode_cursor(*page[-1][0]) if len(rows) > limit else None
+    return [obj for _, obj in page], next_cursor
+
+
+def unread_broadcast_count(user, counter=None):
+    counter = counter or NotificationCounter.for_user(user.id)
+    return visible_broadcasts(user).filter(pk__gt=counter.broadcast_watermark).count()
+
+
+def unread_total(user):
+    """
+    未读角标：个人通知计数 + 水位之后的公告数。
+    """
+    counter = NotificationCounter.for_user(user.id)
+    return counter.unread_count + unread_broadcast_count(user, counter)
+
+
+def mark_broadcasts_read(user, upto=None):
+    """
+    把公告水位推进到 upto（默认最新一条公告），水位只增不减。
+    """
+    latest = Broadcast.objects.aggregate(m=Max('pk'))['m'] or 0
+    upto = latest if upto is None else min(upto, latest)
+    NotificationCounter.for_user(user.id)
+    NotificationCounter.objects.filter(
+        user_id=user.id, broadcast_watermark__lt=upto
+    ).update(broadcast_watermark=upto)
+
+
+def _orphan_querysets():
+    """
+    按 content_type 拆分出失效通知的查询集，每个都是对目标表的 NOT EXISTS 反连接。
+    """
+    # 关联的 ContentType 已被删除（SET_NULL），但 object_id 仍在
+    yield Notification.objects.filter(content_type__isnull=True, object_id__isnull=False)
+
+    ct_ids = (
+        Notification.objects.filter(content_type__isnull=False)
+        .order_by().values_list('content_type_id', flat=True).distinct()
+    )
+    for content_type in ContentType.objects.filter(pk__in=list(ct_ids)):
+        qs = Notification.objects.filter(content_type=content_type)
+        model = content_type.model_class()
+        if model is None:
+            # 模型已不存在，全部失效
+            yield qs
+            continue
+        yield qs.filter(
+            ~Exists(model._base_manager.filter(pk=OuterRef('object_id')))
+        )
+
+
+def _decr_unread(ids):
+    unread = (
+        Notification.objects.filter(pk__in=ids, is_read=False)
+        .order_by().values_list('recipient_id').annotate(n=Count('id'))
+    )
+    for recipient_id, n in unread:
+        NotificationCounter.decr(recipient_id, n)
+
+
+def sweep_orphans(delete=False, batch_size=1000):
+    """
+    批量处理关联对象已被删除的通知：默认标记为已读，delete=True 时直接删除。
+
+    按主键递增分块处理，每块一次集合更新/删除，避免逐行解析 GenericForeignKey。
+    返回 {'matched': 处理行数, 'batches': 块数, 'elapsed': 秒数}。
+    """
+    started = time.monotonic()
+    matched = batches = 0
+
+    for orphans in _orphan_querysets():
+        if not delete:
+            orphans = orphans.filter(is_read=False)
+        last_pk = 0
+        while True:
+            ids = list(
+                orphans.filter(pk__gt=last_pk)
+                .order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            last_pk = ids[-1]
+            with transaction.atomic():
+                _decr_unread(ids)
+                batch = Notification.objects.filter(pk__in=ids)
+                if delete:
+                    batch.delete()
+                else:
+                    batch.update(is_read=True)
+            matched += len(ids)
+            batches += 1
+
+    return {
+        'matched': matched,
+        'batches': batches,
+        'elapsed': time.monotonic() - started,
+    }
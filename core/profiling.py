@@ -0,0 +1,163 @@
+"""
+按请求开启的 cProfile 性能分析。
+
+- 管理员请求带 X-Profile: 1 头时分析本次请求；
+- PROFILING_SAMPLE_RATE > 0 时按比例抽样分析任意请求（只保存文件，不在响应头中暴露）。
+
+分析范围是认证、权限和限流之后的视图处理加上响应渲染。结果以 pstats 格式保存在 PROFILING_DIR，
+管理员可通过 profile-download 接口下载，用 snakeviz、flameprof 等工具查看。
+耗时按函数自身时间（tottime）所在文件归类为 orm / serializer / render / other；
+内建函数（如 sqlite3 的 execute、json 编码）的时间归入调用它的函数的类别。
+管理员请求的响应带 X-Profile-Id 和 Server-Timing 头。
+PROFILING_DIR 中最多保留 PROFILING_MAX_FILES 个文件，每次保存后删除最旧的。
+
+未开启时每个请求只多一次请求头和配置查找。
+"""
+import cProfile
+import logging
+import os
+import pstats
+import random
+import re
+import uuid
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_ID = re.compile(r'[0-9a-f]{32}')
+
+# (类别, 文件路径片段)，按顺序匹配
+CATEGORIES = [
+    ('orm', f'{os.sep}django{os.sep}db{os.sep}'),
+    ('serializer', f'{os.sep}rest_framework{os.sep}serializers.py'),
+    ('serializer', f'{os.sep}rest_framework{os.sep}fields.py'),
+    ('serializer', f'{os.sep}rest_framework{os.sep}relations.py'),
+    ('serializer', f'{os.sep}core{os.sep}serializers.py'),
+    ('render', f'{os.sep}rest_framework{os.sep}renderers.py'),
+    ('render', f'{os.sep}rest_framework{os.sep}utils{os.sep}encoders.py'),
+    ('render', f'{os.sep}json{os.sep}'),
+]
+
+
+def profile_dir():
+    return Path(getattr(settings, 'PROFILING_DIR', settings.BASE_DIR / 'profiles'))
+
+
+def profile_path(profile_id):
+    if not PROFILE_ID.fullmatch(profile_id):
+        return None
+    return profile_dir() / f'{profile_id}.prof'
+
+
+def max_files():
+    return getattr(settings, 'PROFILING_MAX_FILES', 200)
+
+
+def prune(directory):
+    """
+    按修改时间删除最旧的分析文件，只保留 max_files() 个。
+    """
+    paths = []
+    for path in directory.glob('*.prof'):
+        try:
+            paths.append((path.stat().st_mtime, path))
+        except OSError:
+            # 其它 worker 同时在清理
+            continue
+    paths.sort()
+    for _, path in paths[:max(0, len(paths) - max_files())]:
+        path.unlink(missing_ok=True)
+
+
+def should_profile(request):
+    if request.headers.get(PROFILE_HEADER) and request.user.is_staff:
+        return True
+    rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0)
+    return rate > 0 and random.random() < rate
+
+
+def _category(filename):
+    for name, fragment in CATEGORIES:
+        if fragment in filename:
+            return name
+    return 'other'
+
+
+def breakdown(stats):
+    """
+    按类别汇总自身时间（秒）。
+    """
+    totals = defaultdict(float)
+    for (filename, _, _), (_, _, tottime, _, callers) in stats.stats.items():
+        if filename != '~':
+            totals[_category(filename)] += tottime
+            continue
+        # 内建函数：按各调用方实际消耗的时间分摊
+        for (caller_file, _, _), (_, _, caller_tt, _) in callers.items():
+            totals[_category(caller_file)] += caller_tt
+    return dict(totals)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+
+    def start(self):
+        try:
+            self.profiler.enable()
+        except ValueError:
+            # 已有其它 profiler 在运行（例如本地用 cProfile 跑整个进程）
+            return False
+        return True
+
+    def finish(self, request, response):
+        try:
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+        finally:
+            self.profiler.disable()
+
+        profile_id = uuid.uuid4().hex
+        path = profile_path(profile_id)
+        stats = pstats.Stats(self.profiler)
+        totals = breakdown(stats)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            stats.dump_stats(path)
+            prune(path.parent)
+        except OSError as e:
+            logger.error(f"Saving profile {profile_id} failed: {str(e)}")
+            return None
+        logger.info(f"Profiled {request.method} {request.path} -> {profile_id} ({stats.total_tt * 1000:.1f}ms)")
+
+        if request.user.is_staff:
+            response['X-Profile-Id'] = profile_id
+            response['Server-Timing'] = ', '.join(
+                f'{name};dur={seconds * 1000:.2f}' for name, seconds in sorted(totals.items())
+            )
+        return profile_id
+
+
+class ProfilingMixin:
+    """
+    APIView 混入：在 initial() 之后开始分析，在 finalize_response() 中渲染响应后结束。
+    """
+    _profile = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if should_profile(request):
+            profile = RequestProfile()
+            if profile.start():
+                self._profile = profile
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        profile, self._profile = self._profile, None
+        if profile is not None:
+            profile.finish(request, response)
+        return response
@@ -0,0 +1,125 @@
+"""
+通知、私信与邮箱验证码的保留策略。
+
+过期数据按主键区间分块删除，每块一个短事务，避免长时间持锁；
+策略在 settings.DATA_RETENTION 中配置，值为 None 表示不清理该类数据。
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q
+from django.utils import timezone
+
+from .models import EmailVerification, Notification, NotificationCounter, PrivateMessage
+
+DEFAULT_RETENTION = {
+    # 已读通知保留时长
+    'notification_read': timedelta(days=90),
+    # 所有通知（含未读）的最长保留时长
+    'notification_max': timedelta(days=365),
+    # 双方都已删除的私信在删除后的保留时长（按发送时间计算）
+    'message_both_deleted': timedelta(days=30),
+    # 所有私信的最长保留时长，默认永久保留
+    'message_max': None,
+    # 邮箱验证码：已使用的立即清理，未使用的超过该时长清理（应大于 EMAIL_CODE_TTL）
+    'email_code': timedelta(hours=1),
+}
+
+
+def get_policy():
+    policy = dict(DEFAULT_RETENTION)
+    policy.update(getattr(settings, 'DATA_RETENTION', {}))
+    return policy
+
+
+def prune_in_pk_ranges(queryset, chunk_size=1000, before_delete=None, pause=0):
+    """
+    在 queryset 命中范围的 [min(pk), max(pk)] 内按固定宽度的主键区间逐块删除。
+    返回删除的行数（不含级联删除的其它模型）。
+    """
+    bounds = queryset.aggregate(lo=Min('pk'), hi=Max('pk'))
+    if bounds['lo'] is None:
+        return 0
+
+    label = queryset.model._meta.label
+    deleted = 0
+    lo = bounds['lo']
+    while lo <= bounds['hi']:
+        chunk = queryset.filter(pk__gte=lo, pk__lt=lo + chunk_size)
+        with transaction.atomic():
+            if before_delete is not None:
+                before_delete(chunk)
+            _, per_model = chunk.delete()
+        deleted += per_model.get(label, 0)
+        lo += chunk_size
+        if pause:
+            time.sleep(pause)
+    return deleted
+
+
+def _decr_unread(chunk):
+    unread = (
+        chunk.filter(is_read=False)
+        .order_by().values_list('recipient_id').annotate(n=Count('id'))
+    )
+    for recipient_id, n in unread:
+        NotificationCounter.decr(recipient_id, n)
+
+
+def expired_notifications(policy, now=None):
+    now = now or timezone.now()
+    cond = Q()
+    if policy['notification_read'] is not None:
+        cond |= Q(is_read=True, created_at__lt=now - policy['notification_read'])
+    if policy['notification_max'] is not None:
+        cond |= Q(created_at__lt=now - policy['notification_max'])
+    if not cond:
+        return Notification.objects.none()
+    return Notification.objects.filter(cond)
+
+
+def expired_messages(policy, now=None):
+    now = now or timezone.now()
+    cond = Q()
+    if policy['message_both_deleted'] is not None:
+        cond |= Q(
+            sender_deleted=True, receiver_deleted=True,
+            sent_at__lt=now - policy['message_both_deleted'],
+        )
+    if policy['message_max'] is not None:
+        cond |= Q(sent_at__lt=now - policy['message_max'])
+    if not cond:
+        return PrivateMessage.objects.none()
+    return PrivateMessage.objects.filter(cond)
+
+
+def expired_email_codes(policy, now=None):
+    now = now or timezone.now()
+    if policy['email_code'] is None:
+        return EmailVerification.objects.none()
+    return EmailVerification.objects.filter(
+        Q(is_used=True) | Q(sent_at__lt=now - policy['email_code'])
+    )
+
+
+def prune(chunk_size=1000, pause=0, now=None):
+    """
+    按保留策略清理通知、私信和邮箱验证码，
+    返回 {'notifications': n, 'messages': n, 'email_codes': n, 'elapsed': 秒数}。
+    """
+    started = time.monotonic()
+    policy = get_policy()
+    notifications = prune_in_pk_ranges(
+        expired_notifications(policy, now), chunk_size,
+        before_delete=_decr_unread, pause=pause,
+    )
+    messages = prune_in_pk_ranges(expired_messages(policy, now), chunk_size, pause=pause)
+    email_codes = prune_in_pk_ranges(expired_email_codes(policy, now), chunk_size, pause=pause)
+    return {
+        'notifications': notifications,
+        'messages': messages,
+        'email_codes': email_codes,
+        'elapsed': time.monotonic() - started,
+    }
@@ -0,0 +1,152 @@
+"""
+读写分离：只读副本路由与"读己之写"粘滞。
+
+- 视图集设置 read_from_replica = True 后，GET/HEAD/OPTIONS 请求的查询发往 DATABASE_REPLICAS 中随机一个副本；
+- 写操作、select_for_update / get_or_create 等按写路由的查询、以及同一请求中已经写过之后的读，
+  一律走主库（default）；
+- 已登录用户的请求写过数据库后，REPLICA_STICKY_SECONDS 秒内该用户的读请求都走主库，
+  避免刚发的帖子、评论、点赞因为复制延迟而"消失"。粘滞标记放在 Django cache 中，
+  写请求和之后的读请求可能落在不同 worker 上，所以配置了副本时必须使用共享缓存（REDIS_URL），
+  进程内的 LocMem/Dummy 缓存会在启动时（CoreConfig.ready）被 check_shared_cache 拒绝。
+
+DATABASE_REPLICAS 为空时路由器不做任何事。
+"""
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+_state = ContextVar('replica_routing', default=None)
+
+
+class RoutingState:
+    def __init__(self):
+        self.use_replica = False
+        self.wrote = False
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def check_shared_cache():
+    """
+    配置了副本时，粘滞标记所在的缓存必须在 worker 之间共享。
+    """
+    if replicas() and isinstance(caches['default'], (LocMemCache, DummyCache)):
+        raise ImproperlyConfigured(
+            "DATABASE_REPLICAS requires a shared cache for read-your-writes pinning; "
+            "set REDIS_URL (CACHES['default'] must not be LocMem or Dummy)."
+        )
+
+
+def _pin_key(user_id):
+    return f"replica-pin:{user_id}"
+
+
+def is_pinned(user):
+    return user.is_authenticated and bool(cache.get(_pin_key(user.pk)))
+
+
+def _sticky_seconds():
+    return getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+
+
+def pin(user):
+    cache.set(_pin_key(user.pk), True, timeout=_sticky_seconds())
+
+
+async def apin(user):
+    await cache.aset(_pin_key(user.pk), True, timeout=_sticky_seconds())
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.use_replica or state.wrote:
+            return None
+        aliases = replicas()
+        return random.choice(aliases) if aliases else None
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # 副本与主库是同一份数据
+        allowed = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in allowed and obj2._state.db in allowed:
+            return True
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    为每个请求建立路由状态；请求写过数据库且用户已登录时设置粘滞标记。
+    DRF 认证后的用户会同步到 HttpRequest.user，这里能取到 JWT 用户。
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        state = RoutingState()
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        user = self._writer(request, state)
+        if user is not None:
+            pin(user)
+        return response
+
+    async def __acall__(self, request):
+        state = RoutingState()
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        user = self._writer(request, state)
+        if user is not None:
+            await apin(user)
+        return response
+
+    def _writer(self, request, state):
+        if not state.wrote or not replicas():
+            return None
+        user = getattr(request, 'user', None)
+        return user if user is not None and user.is_authenticated else None
+
+
+class ReplicaReadMixin:
+    """
+    APIView 混入：read_from_replica 为 True 时，认证之后对安全方法的请求开启副本读。
+    """
+    read_from_replica = False
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        state = _state.get()
+        if (
+            self.read_from_replica and state is not None and replicas()
+            and request.method in SAFE_METHODS and not is_pinned(request.user)
+        ):
+            state.use_replica = True
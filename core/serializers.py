@@ -1,10 +1,16 @@
 from rest_framework import serializers
+from rest_framework.fields import get_attribute
+from rest_framework.relations import MANY_RELATION_KWARGS
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.contrib.contenttypes.models import ContentType
 from django.conf import settings
 from .models import (
     User, Category, Tag, Post, Comment, 
-    Action, Conversation, PrivateMessage, Notification, StudentIDUpload
+    Action, Conversation, PrivateMessage, Notification, Broadcast,
+    StudentIDUpload
 )
+from .verification import email_domain_allowed
+from .direct_upload import CONTENT_TYPES
 import logging
 
 logger = logging.getLogger(__name__)
@@ -24,6 +30,117 @@ class UserSerializer(serializers.ModelSerializer):
             'openid', 'username'
         ]
 
+class ManyPrimaryKeysField(serializers.ManyRelatedField):
+    """
+    多个主键一次 pk__in 查询校验，不再逐个查询；返回顺序与请求一致，重复的主键只保留一个。
+    """
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        child = self.child_relation
+        queryset = child.get_queryset()
+        pks = []
+        for pk in data:
+            try:
+                pks.append(queryset.model._meta.pk.to_python(pk))
+            except (TypeError, DjangoValidationError):
+                child.fail('incorrect_type', data_type=type(pk).__name__)
+        pks = list(dict.fromkeys(pks))
+        objects = queryset.in_bulk(pks)
+        missing = [pk for pk in pks if pk not in objects]
+        if missing:
+            child.fail('does_not_exist', pk_value=missing[0])
+        return [objects[pk] for pk in pks]
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    many=True 时用 ManyPrimaryKeysField，写接口的查询数不随提交的主键个数增长。
+    """
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return ManyPrimaryKeysField(**list_kwargs)
+
+
+class UserSummarySerializer(serializers.ModelSerializer):
+    """
+    嵌套在帖子、评论、私信等公开数据中的用户摘要，不包含手机号、openid 等资料字段。
+    """
+    class Meta:
+        model = User
+        fields = ['id', 'nickname', 'avatar']
+        read_only_fields = fields
+
+def user_summary_map(context):
+    """
+    按请求缓存的用户摘要（user_id -> dict）。同一响应中多个序列化器共用，
+    没有 request 时退化为按 context 缓存。
+    """
+    request = context.get('request')
+    if request is None:
+        return context.setdefault('_user_summaries', {})
+    summaries = getattr(request, '_user_summaries', None)
+    if summaries is None:
+        summaries = request._user_summaries = {}
+    return summaries
+
+def user_summary(context, obj, field_name):
+    """
+    序列化 obj 上名为 field_name 的用户外键；先按 <field_name>_id 查缓存，命中时不会加载关联用户。
+    """
+    user_id = getattr(obj, f"{field_name}_id")
+    if user_id is None:
+        return None
+    summaries = user_summary_map(context)
+    if user_id not in summaries:
+        summaries[user_id] = UserSummarySerializer(getattr(obj, field_name)).data
+    return summaries[user_id]
+
+class UserSummaryField(serializers.Field):
+    """
+    只读的用户摘要字段，source 为用户外键或（many=True 时）多对多关系。
+    """
+    def __init__(self, many=False, **kwargs):
+        kwargs['read_only'] = True
+        self.many = many
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        if self.many:
+            return super().get_attribute(instance).all()
+        # 返回外键所在的对象，由 to_representation 按 <source>_id 查缓存
+        return get_attribute(instance, self.source_attrs[:-1])
+
+    def to_representation(self, value):
+        if not self.many:
+            return user_summary(self.context, value, self.source_attrs[-1])
+        summaries = user_summary_map(self.context)
+        result = []
+        for user in value:
+            if user.pk not in summaries:
+                summaries[user.pk] = UserSummarySerializer(user).data
+            result.append(summaries[user.pk])
+        return result
+
+class AuthorSummaryField(UserSummaryField):
+    """
+    帖子、评论的作者摘要；匿名内容显示为匿名用户。
+    """
+    def to_representation(self, value):
+        if value.is_anonymous:
+            return {
+                'id': None,
+                'nickname': '匿名用户',
+                'avatar': getattr(settings, 'DEFAULT_ANONYMOUS_AVATAR', '/static/images/anonymous.png')
+            }
+        return super().to_representation(value)
+
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
@@ -37,7 +154,7 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ['slug', 'created_at']
 
 class CommentSerializer(serializers.ModelSerializer):
-    author = serializers.SerializerMethodField()
+    author = AuthorSummaryField()
     replies_count = serializers.SerializerMethodField()
     replies = serializers.SerializerMethodField()
 
@@ -49,25 +166,36 @@ class CommentSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['created_at']
 
-    def get_author(self, obj):
-        if obj.is_anonymous:
-            return {
-                'id': None,
-                'nickname': '匿名用户',
-                'avatar': getattr(settings, 'DEFAULT_ANONYMOUS_AVATAR', '/static/images/anonymous.png')
-            }
-        return UserSerializer(obj.author).data
+    def _children(self, obj):
+        """
+        同一帖子的全部评论一次查出并按 parent 分组，缓存在 context 中，
+        任意层级的回复都从这里取，不再逐条查询。
+        """
+        index = self.context.setdefault('_comment_children', {})
+        if obj.post_id not in index:
+            children = {}
+            comments = (
+                Comment.objects.filter(post_id=obj.post_id, parent__isnull=False)
+                .select_related('author').only(
+                    *[f.attname for f in Comment._meta.concrete_fields],
+                    *[f"author__{name}" for name in UserSummarySerializer.Meta.fields],
+                )
+                .order_by('created_at')
+            )
+            for comment in comments:
+                children.setdefault(comment.parent_id, []).append(comment)
+            index[obj.post_id] = children
+        return index[obj.post_id].get(obj.pk, [])
 
     def get_replies_count(self, obj):
-        return obj.replies.count()
+        return len(self._children(obj))
 
     def get_replies(self, obj):
         # Only get direct replies to prevent deep nesting
-        queryset = obj.replies.all().order_by('created_at')
-        return CommentSerializer(queryset, many=True, context=self.context).data
+        return CommentSerializer(self._children(obj), many=True, context=self.context).data
 
 class PostSerializer(serializers.ModelSerializer):
-    author = serializers.SerializerMethodField()
+    author = AuthorSummaryField()
     category = CategorySerializer(read_only=True)
     tags = TagSerializer(many=True, read_only=True)
     
@@ -79,7 +207,7 @@ class PostSerializer(serializers.ModelSerializer):
         allow_null=True,
         required=False
     )
-    tag_ids = serializers.PrimaryKeyRelatedField(
+    tag_ids = BulkPrimaryKeyRelatedField(
         queryset=Tag.objects.all(),
         source='tags',
         many=True,
@@ -97,15 +225,6 @@ class PostSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['created_at', 'updated_at']
 
-    def get_author(self, obj):
-        if obj.is_anonymous:
-            return {
-                'id': None,
-                'nickname': '匿名用户',
-                'avatar': getattr(settings, 'DEFAULT_ANONYMOUS_AVATAR', '/static/images/anonymous.png')
-            }
-        return UserSerializer(obj.author).data
-
 class ActionSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     target_object = serializers.SerializerMethodField()
@@ -117,6 +236,8 @@ class ActionSerializer(serializers.ModelSerializer):
             'created_at', 'target_object'
         ]
         read_only_fields = ['user', 'created_at']
+        # target_object 通过 GenericForeignKey 取目标，见 core.eager
+        eager_load = {'prefetch': ['target']}
 
     def get_target_object(self, obj):
         if not obj.target:
@@ -137,8 +258,8 @@ class ActionSerializer(serializers.ModelSerializer):
         return None
 
 class PrivateMessageSerializer(serializers.ModelSerializer):
-    sender = UserSerializer(read_only=True)
-    receiver = UserSerializer(read_only=True)
+    sender = UserSummaryField()
+    receiver = UserSummaryField()
 
     class Meta:
         model = PrivateMessage
@@ -150,9 +271,9 @@ class PrivateMessageSerializer(serializers.ModelSerializer):
         read_only_fields = ['sender', 'sent_at']
 
 class ConversationSerializer(serializers.ModelSerializer):
-    participants = UserSerializer(many=True, read_only=True)
+    participants = UserSummaryField(many=True)
     last_message = PrivateMessageSerializer(read_only=True)
-    participant_ids = serializers.PrimaryKeyRelatedField(
+    participant_ids = BulkPrimaryKeyRelatedField(
         queryset=User.objects.all(),
         many=True,
         write_only=True,
@@ -192,15 +313,17 @@ class ConversationSerializer(serializers.ModelSerializer):
 class NotificationSerializer(serializers.ModelSerializer):
     recipient = UserSerializer(read_only=True)
     target_object = serializers.SerializerMethodField()
+    is_broadcast = serializers.SerializerMethodField()
 
     class Meta:
         model = Notification
         fields = [
             'id', 'recipient', 'notif_type', 'content_type',
             'object_id', 'created_at', 'is_read', 'extra_data',
-            'target_object'
+            'target_object', 'is_broadcast'
         ]
         read_only_fields = ['recipient', 'created_at']
+        eager_load = {'prefetch': ['target']}
 
     def get_target_object(self, obj):
         if not obj.target:
@@ -218,16 +341,128 @@ class NotificationSerializer(serializers.ModelSerializer):
                 'id': obj.target.id,
                 'content_preview': obj.target.content[:50]
             }
-        return None 
+        return None
+
+    def get_is_broadcast(self, obj):
+        return False
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # actor_keys 只用于聚合通知的参与人去重，不返回给客户端
+        if isinstance(data.get('extra_data'), dict):
+            data['extra_data'] = {k: v for k, v in data['extra_data'].items() if k != 'actor_keys'}
+        return data
+
+class BroadcastSerializer(serializers.ModelSerializer):
+    """
+    系统公告，输出与 NotificationSerializer 相同的结构，以便合并进通知列表。
+    已读状态由 context['broadcast_watermark'] 决定。id 为 "b:<id>"，不与个人通知的 id 冲突。
+    """
+    id = serializers.SerializerMethodField()
+    recipient = serializers.SerializerMethodField()
+    notif_type = serializers.SerializerMethodField()
+    content_type = serializers.SerializerMethodField()
+    object_id = serializers.SerializerMethodField()
+    is_read = serializers.SerializerMethodField()
+    extra_data = serializers.SerializerMethodField()
+    target_object = serializers.SerializerMethodField()
+    is_broadcast = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Broadcast
+        fields = [
+            'id', 'recipient', 'notif_type', 'content_type',
+            'object_id', 'created_at', 'is_read', 'extra_data',
+            'target_object', 'is_broadcast'
+        ]
+
+    def get_id(self, obj):
+        return f"b:{obj.pk}"
+
+    def get_recipient(self, obj):
+        return None
+
+    def get_notif_type(self, obj):
+        return 'system'
+
+    def get_content_type(self, obj):
+        return None
+
+    def get_object_id(self, obj):
+        return None
+
+    def get_is_read(self, obj):
+        return obj.pk <= self.context.get('broadcast_watermark', 0)
+
+    def get_extra_data(self, obj):
+        return {**(obj.extra_data or {}), 'content': obj.content}
+
+    def get_target_object(self, obj):
+        return None
+
+    def get_is_broadcast(self, obj):
+        return True
 
 class StudentIDUploadSerializer(serializers.ModelSerializer):
     class Meta:
         model = StudentIDUpload
-        fields = ['id', 'image', 'uploaded_at', 'status']
-        read_only_fields = ['id', 'uploaded_at', 'status']
+        fields = ['id', 'image', 'thumbnail', 'uploaded_at', 'processed_at', 'status']
+        read_only_fields = ['id', 'thumbnail', 'uploaded_at', 'processed_at', 'status']
 
     def create(self, validated_data):
         return StudentIDUpload.objects.create(
             user=self.context['request'].user,
             **validated_data
-        )
\ No newline at end of file
+        )
+
+class VerificationReviewSerializer(serializers.ModelSerializer):
+    user_id = serializers.IntegerField(read_only=True)
+    username = serializers.CharField(source='user.username', read_only=True)
+    nickname = serializers.CharField(source='user.nickname', read_only=True)
+    student_id = serializers.CharField(source='user.student_id', read_only=True)
+    department = serializers.CharField(source='user.department', read_only=True)
+    is_verified_user = serializers.BooleanField(source='user.is_verified_user', read_only=True)
+
+    class Meta:
+        model = StudentIDUpload
+        fields = [
+            'id', 'user_id', 'username', 'nickname', 'student_id', 'department',
+            'is_verified_user', 'image', 'thumbnail', 'uploaded_at', 'processed_at',
+            'status', 'review_note'
+        ]
+        read_only_fields = fields
+
+class VerificationDecisionSerializer(serializers.Serializer):
+    approve = serializers.ListField(child=serializers.IntegerField(), default=list, max_length=500)
+    reject = serializers.ListField(child=serializers.IntegerField(), default=list, max_length=500)
+    review_note = serializers.CharField(required=False, allow_blank=True, default='')
+
+    def validate(self, attrs):
+        if not attrs['approve'] and not attrs['reject']:
+            raise serializers.ValidationError("approve 和 reject 不能都为空")
+        if set(attrs['approve']) & set(attrs['reject']):
+            raise serializers.ValidationError("同一条上传不能同时通过和拒绝")
+        return attrs
+
+class DirectUploadRequestSerializer(serializers.Serializer):
+    content_type = serializers.ChoiceField(choices=sorted(CONTENT_TYPES))
+    method = serializers.ChoiceField(choices=['post', 'put'], default='post')
+
+class DirectUploadCompleteSerializer(serializers.Serializer):
+    upload_token = serializers.CharField()
+
+class EmailCodeRequestSerializer(serializers.Serializer):
+    email = serializers.EmailField()
+
+    def validate_email(self, value):
+        value = value.strip().lower()
+        if not email_domain_allowed(value):
+            raise serializers.ValidationError("请使用学校邮箱进行认证")
+        return value
+
+class EmailCodeVerifySerializer(serializers.Serializer):
+    email = serializers.EmailField()
+    code = serializers.RegexField(r'^\d{6}$', error_messages={'invalid': "验证码为 6 位数字"})
+
+    def validate_email(self, value):
+        return value.strip().lower()
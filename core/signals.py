@@ -0,0 +1,16 @@
+"""
+模型信号处理，在 CoreConfig.ready() 中注册。
+"""
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .dedup import release
+from .models import StudentIDUpload
+
+
+@receiver(post_delete, sender=StudentIDUpload)
+def release_upload_files(sender, instance, **kwargs):
+    # 用信号而不是 Model.delete()：queryset.delete() 和删除用户时的级联删除也会释放引用
+    for field in (instance.image, instance.thumbnail):
+        if field:
+            release(field.storage, field.name, delete_untracked=False)
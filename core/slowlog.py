@@ -0,0 +1,190 @@
+"""
+慢查询日志。
+
+SlowQueryMiddleware 在请求期间用 execute_wrapper 计时所有 SQL，耗时超过 SLOW_QUERY_THRESHOLD_MS
+的查询连同来源视图和调用栈记下来，请求结束后按归一化 SQL 指纹（字面量、参数、IN 列表替换为占位符）
+聚合写入 SlowQuery 表，在 admin 中按总耗时排序查看。
+
+某个指纹首次出现或出现了新的最慢耗时时，用同一条 SQL 和参数执行 EXPLAIN
+（PostgreSQL 为 EXPLAIN，SQLite 为 EXPLAIN QUERY PLAN）保存执行计划，
+因此只有持续变慢的查询才会反复 EXPLAIN。
+"""
+import hashlib
+import logging
+import re
+import time
+import traceback
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connections, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .metrics import route_label, wrap_queries
+
+logger = logging.getLogger(__name__)
+
+STACK_DEPTH = 12
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_SPACE = re.compile(r"\s+")
+
+# 不计入调用栈的文件：插桩本身
+_INSTRUMENTATION = {str(Path(__file__).with_name(name)) for name in ('slowlog.py', 'metrics.py')}
+
+
+def normalize(sql):
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _IN_LIST.sub('(...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def fingerprint(normalized):
+    return hashlib.sha1(normalized.encode()).hexdigest()
+
+
+def threshold():
+    value = getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', None)
+    return None if value is None else value / 1000
+
+
+def _stack():
+    """
+    项目代码中的调用栈（不含第三方库）；没有项目帧时退回最近的几帧。
+    """
+    frames = traceback.extract_stack()[:-2]
+    root = str(settings.BASE_DIR)
+    own = [
+        f for f in frames
+        if f.filename.startswith(root) and 'site-packages' not in f.filename
+        and f.filename not in _INSTRUMENTATION
+    ]
+    return ''.join(traceback.format_list((own or frames)[-STACK_DEPTH:]))
+
+
+class SlowQueryCollector:
+    """
+    execute_wrapper：收集本次请求中超过阈值的查询。
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.samples = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            if elapsed >= self.limit:
+                self.samples.append({
+                    'alias': context['connection'].alias, 'sql': sql,
+                    'params': None if many else params, 'elapsed': elapsed, 'stack': _stack(),
+                })
+
+
+def explain(alias, sql, params):
+    if params is None or not sql.lstrip()[:6].upper() == 'SELECT':
+        return ''
+    connection = connections[alias]
+    prefix = connection.ops.explain_query_prefix()
+    try:
+        # 放在 savepoint 中，EXPLAIN 失败不会中止外层事务
+        with transaction.atomic(using=alias), connection.cursor() as cursor:
+            cursor.execute(f"{prefix} {sql}", params)
+            rows = cursor.fetchall()
+    except DatabaseError as e:
+        logger.warning(f"EXPLAIN failed: {str(e)}")
+        return ''
+    # PostgreSQL 每行一列；SQLite 的 QUERY PLAN 最后一列是说明
+    return '\n'.join(str(row[-1]) for row in rows)
+
+
+def record(samples, view):
+    """
+    按指纹聚合本次请求的慢查询并写入 SlowQuery。
+    """
+    from .models import SlowQuery
+
+    grouped = {}
+    for sample in samples:
+        normalized = normalize(sample['sql'])
+        group = grouped.setdefault(fingerprint(normalized), {
+            'sql': normalized, 'count': 0, 'total': 0.0, 'slowest': sample,
+        })
+        group['count'] += 1
+        group['total'] += sample['elapsed']
+        if sample['elapsed'] > group['slowest']['elapsed']:
+            group['slowest'] = sample
+
+    for key, group in grouped.items():
+        slowest = group['slowest']
+        max_ms = slowest['elapsed'] * 1000
+        row, created = SlowQuery.objects.get_or_create(fingerprint=key, defaults={'sql': group['sql']})
+        updates = {
+            'count': F('count') + group['count'],
+            'total_time': F('total_time') + group['total'] * 1000,
+            'max_time': Greatest(F('max_time'), max_ms),
+            'last_view': view[:200],
+            'last_seen': timezone.now(),
+        }
+        if created or max_ms > row.max_time:
+            updates['stack'] = slowest['stack']
+            updates['plan'] = explain(slowest['alias'], slowest['sql'], slowest['params'])
+        SlowQuery.objects.filter(pk=row.pk).update(**updates)
+
+
+def _record_safely(samples, view):
+    try:
+        record(samples, view)
+    except Exception as e:
+        logger.error(f"Recording slow queries for {view} failed: {str(e)}")
+
+
+class SlowQueryMiddleware:
+    """
+    SLOW_QUERY_THRESHOLD_MS 为 None 时不启用。同时支持同步和异步请求。
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', None) is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        limit = threshold()
+        if limit is None:
+            return self.get_response(request)
+        collector = SlowQueryCollector(limit)
+        with wrap_queries(collector):
+            response = self.get_response(request)
+        if collector.samples:
+            _record_safely(collector.samples, route_label(request))
+        return response
+
+    async def __acall__(self, request):
+        limit = threshold()
+        if limit is None:
+            return await self.get_response(request)
+        collector = SlowQueryCollector(limit)
+        with wrap_queries(collector):
+            response = await self.get_response(request)
+        if collector.samples:
+            await sync_to_async(_record_safely)(collector.samples, route_label(request))
+        return response
@@ -1,9 +1,59 @@
 # core/storages.py
+import hashlib
+import time
+
 from storages.backends.s3boto3 import S3Boto3Storage
 from django.conf import settings
+from django.core.cache import cache
 # No need to import or define custom_boto3_client_config here anymore
 
-class MediaStorage(S3Boto3Storage):
+
+class SignedURLCacheMixin:
+    """
+    在同一个时间窗口内复用预签名 URL，避免每次 .url() 都重新计算 SigV4 签名，
+    同一对象在窗口内得到相同的 URL，CDN 和浏览器缓存也能命中。
+
+    先查进程内字典，再查 Django cache（CACHES['default']），都没有才签名。只有配置了共享缓存
+    （REDIS_URL）时多个 worker 才会得到同一个 URL；默认的 LocMem 缓存各进程独立，只省去本进程的重复签名。
+    窗口长度由 MEDIA_URL_CACHE_WINDOW 设置，不超过签名有效期（AWS_QUERYSTRING_EXPIRE）的一半，
+    保证窗口末尾取到的 URL 仍有足够的有效期。
+    """
+    url_cache_max_entries = 10000
+
+    def url_cache_window(self):
+        return getattr(settings, 'MEDIA_URL_CACHE_WINDOW', 1800)
+
+    def _signs_urls(self):
+        return self.querystring_auth and (not self.custom_domain or self.cloudfront_signer)
+
+    def url(self, name, parameters=None, expire=None, http_method=None):
+        if parameters or expire is not None or http_method or not self._signs_urls():
+            return super().url(name, parameters, expire, http_method)
+
+        now = time.time()
+        size = max(1, min(self.url_cache_window(), self.querystring_expire // 2))
+        window = int(now // size)
+        local = self.__dict__.get('_url_cache')
+        if local is None or local['window'] != window or len(local['urls']) > self.url_cache_max_entries:
+            # 进入新窗口时整体替换，旧窗口的 URL 不再使用
+            local = {'window': window, 'urls': {}}
+            self._url_cache = local
+        url = local['urls'].get(name)
+        if url is not None:
+            return url
+
+        digest = hashlib.md5(f"{self.bucket_name}/{name}".encode(), usedforsecurity=False).hexdigest()
+        cache_key = f"media-url:{size}:{window}:{digest}"
+        url = cache.get(cache_key)
+        if url is None:
+            url = super().url(name)
+            remaining = (window + 1) * size - now
+            cache.set(cache_key, url, timeout=max(1, int(remaining)))
+        local['urls'][name] = url
+        return url
+
+
+class MediaStorage(SignedURLCacheMixin, S3Boto3Storage):
     location = "media"
     file_overwrite = False
     querystring_auth = True
@@ -12,4 +62,4 @@ class MediaStorage(S3Boto3Storage):
 class StaticStorage(S3Boto3Storage):
     location = "static"
     # querystring_auth = getattr(settings, 'AWS_STATIC_QUERYSTRING_AUTH', False)
-    # The 'config' attribute is removed, it will use settings.AWS_S3_CLIENT_CONFIG
\ No newline at end of file
+    # The 'config' attribute is removed, it will use settings.AWS_S3_CLIENT_CONFIG
@@ -0,0 +1,235 @@
+"""
+生成大规模合成数据，供 bench_api 等压测使用。
+
+全部用 bulk_create 分批写入，不走 save()/信号，内存中只保留各表的主键列表；
+每批单独提交一个事务，避免整个数据集堆在一个事务里长时间持锁，中途失败时已提交的批次保留。
+同一 seed 生成的数据分布相同。生成的用户名以 PREFIX 开头，密码不可用。
+未读通知计数（NotificationCounter）不在这里维护，首次读取时会按真实未读数惰性初始化。
+"""
+import random
+from datetime import timedelta
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .models import (
+    Action, Category, Comment, Conversation, Notification, Post, PrivateMessage, Tag, User,
+)
+
+PREFIX = 'synthetic_'
+
+DEFAULT_VOLUMES = {
+    'users': 1000,
+    'categories': 20,
+    'tags': 200,
+    'posts': 10000,
+    'comments': 50000,
+    'actions': 100000,
+    'conversations': 2000,
+    'messages': 20000,
+    'notifications': 50000,
+}
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Generator:
+    def __init__(self, volumes, batch_size=5000, seed=0, days=365, log=None):
+        self.volumes = {**DEFAULT_VOLUMES, **volumes}
+        self.batch_size = batch_size
+        self.random = random.Random(seed)
+        self.now = timezone.now()
+        self.days = days
+        self.log = log or (lambda message: None)
+
+    def run(self):
+        self.users()
+        self.categories()
+        self.tags()
+        self.posts()
+        self.comments()
+        self.actions()
+        self.conversations()
+        self.notifications()
+
+    def _insert(self, model, objects, label):
+        pks = []
+        for batch in batched(objects, self.batch_size):
+            with transaction.atomic():
+                pks.extend(obj.pk for obj in model.objects.bulk_create(batch))
+        self.log(f"{label}: {len(pks)}")
+        return pks
+
+    def _insert_rows(self, model, objects, label):
+        # 关联表等不需要主键的行
+        count = 0
+        for batch in batched(objects, self.batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(batch)
+            count += len(batch)
+        self.log(f"{label}: {count}")
+
+    def _time(self):
+        return self.now - timedelta(seconds=self.random.randrange(self.days * 86400))
+
+    def _text(self, words):
+        return ' '.join(f"w{self.random.randrange(5000)}" for _ in range(words))
+
+    def users(self):
+        # 所有用户共用一个不可用密码，避免逐个哈希
+        password = make_password(None)
+        start = User.objects.count()
+        self.user_ids = self._insert(User, (
+            User(
+                username=f"{PREFIX}{start + i}", password=password, nickname=f"用户{start + i}",
+                is_verified_user=self.random.random() < 0.7, date_joined=self._time(),
+            )
+            for i in range(self.volumes['users'])
+        ), 'users')
+
+    def categories(self):
+        start = Category.objects.count()
+        self.category_ids = self._insert(Category, (
+            Category(name=f"{PREFIX}category {start + i}", slug=f"{PREFIX}category-{start + i}")
+            for i in range(self.volumes['categories'])
+        ), 'categories')
+
+    def tags(self):
+        start = Tag.objects.count()
+        self.tag_ids = self._insert(Tag, (
+            Tag(name=f"{PREFIX}tag {start + i}", slug=f"{PREFIX}tag-{start + i}")
+            for i in range(self.volumes['tags'])
+        ), 'tags')
+
+    def posts(self):
+        self.post_ids = []
+        if not self.user_ids:
+            return
+        self.post_ids = self._insert(Post, (
+            Post(
+                title=self._text(6), content=self._text(80),
+                author_id=self.random.choice(self.user_ids),
+                category_id=self.random.choice(self.category_ids) if self.category_ids else None,
+                status='published' if self.random.random() < 0.9 else 'draft',
+                is_anonymous=self.random.random() < 0.1, created_at=self._time(),
+            )
+            for _ in range(self.volumes['posts'])
+        ), 'posts')
+        if not self.tag_ids:
+            return
+        through = Post.tags.through
+        self._insert_rows(through, (
+            through(post_id=post_id, tag_id=tag_id)
+            for post_id in self.post_ids
+            for tag_id in self.random.sample(self.tag_ids, min(len(self.tag_ids), self.random.randint(1, 3)))
+        ), 'post tags')
+
+    def comments(self):
+        """
+        一半是顶层评论，其余逐层回复上一层的评论，最多三层。
+        """
+        total = self.volumes['comments']
+        sizes = [total - total // 2, total // 4, total - (total - total // 2) - total // 4]
+        self.comment_ids = []
+        if not self.post_ids:
+            return
+        parents = None
+        for depth, size in enumerate(sizes):
+            if not size or (parents is not None and not parents):
+                break
+            rows = []
+            for _ in range(size):
+                if parents is None:
+                    post_id, parent_id = self.random.choice(self.post_ids), None
+                else:
+                    parent_id, post_id = self.random.choice(parents)
+                rows.append((post_id, parent_id))
+            ids = self._insert(Comment, (
+                Comment(
+                    post_id=post_id, parent_id=parent_id, author_id=self.random.choice(self.user_ids),
+                    content=self._text(20), is_anonymous=self.random.random() < 0.1,
+                    created_at=self._time(),
+                )
+                for post_id, parent_id in rows
+            ), f"comments (depth {depth})")
+            parents = [(pk, post_id) for pk, (post_id, _) in zip(ids, rows)]
+            self.comment_ids.extend(ids)
+
+    def actions(self):
+        """
+        点赞/收藏，四分之三指向帖子、其余指向评论。
+        按 (用户, 类型, 目标) 枚举保证唯一：第 i 条的用户为 i % 用户数，
+        同一用户的目标从随机偏移处依次递增，数量超过 用户数 × 目标数 × 2 时截断。
+        """
+        post_type = ContentType.objects.get_for_model(Post)
+        comment_type = ContentType.objects.get_for_model(Comment)
+        targets = [(post_type.pk, pk) for pk in self.post_ids]
+        targets += [(comment_type.pk, pk) for pk in self.comment_ids[:len(self.post_ids) // 3]]
+        if not targets or not self.user_ids:
+            return
+        users = len(self.user_ids)
+        total = min(self.volumes['actions'], users * len(targets) * 2)
+        offsets = [self.random.randrange(len(targets)) for _ in range(users)]
+
+        def rows():
+            for i in range(total):
+                user, j = i % users, i // users
+                content_type_id, object_id = targets[(offsets[user] + j // 2) % len(targets)]
+                yield Action(
+                    user_id=self.user_ids[user], action_type='like' if j % 2 == 0 else 'favorite',
+                    content_type_id=content_type_id, object_id=object_id, created_at=self._time(),
+                )
+
+        self._insert_rows(Action, rows(), 'actions')
+
+    def conversations(self):
+        if len(self.user_ids) < 2 or not self.volumes['conversations']:
+            return
+        pairs = [tuple(self.random.sample(self.user_ids, 2)) for _ in range(self.volumes['conversations'])]
+        conversation_ids = self._insert(Conversation, (
+            Conversation(created_at=self._time()) for _ in pairs
+        ), 'conversations')
+        through = Conversation.participants.through
+        self._insert_rows(through, (
+            through(conversation_id=conversation_id, user_id=user_id)
+            for conversation_id, pair in zip(conversation_ids, pairs)
+            for user_id in pair
+        ), 'participants')
+
+        def messages():
+            for _ in range(self.volumes['messages']):
+                index = self.random.randrange(len(pairs))
+                sender, receiver = pairs[index] if self.random.random() < 0.5 else pairs[index][::-1]
+                yield PrivateMessage(
+                    conversation_id=conversation_ids[index], sender_id=sender, receiver_id=receiver,
+                    content=self._text(12), sent_at=self._time(), is_read=self.random.random() < 0.8,
+                )
+
+        self._insert_rows(PrivateMessage, messages(), 'messages')
+        Conversation.objects.filter(pk__in=conversation_ids).update(last_message=Subquery(
+            PrivateMessage.objects.filter(conversation=OuterRef('pk'))
+            .order_by('-sent_at').values('pk')[:1]
+        ))
+
+    def notifications(self):
+        post_type = ContentType.objects.get_for_model(Post)
+        if not self.post_ids:
+            return
+        self._insert_rows(Notification, (
+            Notification(
+                recipient_id=self.random.choice(self.user_ids),
+                notif_type=self.random.choice(('like', 'comment', 'reply', 'mention')),
+                content_type_id=post_type.pk, object_id=self.random.choice(self.post_ids),
+                is_read=self.random.random() < 0.6, created_at=self._time(),
+                extra_data={'actors': [self.random.choice(self.user_ids)]},
+            )
+            for _ in range(self.volumes['notifications'])
+        ), 'notifications')
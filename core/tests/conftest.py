@@ -5,10 +5,18 @@ from core.models import User
 from core.tests.factories import UserFactory
 from django.conf import settings as django_settings
 from django.core.files.storage import InMemoryStorage
+from django.core.cache import cache
 from unittest.mock import MagicMock 
 
 pytestmark = pytest.mark.django_db
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # 测试回滚后主键会被复用，缓存中的用户/令牌版本不能跨测试保留
+    cache.clear()
+    yield
+    cache.clear()
+
 @pytest.fixture
 def api_client():
     return APIClient()
@@ -1,5 +1,8 @@
 import factory
-from core.models import User, Post, Comment, Category, Tag
+from core.models import (
+    User, Post, Comment, Category, Tag, Action, Conversation, PrivateMessage,
+    Notification, StudentIDUpload
+)
 
 class UserFactory(factory.django.DjangoModelFactory):
     class Meta:
@@ -57,4 +60,45 @@ class CommentFactory(factory.django.DjangoModelFactory):
     content = factory.Faker('text')
     author = factory.SubFactory(UserFactory)
     post = factory.SubFactory(PostFactory)
-    is_anonymous = False 
\ No newline at end of file
+    is_anonymous = False
+
+class ActionFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Action
+
+    user = factory.SubFactory(UserFactory)
+    action_type = 'like'
+    target = factory.SubFactory(PostFactory)
+
+class ConversationFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Conversation
+
+    @factory.post_generation
+    def participants(self, create, extracted, **kwargs):
+        if create and extracted:
+            self.participants.add(*extracted)
+
+class PrivateMessageFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = PrivateMessage
+
+    conversation = factory.SubFactory(ConversationFactory)
+    sender = factory.SubFactory(UserFactory)
+    receiver = factory.SubFactory(UserFactory)
+    content = factory.Faker('sentence')
+
+class NotificationFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Notification
+
+    recipient = factory.SubFactory(UserFactory)
+    notif_type = 'like'
+    target = factory.SubFactory(PostFactory)
+
+class StudentIDUploadFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = StudentIDUpload
+
+    user = factory.SubFactory(UserFactory, is_verified_user=False)
+    image = factory.Sequence(lambda n: f'student_ids/upload{n}.jpg')
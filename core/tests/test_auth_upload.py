@@ -2,15 +2,24 @@ import io
 import pytest
 from PIL import Image
 from django.urls import reverse
-from core.models import StudentIDUpload  # 替换为你的模型路径
+from core.models import StoredObject, StudentIDUpload  # 替换为你的模型路径
+from core.imaging import process_image
+from core.tests.factories import StudentIDUploadFactory
 
 pytestmark = pytest.mark.django_db
 
-def create_test_image(format='JPEG', size=(100, 100), color='blue', name='test.jpg'):
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    """上传、处理和删除的文件写到临时目录，不落到开发用的 MEDIA_ROOT"""
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+def create_test_image(format='JPEG', size=(100, 100), color='blue', name='test.jpg', **kwargs):
     """生成内存中的测试图片文件"""
     image = Image.new('RGB', size, color=color)
     byte_io = io.BytesIO()
-    image.save(byte_io, format)
+    image.save(byte_io, format, **kwargs)
     byte_io.name = name
     byte_io.seek(0)
     return byte_io
@@ -31,7 +40,9 @@ class TestStudentIDUpload:
         assert response.status_code == 201
         data = response.data
         assert data['status'] == 'pending'
-        assert 'image_url' in data
+        # 原图处理后会被删除，处理完成前不返回图片地址
+        assert data['processed_at'] is None
+        assert data['image_url'] is None
 
         upload = StudentIDUpload.objects.get(id=data['id'])
         assert upload.user == test_user
@@ -88,3 +99,153 @@ class TestStudentIDUpload:
     #         url, {'image': large_image}, format='multipart'
     #     )
     #     assert response.status_code in (400, 413)
+
+
+def rotated_exif():
+    """EXIF 方向 6：需要顺时针旋转 90° 才能正确显示，并附带一个 GPS 字段"""
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    exif[0x8825] = {1: 'N'}
+    return exif
+
+
+class TestStudentIDProcessing:
+
+    def test_process_image_orients_strips_and_downscales(self, settings):
+        """
+        处理后按 EXIF 摆正、不再带 EXIF，长边不超过上限，缩略图不超过缩略图尺寸
+        """
+        settings.STUDENT_ID_MAX_DIMENSION = 300
+        settings.STUDENT_ID_THUMBNAIL_SIZE = 50
+        source = create_test_image(size=(600, 400), exif=rotated_exif())
+
+        main, thumb = process_image(source)
+
+        with Image.open(io.BytesIO(main)) as image:
+            assert image.format == 'JPEG'
+            assert image.size == (200, 300)
+            assert not image.getexif()
+        with Image.open(io.BytesIO(thumb)) as image:
+            assert max(image.size) == 50
+
+    def test_process_image_converts_png_with_alpha(self):
+        """
+        带透明通道的 PNG 也会转成 JPEG
+        """
+        source = io.BytesIO()
+        image = Image.new('RGBA', (40, 40), (0, 0, 255, 128))
+        image.save(source, 'PNG')
+        source.seek(0)
+
+        main, _ = process_image(source)
+        with Image.open(io.BytesIO(main)) as image:
+            assert image.mode == 'RGB'
+
+    def test_upload_processed_after_commit(
+        self, authenticated_client, settings, django_capture_on_commit_callbacks
+    ):
+        """
+        接口立即返回，事务提交后生成压缩图和缩略图并删除原图；处理完成后查询接口返回最终地址
+        """
+        settings.IMAGE_PROCESSING_EAGER = True
+        url = reverse('api_v1:upload-idcard')
+        image_file = create_test_image(format='PNG', size=(800, 600), name='card.png')
+
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            response = authenticated_client.post(url, {'image': image_file}, format='multipart')
+            upload = StudentIDUpload.objects.get(id=response.data['id'])
+            original_name = upload.image.name
+            assert upload.processed_at is None
+            assert not upload.thumbnail
+
+        assert response.status_code == 201
+        assert response.data['image_url'] is None
+        assert callbacks
+
+        upload.refresh_from_db()
+        assert upload.processed_at is not None
+        assert upload.image.name.endswith('.jpg')
+        assert upload.thumbnail.name.startswith('student_ids/thumbs/')
+        assert not upload.image.storage.exists(original_name)
+        with upload.thumbnail.open('rb') as f, Image.open(f) as thumb:
+            assert max(thumb.size) <= settings.STUDENT_ID_THUMBNAIL_SIZE
+
+        detail = authenticated_client.get(reverse('api_v1:upload-idcard-detail', kwargs={'pk': upload.pk}))
+        assert detail.status_code == 200
+        assert detail.data['processed_at'] is not None
+        assert detail.data['image_url'] == upload.image.url
+        assert detail.data['thumbnail_url'] == upload.thumbnail.url
+
+    def test_upload_detail_only_for_owner(self, api_client, another_user):
+        """
+        只能查询自己的上传记录
+        """
+        upload = StudentIDUploadFactory()
+        api_client.force_authenticate(user=another_user)
+        response = api_client.get(reverse('api_v1:upload-idcard-detail', kwargs={'pk': upload.pk}))
+        assert response.status_code == 404
+
+    def test_duplicate_upload_reuses_stored_objects(
+        self, authenticated_client, settings, django_capture_on_commit_callbacks
+    ):
+        """
+        同一张图片重复上传时不再写存储和处理，直接引用已处理的图片；删除记录时释放引用
+        """
+        settings.IMAGE_PROCESSING_EAGER = True
+        url = reverse('api_v1:upload-idcard')
+        content = create_test_image(size=(800, 600), color='red').getvalue()
+
+        def upload():
+            image_file = io.BytesIO(content)
+            image_file.name = 'card.jpg'
+            with django_capture_on_commit_callbacks(execute=True):
+                response = authenticated_client.post(url, {'image': image_file}, format='multipart')
+            assert response.status_code == 201
+            return StudentIDUpload.objects.get(id=response.data['id'])
+
+        first = upload()
+        second = upload()
+
+        assert second.processed_at is not None
+        assert second.image.name == first.image.name
+        assert second.thumbnail.name == first.thumbnail.name
+        assert second.content_hash == first.content_hash
+        assert StoredObject.objects.get(name=first.image.name).ref_count == 2
+        # 原图在处理后被释放，只剩压缩图和缩略图
+        assert StoredObject.objects.count() == 2
+
+        with django_capture_on_commit_callbacks(execute=True):
+            second.delete()
+        assert StoredObject.objects.get(name=first.image.name).ref_count == 1
+        assert first.image.storage.exists(first.image.name)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            first.delete()
+        assert not StoredObject.objects.exists()
+        assert not first.image.storage.exists(first.image.name)
+
+    def test_bulk_and_cascade_deletes_release_files(
+        self, authenticated_client, test_user, settings, django_capture_on_commit_callbacks
+    ):
+        """
+        queryset 删除和删除用户时的级联删除同样释放引用并删除文件
+        """
+        settings.IMAGE_PROCESSING_EAGER = True
+        url = reverse('api_v1:upload-idcard')
+        content = create_test_image(size=(800, 600), color='green').getvalue()
+        for _ in range(2):
+            image_file = io.BytesIO(content)
+            image_file.name = 'card.jpg'
+            with django_capture_on_commit_callbacks(execute=True):
+                authenticated_client.post(url, {'image': image_file}, format='multipart')
+        first = StudentIDUpload.objects.earliest('id')
+        assert StoredObject.objects.get(name=first.image.name).ref_count == 2
+
+        with django_capture_on_commit_callbacks(execute=True):
+            StudentIDUpload.objects.filter(pk=first.pk).delete()
+        assert StoredObject.objects.get(name=first.image.name).ref_count == 1
+
+        with django_capture_on_commit_callbacks(execute=True):
+            test_user.delete()
+        assert not StoredObject.objects.exists()
+        assert not first.image.storage.exists(first.image.name)
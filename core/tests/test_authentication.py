@@ -0,0 +1,75 @@
+import time
+
+import pytest
+from django.db.models import F
+from rest_framework.test import APIRequestFactory
+from core.authentication import (
+    PrincipalJWTAuthentication, TokenPrincipal, invalidate_principals
+)
+from core.models import User
+from core.views import generate_jwt_token_for_user
+
+pytestmark = pytest.mark.django_db
+
+
+def authenticate(token):
+    request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+    user, _ = PrincipalJWTAuthentication().authenticate(request)
+    return user
+
+
+class TestTokenPrincipal:
+    def test_permission_claims_need_no_query(self, test_user, django_assert_num_queries):
+        token = generate_jwt_token_for_user(test_user)['access']
+        with django_assert_num_queries(0):
+            user = authenticate(token)
+            assert isinstance(user, TokenPrincipal)
+            assert user.is_authenticated and user.is_verified_user
+            assert user.id == test_user.id and not user.is_staff
+
+        # 需要完整用户时才从数据库加载，每个请求最多一次
+        with django_assert_num_queries(1):
+            assert user.username == test_user.username
+            assert isinstance(user, User)
+            assert user.nickname == test_user.nickname
+
+    def test_loaded_user_overrides_claims(self, test_user):
+        # 加载后请求中对用户的修改（如邮箱认证、撤销管理员）以用户对象为准
+        test_user.is_verified_user = False
+        test_user.save()
+        token = generate_jwt_token_for_user(test_user)['access']
+        user = authenticate(token)
+        assert user.is_verified_user is False
+        user.is_verified_user = True
+        user.is_staff = True
+        assert user.is_verified_user is True and user.is_staff is True
+
+    def test_verification_change_invalidates_claims(self, test_user):
+        token = generate_jwt_token_for_user(test_user)['access']
+        test_user.is_verified_user = False
+        test_user.save(update_fields=['is_verified_user'])
+
+        user = authenticate(token)
+        assert not isinstance(user, TokenPrincipal)
+        assert user.is_verified_user is False
+
+    def test_version_cache_is_bounded(self, test_user, settings):
+        from django.core.cache import cache
+        from core.authentication import version_cache_key
+
+        # 进程内缓存不在 worker 之间同步，版本号只缓存有限时间，其它 worker 过期后会重新查库
+        settings.TOKEN_VERSION_CACHE_TIMEOUT = 0.01
+        cache.delete(version_cache_key(test_user.pk))
+        token = generate_jwt_token_for_user(test_user)['access']
+        assert isinstance(authenticate(token), TokenPrincipal)
+        User.objects.filter(pk=test_user.pk).update(token_version=F('token_version') + 1)
+        time.sleep(0.05)
+        assert cache.get(version_cache_key(test_user.pk)) is None
+        assert not isinstance(authenticate(token), TokenPrincipal)
+
+    def test_bulk_invalidation(self, test_user, django_capture_on_commit_callbacks):
+        token = generate_jwt_token_for_user(test_user)['access']
+        with django_capture_on_commit_callbacks(execute=True):
+            User.objects.filter(pk=test_user.pk).update(is_verified_user=False)
+            invalidate_principals([test_user.pk])
+        assert authenticate(token).is_verified_user is False
@@ -0,0 +1,108 @@
+import json
+import runpy
+from io import StringIO
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connections
+from django.db.models import F
+
+from core.models import Action, Comment, Conversation, Notification, Post, PrivateMessage, User
+from core.synthetic import PREFIX
+
+pytestmark = pytest.mark.django_db
+
+VOLUMES = {
+    'users': 20, 'categories': 3, 'tags': 10, 'posts': 40, 'comments': 80,
+    'actions': 300, 'conversations': 10, 'messages': 50, 'notifications': 60,
+}
+
+
+def generate(**volumes):
+    args = [f'--{name}={count}' for name, count in {**VOLUMES, **volumes}.items()]
+    call_command('generate_synthetic_data', *args, '--batch-size=16', stdout=StringIO())
+
+
+class TestSyntheticData:
+    def test_generates_requested_volumes(self):
+        """
+        按指定数量批量生成各类数据，评论形成多层回复，会话的最后一条消息已回填
+        """
+        generate()
+        assert User.objects.filter(username__startswith=PREFIX).count() == 20
+        assert Post.objects.count() == 40
+        assert Post.tags.through.objects.count() >= 40
+        assert Comment.objects.count() == 80
+        assert Comment.objects.filter(parent__isnull=True).count() == 40
+        assert Comment.objects.filter(parent__parent__isnull=False).exists()
+        assert not Comment.objects.filter(parent__isnull=False).exclude(post=F('parent__post')).exists()
+        assert Action.objects.count() == 300
+        assert Action.objects.filter(action_type='favorite').exists()
+        assert Conversation.objects.count() == 10
+        assert Conversation.participants.through.objects.count() == 20
+        assert PrivateMessage.objects.count() == 50
+        assert not Conversation.objects.filter(messages__isnull=False, last_message__isnull=True).exists()
+        assert Notification.objects.count() == 60
+
+    def test_can_run_twice(self):
+        """
+        重复执行时追加数据，用户名、slug 和点赞的唯一约束不冲突
+        """
+        generate(actions=20 * 50 * 2)
+        generate()
+        assert User.objects.filter(username__startswith=PREFIX).count() == 40
+
+
+class TestBenchApi:
+    def test_records_and_compares_runs(self, tmp_path):
+        """
+        回放请求后追加一行结果，第二次运行与上一次对比
+        """
+        generate()
+        output = tmp_path / 'results.jsonl'
+        args = ['--requests=20', '--warmup=2', '--users=5', f'--output={output}']
+
+        call_command('bench_api', *args, '--label=first', stdout=StringIO())
+        stdout = StringIO()
+        call_command('bench_api', *args, '--label=second', stdout=stdout)
+
+        runs = [json.loads(line) for line in output.read_text().splitlines()]
+        assert [run['label'] for run in runs] == ['first', 'second']
+        assert runs[1]['dataset']['post'] == 40
+        scenarios = runs[1]['scenarios']
+        assert sum(row['count'] for row in scenarios.values()) == 20
+        assert all(row['errors'] == 0 for row in scenarios.values())
+        assert all(row['queries_mean'] > 0 for row in scenarios.values())
+        assert 'Compared with' in stdout.getvalue()
+
+
+class TestDatabaseConnections:
+    @pytest.mark.parametrize('pool, conn_max_age', [('true', 0), ('false', 600)])
+    def test_production_profile(self, monkeypatch, pool, conn_max_age):
+        """
+        生产配置在连接池和持久连接之间二选一，两者都开启健康检查；只读副本与主库连接参数相同
+        """
+        monkeypatch.setenv('DB_PROFILE', 'production')
+        monkeypatch.setenv('DB_POOL', pool)
+        monkeypatch.setenv('POSTGRES_REPLICA_HOSTS', 'replica-a, replica-b')
+        config = runpy.run_path(str(settings.BASE_DIR / 'huijia' / 'settings.py'))
+        database = config['DATABASES']['default']
+
+        assert database['ENGINE'] == 'django.db.backends.postgresql'
+        assert database['CONN_MAX_AGE'] == conn_max_age
+        assert database['CONN_HEALTH_CHECKS']
+        assert ('pool' in database['OPTIONS']) == (pool == 'true')
+        assert config['DATABASE_REPLICAS'] == ['replica_0', 'replica_1']
+        assert config['DATABASES']['replica_1']['HOST'] == 'replica-b'
+
+    def test_bench_db_connections(self):
+        """
+        对比每请求新建连接与持久连接的开销，不注册新的连接别名
+        """
+        stdout = StringIO()
+        call_command('bench_db_connections', '--requests=5', stdout=stdout)
+        output = stdout.getvalue()
+        assert 'per-request:' in output
+        assert 'persistent:' in output
+        assert not [alias for alias in connections.settings if alias.startswith('bench_')]
@@ -0,0 +1,129 @@
+import io
+import pytest
+import requests
+from botocore.config import Config as BotocoreConfig
+from django.urls import reverse
+from PIL import Image
+from core.models import StudentIDUpload
+from core.storages import MediaStorage
+
+moto_server = pytest.importorskip('moto.server')
+
+pytestmark = pytest.mark.django_db
+
+BUCKET = 'huijia-test'
+
+
+@pytest.fixture(scope='module')
+def s3_endpoint():
+    """以 server 模式启动 moto，作为本地的 S3 兼容存储"""
+    server = moto_server.ThreadedMotoServer(ip_address='127.0.0.1', port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    yield f"http://{host}:{port}"
+    server.stop()
+
+
+@pytest.fixture
+def s3_storage(s3_endpoint, monkeypatch):
+    """把 StudentIDUpload.image 的存储换成指向 moto 的 MediaStorage"""
+    storage = MediaStorage(
+        bucket_name=BUCKET,
+        endpoint_url=s3_endpoint,
+        access_key='testing',
+        secret_key='testing',
+        region_name='us-east-1',
+        client_config=BotocoreConfig(signature_version='s3v4', s3={'addressing_style': 'path'}),
+    )
+    storage.connection.meta.client.create_bucket(Bucket=BUCKET)
+    monkeypatch.setattr(StudentIDUpload._meta.get_field('image'), 'storage', storage)
+    return storage
+
+
+def jpeg_bytes():
+    buf = io.BytesIO()
+    Image.new('RGB', (64, 48), 'blue').save(buf, 'JPEG')
+    return buf.getvalue()
+
+
+def presign(client, content_type='image/jpeg', method='post'):
+    response = client.post(
+        reverse('api_v1:upload-idcard-presign'), {'content_type': content_type, 'method': method}
+    )
+    assert response.status_code == 200
+    return response.data
+
+
+def complete(client, token):
+    return client.post(reverse('api_v1:upload-idcard-complete'), {'upload_token': token})
+
+
+class TestDirectUpload:
+    def test_presigned_post_and_complete(self, authenticated_client, test_user, s3_storage):
+        """
+        预签名 POST 直传到存储，complete 后创建记录；重复 complete 返回同一条记录
+        """
+        data = presign(authenticated_client)
+        upload = requests.post(
+            data['url'], data=data['fields'], files={'file': ('id.jpg', jpeg_bytes())}
+        )
+        assert upload.status_code in (200, 204)
+
+        response = complete(authenticated_client, data['upload_token'])
+        assert response.status_code == 201
+        record = StudentIDUpload.objects.get(id=response.data['id'])
+        assert record.user == test_user
+        assert record.image.name.startswith('student_ids/direct/')
+        assert s3_storage.exists(record.image.name)
+
+        response = complete(authenticated_client, data['upload_token'])
+        assert response.status_code == 200
+        assert StudentIDUpload.objects.count() == 1
+
+        # 后台处理后 image 换成了压缩图，重复 complete 仍然返回原记录
+        StudentIDUpload.objects.filter(pk=record.pk).update(image='student_ids/processed.jpg')
+        response = complete(authenticated_client, data['upload_token'])
+        assert response.status_code == 200
+        assert response.data['id'] == record.pk
+        assert StudentIDUpload.objects.count() == 1
+
+    def test_presigned_put(self, authenticated_client, s3_storage):
+        """
+        预签名 PUT 直传
+        """
+        data = presign(authenticated_client, method='put')
+        upload = requests.put(data['url'], data=jpeg_bytes(), headers=data['headers'])
+        assert upload.status_code == 200
+        assert complete(authenticated_client, data['upload_token']).status_code == 201
+
+    def test_complete_rejects_bad_objects(self, authenticated_client, s3_storage):
+        """
+        未上传、内容不是图片的对象都会被拒绝，后者会从存储中删除
+        """
+        client = s3_storage.connection.meta.client
+        keys_before = client.list_objects_v2(Bucket=BUCKET).get('KeyCount', 0)
+        data = presign(authenticated_client, method='put')
+        assert complete(authenticated_client, data['upload_token']).status_code == 400
+
+        requests.put(data['url'], data=b'not an image at all', headers=data['headers'])
+        assert complete(authenticated_client, data['upload_token']).status_code == 400
+        assert not StudentIDUpload.objects.exists()
+        assert client.list_objects_v2(Bucket=BUCKET).get('KeyCount', 0) == keys_before
+
+    def test_token_bound_to_user(self, authenticated_client, api_client, another_user, s3_storage):
+        """
+        上传凭证只能由申请它的用户使用，伪造的凭证无效
+        """
+        data = presign(authenticated_client)
+        api_client.force_authenticate(user=another_user)
+        assert complete(api_client, data['upload_token']).status_code == 400
+        assert complete(api_client, 'forged').status_code == 400
+
+    def test_unavailable_on_local_storage(self, authenticated_client):
+        """
+        本地文件存储不支持直传
+        """
+        response = authenticated_client.post(
+            reverse('api_v1:upload-idcard-presign'), {'content_type': 'image/jpeg'}
+        )
+        assert response.status_code == 501
@@ -0,0 +1,76 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from core.eager import plan_for
+from core.models import Conversation, PrivateMessage
+from core.serializers import ConversationSerializer, PostSerializer
+from core.tests.factories import CommentFactory, PostFactory, UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def count_queries(client, url):
+    # 先请求一次，排除认证缓存等一次性查询
+    client.get(url)
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(ctx.captured_queries)
+
+
+class TestEagerLoadingPlan:
+    def test_post_plan(self):
+        """由声明的字段推断出预加载方案，用户摘要只取摘要字段"""
+        plan = plan_for(PostSerializer)
+        assert set(plan.select) == {'author', 'category'}
+        assert [p.prefetch_to for p in plan.prefetch] == ['tags']
+        assert plan.only['author'] == ['id', 'nickname', 'avatar']
+
+    def test_conversation_plan(self):
+        """嵌套序列化器递归规划"""
+        plan = plan_for(ConversationSerializer)
+        assert set(plan.select) == {'last_message', 'last_message__sender', 'last_message__receiver'}
+        assert [p.prefetch_to for p in plan.prefetch] == ['participants']
+
+
+class TestConstantQueries:
+    def test_post_list(self, authenticated_client):
+        """帖子列表的查询数不随帖子数增长"""
+        url = reverse('api_v1:post-list')
+        PostFactory.create_batch(2)
+        small = count_queries(authenticated_client, url)
+        PostFactory.create_batch(6)
+        assert count_queries(authenticated_client, url) == small
+
+    def test_comment_list(self, authenticated_client):
+        """评论列表（含任意层级的回复）的查询数不随评论数增长"""
+        post = PostFactory()
+        url = reverse('api_v1:post-comments-list', kwargs={'post_pk': post.pk})
+        root = CommentFactory(post=post)
+        CommentFactory(post=post, parent=root)
+        small = count_queries(authenticated_client, url)
+        for _ in range(3):
+            parent = CommentFactory(post=post)
+            reply = CommentFactory(post=post, parent=parent)
+            CommentFactory(post=post, parent=reply)
+        assert count_queries(authenticated_client, url) == small
+
+    def test_conversation_list(self, authenticated_client, test_user):
+        """会话列表的查询数不随会话数增长"""
+        url = reverse('api_v1:conversation-list')
+
+        def add_conversations(n):
+            for _ in range(n):
+                other = UserFactory()
+                conversation = Conversation.objects.create()
+                conversation.participants.add(test_user, other)
+                conversation.last_message = PrivateMessage.objects.create(
+                    conversation=conversation, sender=other, receiver=test_user, content='hi',
+                )
+                conversation.save()
+
+        add_conversations(2)
+        small = count_queries(authenticated_client, url)
+        add_conversations(5)
+        assert count_queries(authenticated_client, url) == small
@@ -0,0 +1,141 @@
+import queue
+import re
+import pytest
+from datetime import timedelta
+from django.core import mail
+from django.core.management import call_command
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from core.mailqueue import mail_queue
+from core.models import EmailVerification
+from core.tests.factories import UserFactory
+from core.verification import send_email_code
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def unverified_user():
+    return UserFactory(is_verified_user=False)
+
+
+@pytest.fixture
+def unverified_client(api_client, unverified_user):
+    api_client.force_authenticate(user=unverified_user)
+    return api_client
+
+
+@pytest.fixture
+def send_code(django_capture_on_commit_callbacks):
+    # 验证码在事务提交后才入队发信
+    def send(client, email):
+        with django_capture_on_commit_callbacks(execute=True):
+            response = client.post(reverse('api_v1:email-send-code'), {'email': email})
+        assert response.status_code == 202
+        mail_queue.join()
+        return re.search(r'\d{6}', mail.outbox[-1].body).group()
+    return send
+
+
+class TestEmailVerification:
+    def test_send_and_verify(self, unverified_client, unverified_user, send_code):
+        code = send_code(unverified_client, 'Student@Uni.edu.cn')
+        assert mail.outbox[-1].to == ['student@uni.edu.cn']
+
+        url = reverse('api_v1:email-verify')
+        wrong = '000000' if code != '000000' else '111111'
+        response = unverified_client.post(url, {'email': 'student@uni.edu.cn', 'code': wrong})
+        assert response.status_code == 400
+
+        response = unverified_client.post(url, {'email': 'student@uni.edu.cn', 'code': code})
+        assert response.status_code == 200
+        unverified_user.refresh_from_db()
+        assert unverified_user.is_verified_user
+        assert unverified_user.verification_method == 'email'
+        assert unverified_user.email == 'student@uni.edu.cn'
+
+    def test_verify_with_jwt_returns_updated_user(self, api_client, unverified_user, send_code):
+        # 真实 JWT 认证时 request.user 是 TokenPrincipal，认证成功后应返回更新后的状态而不是 token 声明
+        from core.views import generate_jwt_token_for_user
+
+        token = generate_jwt_token_for_user(unverified_user)['access']
+        api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        code = send_code(api_client, 'student@uni.edu.cn')
+        response = api_client.post(
+            reverse('api_v1:email-verify'), {'email': 'student@uni.edu.cn', 'code': code}
+        )
+        assert response.status_code == 200
+        assert response.data['user']['is_verified_user'] is True
+
+    def test_expired_code_rejected_and_purged(self, unverified_client, settings, send_code):
+        settings.VERIFICATION_EMAIL_DOMAINS = ['uni.edu.cn']
+        response = unverified_client.post(reverse('api_v1:email-send-code'), {'email': 'a@gmail.com'})
+        assert response.status_code == 400
+
+        code = send_code(unverified_client, 'a@mail.uni.edu.cn')
+        EmailVerification.objects.update(sent_at=timezone.now() - timedelta(hours=2))
+        response = unverified_client.post(
+            reverse('api_v1:email-verify'), {'email': 'a@mail.uni.edu.cn', 'code': code}
+        )
+        assert response.status_code == 400
+
+        call_command('prune_expired_data')
+        assert not EmailVerification.objects.exists()
+
+    def test_verified_user_cannot_request_code(self, authenticated_client):
+        response = authenticated_client.post(reverse('api_v1:email-send-code'), {'email': 'x@uni.edu.cn'})
+        assert response.status_code == 403
+
+    def test_email_bound_to_one_account(self, unverified_client, api_client, send_code):
+        """
+        已被其他账号认证的邮箱不能再发送验证码，也不能再用于认证
+        """
+        code = send_code(unverified_client, 'student@uni.edu.cn')
+        other = UserFactory(is_verified_user=False)
+        other_client = APIClient()
+        other_client.force_authenticate(user=other)
+        other_code = send_code(other_client, 'student@uni.edu.cn')
+
+        url = reverse('api_v1:email-verify')
+        assert other_client.post(url, {'email': 'student@uni.edu.cn', 'code': other_code}).status_code == 200
+        response = unverified_client.post(url, {'email': 'student@uni.edu.cn', 'code': code})
+        assert response.status_code == 400
+        assert 'email' in response.data
+        assert EmailVerification.objects.filter(code=code, is_used=False).exists()
+
+        third_client = APIClient()
+        third_client.force_authenticate(user=UserFactory(is_verified_user=False))
+        response = third_client.post(reverse('api_v1:email-send-code'), {'email': 'Student@uni.edu.cn'})
+        assert response.status_code == 400
+
+    @pytest.mark.django_db(transaction=True)
+    def test_full_queue_discards_code(self, unverified_client, monkeypatch):
+        """
+        发信队列已满时返回 503，不留下收不到的验证码（自动提交模式下提交回调立即执行）
+        """
+        def full(**kwargs):
+            raise queue.Full
+
+        monkeypatch.setattr(mail_queue, 'enqueue', full)
+        response = unverified_client.post(reverse('api_v1:email-send-code'), {'email': 'a@uni.edu.cn'})
+        assert response.status_code == 503
+        assert not EmailVerification.objects.exists()
+
+    def test_rollback_sends_nothing(self, unverified_user, django_capture_on_commit_callbacks):
+        """
+        事务回滚时不发信
+        """
+        sent = len(mail.outbox)
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    send_email_code(unverified_user, 'a@uni.edu.cn')
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        assert not callbacks
+        mail_queue.join()
+        assert len(mail.outbox) == sent
+        assert not EmailVerification.objects.exists()
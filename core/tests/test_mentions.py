@@ -0,0 +1,64 @@
+import pytest
+from django.urls import reverse
+from core.mentions import NicknameTrie, mention_index
+from core.models import Notification
+from core.tests.factories import PostFactory, UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def fresh_index():
+    mention_index.clear()
+    yield
+    mention_index.clear()
+
+
+class TestNicknameTrie:
+    def test_longest_match(self):
+        trie = NicknameTrie()
+        for name in ['小明', '小明明', 'Tom Lee']:
+            trie.add(name)
+        text = '@小明明 你好，@Tom Lee 和 @小明 也来，邮件发 a@小明'
+        assert trie.find_mentions(text) == ['小明明', 'Tom Lee', '小明']
+
+    def test_match_must_end_at_word_boundary(self):
+        trie = NicknameTrie()
+        for name in ['alice', 'Tom', 'Tom Lee']:
+            trie.add(name)
+        # @alicebob 不能解析成 alice；Tom Leex 退回到更短的 Tom
+        assert trie.find_mentions('@alicebob 你好') == []
+        assert trie.find_mentions('@Tom Leex') == ['Tom']
+        assert trie.find_mentions('@alice, @alice你好 @alice') == ['alice']
+
+    def test_discard_keeps_shared_prefix(self):
+        trie = NicknameTrie()
+        trie.add('小明')
+        trie.add('小明明')
+        trie.discard('小明明')
+        assert trie.find_mentions('@小明明') == ['小明']
+        trie.discard('小明')
+        assert trie.root == {}
+
+
+class TestMentionNotifications:
+    def test_comment_mentions_notify_users(self, authenticated_client, test_user):
+        alice = UserFactory(nickname='alice')
+        UserFactory(nickname='重名')
+        UserFactory(nickname='重名')
+        post = PostFactory()
+        url = reverse('api_v1:post-comments-list', kwargs={'post_pk': post.id})
+
+        response = authenticated_client.post(url, {'content': '@alice @重名 @nobody 看这里', 'post': post.id})
+        assert response.status_code == 201
+        mentions = Notification.objects.filter(notif_type='mention')
+        assert list(mentions.values_list('recipient_id', flat=True)) == [alice.id]
+
+    def test_index_follows_nickname_changes(self, test_user):
+        user = UserFactory(nickname='旧昵称')
+        assert mention_index.extract('@旧昵称') == ['旧昵称']
+
+        user.nickname = '新昵称'
+        user.save()
+        assert mention_index.extract('@旧昵称 @新昵称') == ['新昵称']
+        assert mention_index.resolve('@新昵称') == [user]
@@ -0,0 +1,43 @@
+import pytest
+from django.urls import reverse
+from core.models import Conversation, PrivateMessage
+
+pytestmark = pytest.mark.django_db
+
+SUMMARY_KEYS = {'id', 'nickname', 'avatar'}
+
+
+@pytest.fixture
+def conversation(test_user, another_user):
+    conversation = Conversation.objects.create()
+    conversation.participants.add(test_user, another_user)
+    for i in range(3):
+        PrivateMessage.objects.create(
+            conversation=conversation, sender=test_user, receiver=another_user, content=f"msg {i}",
+        )
+    return conversation
+
+
+class TestMessageSerialization:
+    def test_conversation_participants_are_summaries(self, authenticated_client, conversation):
+        """会话参与者只输出用户摘要，不包含手机号、openid"""
+        response = authenticated_client.get(reverse('api_v1:conversation-list'))
+        assert response.status_code == 200
+        participants = response.data[0]['participants']
+        assert len(participants) == 2
+        assert all(set(p) == SUMMARY_KEYS for p in participants)
+
+    def test_message_sender_receiver_are_summaries(
+        self, authenticated_client, conversation, test_user, another_user
+    ):
+        """私信的发送者和接收者只输出用户摘要，同一用户在响应中内容一致"""
+        url = reverse('api_v1:conversation-messages-list', kwargs={'conversation_pk': conversation.pk})
+        response = authenticated_client.get(url)
+        assert response.status_code == 200
+        assert len(response.data) == 3
+        for message in response.data:
+            assert message['sender'] == {
+                'id': test_user.id, 'nickname': test_user.nickname, 'avatar': test_user.avatar,
+            }
+            assert set(message['receiver']) == SUMMARY_KEYS
+            assert message['receiver']['id'] == another_user.id
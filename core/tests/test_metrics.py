@@ -0,0 +1,93 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import reverse
+from prometheus_client import REGISTRY
+
+from core.tests.factories import PostFactory
+
+pytestmark = pytest.mark.django_db
+
+LABELS = {'method': 'GET', 'route': 'api_v1:post-list'}
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, {**LABELS, **labels}) or 0
+
+
+class TestMetrics:
+    def test_records_route_metrics(self, api_client):
+        """
+        按 URL 名称记录请求数、延迟、SQL 查询数和响应大小
+        """
+        PostFactory.create_batch(2)
+        before = {
+            'requests': sample('http_requests_total', status='200'),
+            'latency': sample('http_request_duration_seconds_count'),
+            'queries': sample('http_request_db_queries_sum'),
+            'size': sample('http_response_size_bytes_sum'),
+        }
+
+        response = api_client.get(reverse('api_v1:post-list'))
+        assert response.status_code == 200
+
+        assert sample('http_requests_total', status='200') == before['requests'] + 1
+        assert sample('http_request_duration_seconds_count') == before['latency'] + 1
+        assert sample('http_request_db_queries_sum') > before['queries']
+        assert sample('http_response_size_bytes_sum') == before['size'] + len(response.content)
+
+    def test_counts_queries_of_sync_views_under_asgi(self):
+        """
+        ASGI 下同步视图在另一个线程执行，查询同样计入该请求
+        """
+        PostFactory.create_batch(2)
+        before = sample('http_request_db_queries_sum')
+
+        async def get():
+            return await AsyncClient().get(reverse('api_v1:post-list'))
+
+        response = async_to_sync(get)()
+        assert response.status_code == 200
+        assert sample('http_request_db_queries_sum') > before
+
+    def test_unmatched_route(self, client):
+        """
+        未匹配的路径归到同一个标签，不会按路径产生新的时间序列
+        """
+        labels = {'method': 'GET', 'route': 'unmatched', 'status': '404'}
+        before = REGISTRY.get_sample_value('http_requests_total', labels) or 0
+        client.get('/no-such-path/1/')
+        client.get('/no-such-path/2/')
+        assert REGISTRY.get_sample_value('http_requests_total', labels) == before + 2
+
+    def test_metrics_endpoint(self, client, settings):
+        """
+        /metrics 输出 Prometheus 文本格式，且不统计自身
+        """
+        settings.METRICS_ALLOWED_IPS = ['127.0.0.1']
+        client.get(reverse('api_v1:post-list'))
+        response = client.get(reverse('metrics'))
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain')
+        body = response.content.decode()
+        assert 'http_request_duration_seconds_bucket{' in body
+        assert 'route="api_v1:post-list"' in body
+        assert 'route="metrics"' not in body
+
+    def test_metrics_token(self, client, settings):
+        """
+        设置 METRICS_TOKEN 后需要带 Bearer token 才能抓取
+        """
+        settings.METRICS_TOKEN = 'secret'
+        assert client.get(reverse('metrics')).status_code == 403
+        assert client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong').status_code == 403
+        response = client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        assert response.status_code == 200
+
+    def test_metrics_denied_by_default(self, client, settings):
+        """
+        没有配置 METRICS_TOKEN 和 METRICS_ALLOWED_IPS 时拒绝抓取
+        """
+        settings.METRICS_TOKEN = ''
+        settings.METRICS_ALLOWED_IPS = []
+        assert client.get(reverse('metrics')).status_code == 403
@@ -1,4 +1,6 @@
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from core.models import Post
 from core.tests.factories import PostFactory, CategoryFactory, TagFactory
@@ -28,6 +30,17 @@ class TestPostAPI:
         assert response.data['category']['id'] == category.id
         assert len(response.data['tags']) == len(tags)
 
+    def test_create_post_with_unknown_tag(self, authenticated_client):
+        """标签主键一次查询校验，不存在的主键仍然报错"""
+        tag = TagFactory()
+        url = reverse('api_v1:post-list')
+        data = {'title': 'Test Post', 'content': 'Test Content', 'tag_ids': [tag.id, tag.id + 1]}
+
+        response = authenticated_client.post(url, data, format='json')
+        assert response.status_code == 400
+        assert 'tag_ids' in response.data
+        assert not Post.objects.exists()
+
     def test_get_posts(self, authenticated_client):
         """测试获取帖子列表"""
         # 创建一些测试帖子
@@ -207,4 +220,21 @@ class TestPostAPI:
         response = authenticated_client.delete(url)
         
         assert response.status_code == 403
-        assert Post.objects.filter(id=post.id).exists() 
\ No newline at end of file
+        assert Post.objects.filter(id=post.id).exists() 
+
+    def test_author_summary_serialized_once(self, authenticated_client, another_user):
+        """作者只输出摘要字段，同一作者在一次响应中只加载一次"""
+        PostFactory.create_batch(5, author=another_user)
+
+        url = reverse('api_v1:post-list')
+        with CaptureQueriesContext(connection) as ctx:
+            response = authenticated_client.get(url)
+
+        assert response.status_code == 200
+        authors = [post['author'] for post in response.data]
+        assert authors[0] == {
+            'id': another_user.id, 'nickname': another_user.nickname, 'avatar': another_user.avatar,
+        }
+        assert all(author == authors[0] for author in authors)
+        user_queries = [q for q in ctx.captured_queries if 'FROM "core_user"' in q['sql']]
+        assert len(user_queries) <= 1
@@ -68,4 +68,194 @@ class TestNotificationAPI:
         response = authenticated_client.post(mark_url)
         assert response.status_code == 200
         notification.refresh_from_db()
-        assert notification.is_read is True 
\ No newline at end of file
+        assert notification.is_read is True 
+
+    def test_unread_count(self, authenticated_client, test_user):
+        # 新建通知时计数递增
+        notifications = [
+            Notification.objects.create(recipient=test_user, notif_type='system')
+            for _ in range(3)
+        ]
+        url = reverse('api_v1:notification-unread-count')
+        response = authenticated_client.get(url)
+        assert response.status_code == 200
+        assert response.data['unread_count'] == 3
+
+        # 重复标记同一条只扣减一次
+        mark_url = reverse('api_v1:notification-mark-as-read', kwargs={'pk': notifications[0].id})
+        authenticated_client.post(mark_url)
+        authenticated_client.post(mark_url)
+        assert authenticated_client.get(url).data['unread_count'] == 2
+
+        authenticated_client.post(reverse('api_v1:notification-mark-all-as-read'))
+        assert authenticated_client.get(url).data['unread_count'] == 0
+
+    def test_patch_is_read_updates_unread_count(self, authenticated_client, test_user):
+        # PATCH 修改 is_read 与 mark_as_read 走同一套计数调整，重复提交不会重复扣减
+        notification = Notification.objects.create(recipient=test_user, notif_type='system')
+        detail_url = reverse('api_v1:notification-detail', kwargs={'pk': notification.id})
+        count_url = reverse('api_v1:notification-unread-count')
+
+        for _ in range(2):
+            response = authenticated_client.patch(detail_url, {'is_read': True}, format='json')
+            assert response.status_code == 200
+            assert response.data['is_read'] is True
+        assert authenticated_client.get(count_url).data['unread_count'] == 0
+
+        authenticated_client.patch(detail_url, {'is_read': False}, format='json')
+        assert authenticated_client.get(count_url).data['unread_count'] == 1
+
+    def test_reconcile_unread_counts(self, test_user):
+        from django.core.management import call_command
+        from core.models import NotificationCounter
+
+        Notification.objects.create(recipient=test_user, notif_type='system')
+        Notification.objects.create(recipient=test_user, notif_type='system')
+        # 绕过增量维护的批量更新会让计数漂移
+        NotificationCounter.objects.filter(user=test_user).update(unread_count=7)
+
+        call_command('reconcile_unread_counts')
+        assert NotificationCounter.objects.get(user=test_user).unread_count == 2
+
+    def test_like_notifications_are_aggregated(self, test_user):
+        from core.notifications import notify
+
+        post = PostFactory(author=test_user)
+        likers = UserFactory.create_batch(5)
+        for liker in likers:
+            notify(test_user, 'like', target=post, actor=liker)
+        # 同一用户重复点赞不重复计数
+        notify(test_user, 'like', target=post, actor=likers[-1])
+
+        notifications = Notification.objects.filter(recipient=test_user, notif_type='like')
+        assert notifications.count() == 1
+        data = notifications.get().extra_data
+        assert data['actor_count'] == 5
+        assert [a['id'] for a in data['actors']] == [u.id for u in reversed(likers[-3:])]
+
+        # 示例之外的用户取消后再点赞、匿名评论者多次评论，都不重复计数
+        notify(test_user, 'like', target=post, actor=likers[0])
+        comment_author = UserFactory()
+        for _ in range(2):
+            notify(test_user, 'comment', target=post, actor=comment_author, is_anonymous=True)
+        assert notifications.get().extra_data['actor_count'] == 5
+        comment = Notification.objects.get(recipient=test_user, notif_type='comment')
+        assert comment.extra_data['actor_count'] == 1
+
+        # 已读后的新点赞生成新的通知
+        notifications.update(is_read=True)
+        notify(test_user, 'like', target=post, actor=UserFactory())
+        assert Notification.objects.filter(recipient=test_user, notif_type='like').count() == 2
+
+    def test_sweep_orphan_notifications(self, test_user):
+        from django.core.management import call_command
+        from core.models import NotificationCounter
+        from core.notifications import notify
+
+        kept = PostFactory(author=test_user)
+        deleted = PostFactory(author=test_user)
+        comment = CommentFactory(post=kept, author=UserFactory())
+        notify(test_user, 'like', target=kept, actor=UserFactory())
+        notify(test_user, 'like', target=deleted, actor=UserFactory())
+        notify(test_user, 'reply', target=comment, actor=UserFactory())
+        system = Notification.objects.create(recipient=test_user, notif_type='system')
+        deleted.delete()
+        comment.delete()
+
+        call_command('sweep_orphan_notifications', '--batch-size', '1')
+        unread = Notification.objects.filter(recipient=test_user, is_read=False)
+        assert set(unread.values_list('object_id', flat=True)) == {kept.id, None}
+        assert NotificationCounter.get_count(test_user.id) == 2
+
+        call_command('sweep_orphan_notifications', '--delete')
+        assert Notification.objects.filter(recipient=test_user).count() == 2
+        assert Notification.objects.filter(pk=system.pk).exists()
+
+    def test_broadcast_merged_into_list(self, authenticated_client, test_user):
+        from core.notifications import broadcast
+
+        personal = Notification.objects.create(recipient=test_user, notif_type='system')
+        announcement = broadcast('系统维护通知')
+        url = reverse('api_v1:notification-list')
+        count_url = reverse('api_v1:notification-unread-count')
+
+        response = authenticated_client.get(url)
+        assert response.status_code == 200
+        assert [(n['id'], n['is_broadcast']) for n in response.data] == [
+            (f'b:{announcement.id}', True), (personal.id, False)
+        ]
+        assert response.data[0]['extra_data']['content'] == '系统维护通知'
+        assert Notification.objects.count() == 1
+        assert authenticated_client.get(count_url).data['unread_count'] == 2
+
+        authenticated_client.post(
+            reverse('api_v1:notification-mark-broadcasts-as-read'), {'broadcast_id': f'b:{announcement.id}'}
+        )
+        assert authenticated_client.get(count_url).data['unread_count'] == 1
+        assert authenticated_client.get(url).data[0]['is_read'] is True
+
+    def test_list_is_cursor_paginated(self, authenticated_client, test_user):
+        from django.utils import timezone
+        from core.models import Broadcast
+
+        # 同一时刻的个人通知和公告也按固定顺序分页，不重复、不遗漏
+        now = timezone.now()
+        personal = [
+            Notification.objects.create(recipient=test_user, notif_type='system', created_at=now)
+            for _ in range(3)
+        ]
+        announcements = [Broadcast.objects.create(content=str(i), created_at=now) for i in range(2)]
+        expected = [f'b:{b.id}' for b in reversed(announcements)] + [n.id for n in reversed(personal)]
+
+        url = f"{reverse('api_v1:notification-list')}?page_size=2"
+        seen = []
+        while url:
+            response = authenticated_client.get(url)
+            assert response.status_code == 200
+            assert len(response.data['results']) <= 2
+            seen += [n['id'] for n in response.data['results']]
+            url = response.data['next']
+        assert seen == expected
+
+        response = authenticated_client.get(reverse('api_v1:notification-list'), {'cursor': 'bogus'})
+        assert response.status_code == 404
+
+        # 不带分页参数时保持数组格式，下一页地址在 Link 头中
+        response = authenticated_client.get(reverse('api_v1:notification-list'))
+        assert [n['id'] for n in response.data] == expected
+        assert 'Link' not in response
+
+    def test_legacy_list_links_next_page(self, authenticated_client, test_user):
+        from core.views import NotificationViewSet
+
+        for _ in range(NotificationViewSet.max_page_size + 1):
+            Notification.objects.create(recipient=test_user, notif_type='system')
+        response = authenticated_client.get(reverse('api_v1:notification-list'))
+        assert isinstance(response.data, list)
+        assert len(response.data) == NotificationViewSet.max_page_size
+        assert response['Link'].endswith('rel="next"')
+        next_url = response['Link'][1:response['Link'].index('>')]
+        assert len(authenticated_client.get(next_url).data['results']) == 1
+
+    def test_aggregation_bump_keeps_other_rows_in_place(self, authenticated_client, test_user):
+        from core.notifications import notify
+        from core.tests.factories import PostFactory, UserFactory
+
+        # 翻页期间聚合通知被顶到最前：其它通知不跳过、不重复，被顶起的通知在首页顶部
+        post = PostFactory(author=test_user)
+        aggregated = notify(test_user, 'like', target=post, actor=UserFactory())
+        others = [
+            Notification.objects.create(recipient=test_user, notif_type='system') for _ in range(3)
+        ]
+        url = f"{reverse('api_v1:notification-list')}?page_size=2"
+        response = authenticated_client.get(url)
+        seen = [n['id'] for n in response.data['results']]
+        assert seen == [others[2].id, others[1].id]
+
+        notify(test_user, 'like', target=post, actor=UserFactory())
+        response = authenticated_client.get(response.data['next'])
+        seen += [n['id'] for n in response.data['results']]
+        assert seen == [others[2].id, others[1].id, others[0].id]
+        first = authenticated_client.get(reverse('api_v1:notification-list'), {'cursor': ''})
+        assert first.data['results'][0]['id'] == aggregated.id
+        assert first.data['results'][0]['extra_data']['actor_count'] == 2
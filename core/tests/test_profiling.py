@@ -0,0 +1,93 @@
+import os
+import pstats
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.tests.factories import PostFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def profile_dir(settings, tmp_path):
+    settings.PROFILING_DIR = tmp_path
+    settings.PROFILING_SAMPLE_RATE = 0
+    return tmp_path
+
+
+@pytest.fixture
+def staff_client(admin_user):
+    # 与 authenticated_client 同时使用，不能共用 api_client
+    client = APIClient()
+    client.force_authenticate(user=admin_user)
+    return client
+
+
+class TestRequestProfiling:
+    def test_staff_header_profiles_request(self, staff_client, profile_dir):
+        """
+        管理员带 X-Profile 头时保存 pstats 文件，并在 Server-Timing 中拆分 ORM、序列化和渲染耗时
+        """
+        PostFactory.create_batch(3)
+        response = staff_client.get(reverse('api_v1:post-list'), HTTP_X_PROFILE='1')
+
+        assert response.status_code == 200
+        profile_id = response['X-Profile-Id']
+        assert (profile_dir / f'{profile_id}.prof').exists()
+        timing = response['Server-Timing']
+        for name in ('orm', 'serializer', 'render'):
+            assert f'{name};dur=' in timing
+
+    def test_disabled_by_default(self, staff_client, authenticated_client, profile_dir):
+        """
+        不带请求头时不分析；非管理员的请求头被忽略
+        """
+        staff_client.get(reverse('api_v1:post-list'))
+        response = authenticated_client.get(reverse('api_v1:post-list'), HTTP_X_PROFILE='1')
+        assert 'X-Profile-Id' not in response
+        assert not list(profile_dir.iterdir())
+
+    def test_sampling(self, authenticated_client, settings, profile_dir):
+        """
+        抽样分析的结果只保存文件，不向普通用户暴露响应头
+        """
+        settings.PROFILING_SAMPLE_RATE = 1
+        response = authenticated_client.get(reverse('api_v1:post-list'))
+        assert 'X-Profile-Id' not in response
+        assert 'Server-Timing' not in response
+        assert len(list(profile_dir.glob('*.prof'))) == 1
+
+    def test_keeps_newest_files(self, authenticated_client, settings, profile_dir):
+        """
+        超过 PROFILING_MAX_FILES 时删除最旧的分析文件
+        """
+        settings.PROFILING_SAMPLE_RATE = 1
+        settings.PROFILING_MAX_FILES = 2
+        for age, name in enumerate(['c', 'b', 'a'], start=1):
+            old = profile_dir / f'{name * 32}.prof'
+            old.write_bytes(b'')
+            os.utime(old, (1_000_000 - age, 1_000_000 - age))
+
+        authenticated_client.get(reverse('api_v1:post-list'))
+        names = sorted(path.name for path in profile_dir.glob('*.prof'))
+        assert len(names) == 2
+        assert f"{'c' * 32}.prof" in names
+
+    def test_download(self, staff_client, authenticated_client, profile_dir, tmp_path):
+        """
+        管理员可以下载分析文件；普通用户无权下载，无效 id 返回 404
+        """
+        profile_id = staff_client.get(reverse('api_v1:post-list'), HTTP_X_PROFILE='1')['X-Profile-Id']
+        url = reverse('api_v1:profile-download', kwargs={'profile_id': profile_id})
+
+        response = staff_client.get(url)
+        assert response.status_code == 200
+        downloaded = tmp_path / 'downloaded.prof'
+        downloaded.write_bytes(b''.join(response.streaming_content))
+        assert pstats.Stats(str(downloaded)).total_tt > 0
+
+        assert authenticated_client.get(url).status_code == 403
+        missing = reverse('api_v1:profile-download', kwargs={'profile_id': 'not-a-profile'})
+        assert staff_client.get(missing).status_code == 404
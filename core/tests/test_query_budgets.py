@@ -0,0 +1,342 @@
+"""
+接口 SQL 查询数预算。
+
+ROUTES 为 core/urls.py 中每个路由声明查询数上限和造数函数，WRITE_ROUTES 另外登记创建、修改、删除接口；
+每个路由分别在 SMALL 和 LARGE 规模的数据下请求一次，要求两次查询数相同（没有 N+1）且不超过预算。无法在测试中调用的路由列在 EXEMPT 中并注明原因。
+新增路由时必须在这两处之一登记，否则 test_every_route_is_budgeted 会失败。
+
+造数用 password=None 创建用户（不可用密码，跳过哈希），大规模造数才不会太慢；
+QUERY_BUDGET_LARGE 环境变量可调整大规模的数量。
+"""
+import os
+from collections import namedtuple
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, reverse
+from rest_framework.test import APIClient
+
+from core.authentication import PrincipalRefreshToken
+from core.models import Broadcast
+from core.tests.factories import (
+    ActionFactory, CategoryFactory, CommentFactory, ConversationFactory,
+    NotificationFactory, PostFactory, PrivateMessageFactory, StudentIDUploadFactory,
+    TagFactory, UserFactory
+)
+from core.urls import api_v1_patterns
+
+pytestmark = pytest.mark.django_db
+
+SMALL = 5
+LARGE = int(os.getenv('QUERY_BUDGET_LARGE', 500))
+# 级联删除每批最多 100 个主键，多对多写入按数据库的参数个数上限分批（SQLite 为 999），
+# 行数超过一批时查询数随之增长，这不是 N+1；写接口的大规模取不超过一批的数量
+WRITE_LARGE = min(LARGE, 50)
+
+# budget: 查询数上限；seed(ctx, n) 造出规模为 n 的数据，返回 (url kwargs, 请求体)
+Route = namedtuple('Route', ['budget', 'seed', 'method', 'staff'], defaults=['get', False])
+
+
+def users(n):
+    return UserFactory.create_batch(n, password=None)
+
+
+def nothing(ctx, n):
+    return {}, None
+
+
+def seed_posts(ctx, n):
+    PostFactory.create_batch(n, author__password=None)
+    return {}, None
+
+
+def seed_post(ctx, n):
+    post = PostFactory(author__password=None, tags=TagFactory.create_batch(n))
+    return {'pk': post.pk}, None
+
+
+def seed_comments(ctx, n):
+    # 一半是顶层评论，一半是逐层嵌套的回复
+    post = PostFactory(author__password=None)
+    parent = None
+    for i in range(n):
+        parent = CommentFactory(post=post, author__password=None, parent=parent if i % 2 else None)
+    return {'post_pk': post.pk}, None
+
+
+def seed_comment(ctx, n):
+    comment = CommentFactory(author__password=None, post__author__password=None)
+    CommentFactory.create_batch(n, post=comment.post, parent=comment, author__password=None)
+    return {'post_pk': comment.post_id, 'pk': comment.pk}, None
+
+
+def targets(n):
+    # 帖子和评论交替，覆盖 GenericForeignKey 的多种目标类型
+    post = PostFactory(author__password=None)
+    return [
+        PostFactory(author__password=None) if i % 2 else CommentFactory(post=post, author__password=None)
+        for i in range(n)
+    ]
+
+
+def seed_actions(ctx, n):
+    for target in targets(n):
+        ActionFactory(user=ctx.user, target=target)
+    return {}, None
+
+
+def seed_action(ctx, n):
+    action = ActionFactory(user=ctx.user, target__author__password=None)
+    return {'pk': action.pk}, None
+
+
+def conversation_with(ctx, n_participants, n_messages):
+    others = users(max(1, n_participants))
+    conversation = ConversationFactory(participants=[ctx.user, *others])
+    message = None
+    for i in range(n_messages):
+        sender, receiver = (ctx.user, others[0]) if i % 2 else (others[0], ctx.user)
+        message = PrivateMessageFactory(conversation=conversation, sender=sender, receiver=receiver)
+    conversation.last_message = message
+    conversation.save()
+    return conversation
+
+
+def seed_conversations(ctx, n):
+    for _ in range(n):
+        conversation_with(ctx, 1, 1)
+    return {}, None
+
+
+def seed_conversation(ctx, n):
+    return {'pk': conversation_with(ctx, n, 1).pk}, None
+
+
+def seed_add_participant(ctx, n):
+    return {'pk': conversation_with(ctx, n, 1).pk}, {'user_id': users(1)[0].pk}
+
+
+def seed_conversation_messages(ctx, n):
+    return {'conversation_pk': conversation_with(ctx, 1, n).pk}, None
+
+
+def seed_conversation_unread(ctx, n):
+    return {'pk': conversation_with(ctx, 1, n).pk}, None
+
+
+def seed_message(ctx, n):
+    # 最后一条发给当前用户，mark_as_read 只允许接收者调用
+    conversation = conversation_with(ctx, 1, n)
+    message = PrivateMessageFactory(
+        conversation=conversation, sender=conversation.last_message.sender, receiver=ctx.user,
+    ) if conversation.last_message.receiver != ctx.user else conversation.last_message
+    return {'conversation_pk': conversation.pk, 'pk': message.pk}, None
+
+
+def seed_notifications(ctx, n):
+    actor = users(1)[0]
+    for target in targets(n):
+        NotificationFactory(recipient=ctx.user, target=target, extra_data={'actors': [actor.pk]})
+    Broadcast.objects.bulk_create(Broadcast(content=f"公告 {i}") for i in range(n))
+    return {}, None
+
+
+def seed_notification(ctx, n):
+    notification = NotificationFactory(recipient=ctx.user, target__author__password=None)
+    return {'pk': notification.pk}, None
+
+
+def seed_uploads(ctx, n):
+    StudentIDUploadFactory.create_batch(n, user__password=None)
+    return {}, None
+
+
+def seed_upload(ctx, n):
+    return {'pk': StudentIDUploadFactory(user__password=None).pk}, None
+
+
+def seed_own_upload(ctx, n):
+    return {'pk': StudentIDUploadFactory(user=ctx.user).pk}, None
+
+
+def seed_decisions(ctx, n):
+    uploads = StudentIDUploadFactory.create_batch(n, user__password=None)
+    half = n // 2
+    return {}, {
+        'approve': [u.pk for u in uploads[:half]],
+        'reject': [u.pk for u in uploads[half:]],
+    }
+
+
+def seed_new_post(ctx, n):
+    # 请求体引用 n 个标签
+    return {}, {'title': '标题', 'content': '正文', 'tag_ids': [t.pk for t in TagFactory.create_batch(n)]}
+
+
+def seed_own_post(ctx, n):
+    post = PostFactory(author=ctx.user, tags=TagFactory.create_batch(n))
+    CommentFactory.create_batch(n, post=post, author__password=None)
+    return {'pk': post.pk}, {'title': '新标题'}
+
+
+def seed_new_comment(ctx, n):
+    post = PostFactory(author__password=None)
+    CommentFactory.create_batch(n, post=post, author__password=None)
+    parent = CommentFactory(post=post, author__password=None)
+    return {'post_pk': post.pk}, {'post': post.pk, 'parent': parent.pk, 'content': '回复'}
+
+
+def seed_own_comment(ctx, n):
+    comment = CommentFactory(author=ctx.user, post__author__password=None)
+    CommentFactory.create_batch(n, post=comment.post, parent=comment, author__password=None)
+    return {'post_pk': comment.post_id, 'pk': comment.pk}, {'content': '改过的评论'}
+
+
+def seed_new_message(ctx, n):
+    conversation = conversation_with(ctx, n, n)
+    receiver = conversation.participants.exclude(pk=ctx.user.pk).first()
+    return {'conversation_pk': conversation.pk}, {
+        'conversation': conversation.pk, 'receiver': receiver.pk, 'content': '你好',
+    }
+
+
+def seed_own_message(ctx, n):
+    conversation = conversation_with(ctx, 1, n)
+    message = PrivateMessageFactory(
+        conversation=conversation, sender=ctx.user,
+        receiver=conversation.participants.exclude(pk=ctx.user.pk).first(),
+    )
+    return {'conversation_pk': conversation.pk, 'pk': message.pk}, {'content': '改过的私信'}
+
+
+ROUTES = {
+    # 只用到用户 id 的接口不加载 User；需要完整用户的接口（个人资料、date_joined、通知里的操作者信息）
+    # 每个请求查询一次 User，用户对象不缓存，见 core.authentication
+    'api-root': Route(0, nothing),
+    'me': Route(1, nothing),
+    'user-list': Route(1, lambda ctx, n: (users(n) and {}, None)),
+    'user-me': Route(1, nothing),
+    'user-detail': Route(1, lambda ctx, n: ({'pk': users(1)[0].pk}, None)),
+    'category-list': Route(1, lambda ctx, n: (CategoryFactory.create_batch(n) and {}, None)),
+    'category-detail': Route(1, lambda ctx, n: ({'pk': CategoryFactory().pk}, None)),
+    'tag-list': Route(1, lambda ctx, n: (TagFactory.create_batch(n) and {}, None)),
+    'tag-detail': Route(1, lambda ctx, n: ({'pk': TagFactory().pk}, None)),
+    'post-list': Route(2, seed_posts),
+    'post-detail': Route(2, seed_post),
+    # 帖子及标签 2 + get_or_create 4（查询、保存点、插入、释放）；点赞另加通知：操作者 1 + 聚合通知 5
+    'post-like': Route(12, seed_post, 'post'),
+    'post-favorite': Route(6, seed_post, 'post'),
+    'post-comments-list': Route(2, seed_comments),
+    'post-comments-detail': Route(2, seed_comment),
+    'action-list': Route(3, seed_actions),
+    'action-detail': Route(2, seed_action),
+    'conversation-list': Route(2, seed_conversations),
+    'conversation-detail': Route(2, seed_conversation),
+    'conversation-add-participant': Route(4, seed_add_participant, 'post'),
+    'conversation-mark-all-messages-read': Route(3, seed_conversation_unread, 'post'),
+    'conversation-messages-list': Route(1, seed_conversation_messages),
+    'conversation-messages-detail': Route(1, seed_message),
+    'conversation-messages-mark-as-read': Route(2, seed_message, 'post'),
+    'notification-list': Route(6, seed_notifications),
+    'notification-detail': Route(2, seed_notification),
+    'notification-unread-count': Route(3, seed_notifications),
+    'notification-mark-all-as-read': Route(5, seed_notifications, 'post'),
+    'notification-mark-broadcasts-as-read': Route(3, seed_notifications, 'post'),
+    'notification-mark-as-read': Route(4, seed_notification, 'post'),
+    'upload-idcard-detail': Route(1, seed_own_upload),
+    'verification-review-list': Route(1, seed_uploads, staff=True),
+    'verification-review-detail': Route(1, seed_upload, staff=True),
+    'verification-review-decide': Route(8, seed_decisions, 'post', staff=True),
+}
+
+# 写接口：(路由名, 方法) -> Route，与 ROUTES 中同名路由的读预算分开登记。
+# 修改、删除前的所有者校验需要完整的当前用户，各多一次 User 查询；删除帖子/评论时级联收集关联行
+WRITE_ROUTES = {
+    ('post-list', 'post'): Route(6, seed_new_post, 'post'),
+    ('post-detail', 'patch'): Route(5, seed_own_post, 'patch'),
+    ('post-detail', 'delete'): Route(8, seed_own_post, 'delete'),
+    # 回复另加通知被回复者：作者 1 + 聚合通知 5
+    ('post-comments-list', 'post'): Route(9, seed_new_comment, 'post'),
+    ('post-comments-detail', 'patch'): Route(4, seed_own_comment, 'patch'),
+    ('post-comments-detail', 'delete'): Route(5, seed_own_comment, 'delete'),
+    ('conversation-messages-list', 'post'): Route(6, seed_new_message, 'post'),
+    ('conversation-messages-detail', 'patch'): Route(2, seed_own_message, 'patch'),
+    ('conversation-messages-detail', 'delete'): Route(3, seed_own_message, 'delete'),
+}
+
+EXEMPT = {
+    'wx-login': "调用微信接口，吞吐由 bench_wx_login 覆盖",
+    'wx-login-async': "调用微信接口，吞吐由 bench_wx_login 覆盖",
+    'upload-idcard': "multipart 上传与后台图片处理，见 test_auth_upload",
+    'upload-idcard-presign': "需要 S3 兼容存储，见 test_direct_upload",
+    'upload-idcard-complete': "需要 S3 兼容存储，见 test_direct_upload",
+    'email-send-code': "单条写入加发信队列，见 test_email_verification",
+    'email-verify': "单条验证码校验，见 test_email_verification",
+    'profile-download': "读取本地分析文件，不查询数据库，见 test_profiling",
+}
+
+
+def route_names(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from route_names(pattern.url_patterns)
+        elif pattern.name:
+            yield pattern.name
+
+
+class Context:
+    def __init__(self, user):
+        self.user = user
+
+
+def client_for(user):
+    client = APIClient()
+    token = PrincipalRefreshToken.for_user(user).access_token
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return client
+
+
+def measure(client, name, route, ctx, n):
+    kwargs, data = route.seed(ctx, n)
+    url = reverse(f'api_v1:{name}', kwargs=kwargs)
+    with CaptureQueriesContext(connection) as queries:
+        response = getattr(client, route.method)(url, data, format='json')
+    assert response.status_code < 400, response.data
+    return len(queries)
+
+
+class TestQueryBudgets:
+    def test_every_route_is_budgeted(self):
+        """core/urls.py 中的每个路由都要声明预算或豁免原因"""
+        names = set(route_names(api_v1_patterns))
+        assert names - set(ROUTES) - set(EXEMPT) == set()
+        assert set(ROUTES) | set(EXEMPT) <= names
+
+    def test_write_routes_exist(self):
+        names = set(route_names(api_v1_patterns))
+        assert {name for name, _ in WRITE_ROUTES} <= names
+        assert all(route.method == method for (_, method), route in WRITE_ROUTES.items())
+
+    @pytest.mark.parametrize('name', sorted(ROUTES))
+    def test_query_count_independent_of_size(self, name):
+        """小规模和大规模数据下查询数相同，且不超过预算"""
+        self.check_budget(name, ROUTES[name], LARGE)
+
+    @pytest.mark.parametrize('name, method', sorted(WRITE_ROUTES))
+    def test_write_query_count_independent_of_size(self, name, method):
+        """创建、修改、删除接口同样要求查询数与数据规模无关"""
+        self.check_budget(name, WRITE_ROUTES[name, method], WRITE_LARGE)
+
+    def check_budget(self, name, route, size):
+        user = UserFactory(password=None, is_verified_user=True, is_staff=route.staff)
+        ctx = Context(user)
+        client = client_for(user)
+
+        # 预热：认证缓存、ContentType 缓存等一次性查询不计入
+        measure(client, name, route, ctx, 1)
+        small = measure(client, name, route, ctx, SMALL)
+        large = measure(client, name, route, ctx, size)
+
+        assert small == large, f"{name}: {small} queries at {SMALL} rows, {large} at {size}"
+        assert large <= route.budget, f"{name}: {large} queries, budget {route.budget}"
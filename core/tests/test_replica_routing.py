@@ -0,0 +1,106 @@
+import time
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Comment, Post, User
+from core.routers import check_shared_cache
+from core.tests.factories import PostFactory, UserFactory
+
+# 主库和副本是两个独立的 SQLite 库，数据不会同步，读到哪边的数据就说明查询发往了哪个库
+pytestmark = pytest.mark.django_db(databases=['default', 'replica'])
+
+
+@pytest.fixture(autouse=True)
+def replicas(settings):
+    settings.DATABASE_REPLICAS = ['replica']
+    settings.REPLICA_STICKY_SECONDS = 60
+
+
+@pytest.fixture
+def replica_post():
+    author = User.objects.using('replica').create(username='replica-author')
+    return Post.objects.using('replica').create(
+        title='replica only', content='...', author=author, status='published'
+    )
+
+
+def titles(response):
+    return [post['title'] for post in response.data]
+
+
+def client_for(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+class TestReplicaRouting:
+    def test_safe_reads_go_to_replica(self, api_client, replica_post):
+        """
+        帖子、评论、分类、标签的读请求发往副本
+        """
+        PostFactory(title='primary only')
+        assert titles(api_client.get(reverse('api_v1:post-list'))) == ['replica only']
+        Comment.objects.using('replica').create(post=replica_post, author=replica_post.author, content='hi')
+        response = api_client.get(reverse('api_v1:post-comments-list', kwargs={'post_pk': replica_post.pk}))
+        assert [comment['content'] for comment in response.data] == ['hi']
+
+    def test_other_viewsets_stay_on_primary(self, test_user, replica_post):
+        """
+        未开启副本读的视图集仍然读主库
+        """
+        response = client_for(test_user).get(reverse('api_v1:user-list'))
+        assert [user['username'] for user in response.data] == [test_user.username]
+
+    def test_disabled_without_replicas(self, api_client, settings, replica_post):
+        """
+        DATABASE_REPLICAS 为空时全部读主库
+        """
+        settings.DATABASE_REPLICAS = []
+        PostFactory(title='primary only')
+        assert titles(api_client.get(reverse('api_v1:post-list'))) == ['primary only']
+
+    def test_writes_stick_user_to_primary(self, replica_post):
+        """
+        用户写入后在粘滞窗口内读主库，能读到自己刚写的数据；其他用户仍读副本
+        """
+        writer, other = UserFactory(is_verified_user=True), UserFactory()
+        post = PostFactory(title='primary only')
+        writer_client = client_for(writer)
+
+        assert titles(writer_client.get(reverse('api_v1:post-list'))) == ['replica only']
+        response = writer_client.post(reverse('api_v1:post-like', kwargs={'pk': post.pk}))
+        assert response.status_code == 200
+
+        assert titles(writer_client.get(reverse('api_v1:post-list'))) == ['primary only']
+        assert titles(client_for(other).get(reverse('api_v1:post-list'))) == ['replica only']
+
+    def test_sticky_window_expires(self, settings, replica_post):
+        """
+        粘滞窗口过后重新读副本
+        """
+        settings.REPLICA_STICKY_SECONDS = 0.01
+        writer = UserFactory(is_verified_user=True)
+        post = PostFactory(title='primary only')
+        client = client_for(writer)
+        client.post(reverse('api_v1:post-like', kwargs={'pk': post.pk}))
+
+        time.sleep(0.05)
+        assert titles(client.get(reverse('api_v1:post-list'))) == ['replica only']
+
+    def test_replicas_require_shared_cache(self, settings, tmp_path):
+        """
+        配置了副本而缓存是进程内的 LocMem 时拒绝启动，粘滞标记必须在 worker 之间共享
+        """
+        with pytest.raises(ImproperlyConfigured):
+            check_shared_cache()
+        settings.CACHES = {'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': str(tmp_path),
+        }}
+        check_shared_cache()
+        settings.DATABASE_REPLICAS = []
+        settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        check_shared_cache()
@@ -0,0 +1,49 @@
+import pytest
+from datetime import timedelta
+from django.core.management import call_command
+from django.utils import timezone
+from core.models import Conversation, Notification, NotificationCounter, PrivateMessage
+from core.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+class TestRetention:
+    def test_prune_expired_notifications(self, test_user):
+        old = timezone.now() - timedelta(days=120)
+        read_old = [
+            Notification.objects.create(recipient=test_user, notif_type='system', is_read=True, created_at=old)
+            for _ in range(5)
+        ]
+        unread_old = Notification.objects.create(recipient=test_user, notif_type='system', created_at=old)
+        fresh = Notification.objects.create(recipient=test_user, notif_type='system', is_read=True)
+
+        call_command('prune_expired_data', '--chunk-size', '2')
+
+        remaining = set(Notification.objects.values_list('id', flat=True))
+        assert remaining == {unread_old.id, fresh.id}
+        assert not remaining & {n.id for n in read_old}
+        assert NotificationCounter.get_count(test_user.id) == 1
+
+    def test_prune_messages_deleted_by_both_sides(self, test_user):
+        other = UserFactory()
+        conversation = Conversation.objects.create()
+        conversation.participants.add(test_user, other)
+        old = timezone.now() - timedelta(days=60)
+
+        def message(**kwargs):
+            return PrivateMessage.objects.create(
+                conversation=conversation, sender=test_user, receiver=other,
+                content='hi', sent_at=old, **kwargs
+            )
+
+        gone = message(sender_deleted=True, receiver_deleted=True)
+        kept = message(sender_deleted=True)
+        conversation.last_message = gone
+        conversation.save()
+
+        call_command('prune_expired_data')
+
+        assert list(PrivateMessage.objects.values_list('id', flat=True)) == [kept.id]
+        conversation.refresh_from_db()
+        assert conversation.last_message is None
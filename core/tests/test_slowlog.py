@@ -0,0 +1,85 @@
+import runpy
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.conf import settings as django_settings
+from django.test import AsyncClient
+from django.urls import reverse
+
+from core.models import SlowQuery
+from core.slowlog import normalize
+from core.tests.factories import PostFactory
+
+pytestmark = pytest.mark.django_db
+
+
+class TestNormalize:
+    def test_fingerprint_ignores_literals_and_in_lists(self):
+        """
+        字面量、参数占位符和 IN 列表长度不同的查询归一化为同一条 SQL
+        """
+        assert normalize("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'a''b' LIMIT 21") == \
+            normalize("SELECT *  FROM t\nWHERE id IN (%s) AND name = 'x' LIMIT 5")
+        assert normalize('SELECT "t0"."id" FROM "t0" WHERE "t0"."n" > 10') == \
+            'SELECT "t0"."id" FROM "t0" WHERE "t0"."n" > ?'
+
+
+class TestSlowQueryLog:
+    def test_records_slow_queries_with_plan(self, api_client, settings):
+        """
+        超过阈值的查询按指纹聚合，记录来源视图、调用栈和执行计划
+        """
+        settings.SLOW_QUERY_THRESHOLD_MS = 0
+        posts = PostFactory.create_batch(2)
+
+        for post in posts:
+            api_client.get(reverse('api_v1:post-detail', kwargs={'pk': post.pk}))
+
+        row = SlowQuery.objects.get(sql__contains='FROM "core_post"')
+        assert row.count == 2
+        assert row.last_view == 'api_v1:post-detail'
+        assert row.max_time > 0 and row.total_time >= row.max_time
+        assert row.stack
+        assert row.plan
+
+    def test_below_threshold_not_recorded(self, api_client, settings):
+        """
+        低于阈值的查询不记录
+        """
+        settings.SLOW_QUERY_THRESHOLD_MS = 10000
+        PostFactory()
+        api_client.get(reverse('api_v1:post-list'))
+        assert not SlowQuery.objects.exists()
+
+    def test_explain_skips_writes(self, authenticated_client, settings):
+        """
+        写语句只记录，不执行 EXPLAIN
+        """
+        post = PostFactory()
+        settings.SLOW_QUERY_THRESHOLD_MS = 0
+        authenticated_client.post(reverse('api_v1:post-like', kwargs={'pk': post.pk}))
+        insert = SlowQuery.objects.get(sql__startswith='INSERT INTO "core_action"')
+        assert insert.plan == ''
+
+    def test_records_sync_view_queries_under_asgi(self, settings):
+        """
+        ASGI 下同步视图在另一个线程执行，其中的慢查询同样被记录
+        """
+        settings.SLOW_QUERY_THRESHOLD_MS = 0
+        post = PostFactory()
+
+        async def get():
+            return await AsyncClient().get(reverse('api_v1:post-detail', kwargs={'pk': post.pk}))
+
+        assert async_to_sync(get)().status_code == 200
+        row = SlowQuery.objects.get(sql__contains='FROM "core_post"')
+        assert row.last_view == 'api_v1:post-detail'
+
+    @pytest.mark.parametrize('value, expected', [('', None), ('off', None), (' OFF ', None), ('150', 150.0)])
+    def test_threshold_from_environment(self, monkeypatch, value, expected):
+        """
+        环境变量为空或 off 时关闭慢查询日志
+        """
+        monkeypatch.setenv('SLOW_QUERY_THRESHOLD_MS', value)
+        config = runpy.run_path(str(django_settings.BASE_DIR / 'huijia' / 'settings.py'))
+        assert config['SLOW_QUERY_THRESHOLD_MS'] == expected
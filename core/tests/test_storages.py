@@ -0,0 +1,95 @@
+import pytest
+from botocore.config import Config as BotocoreConfig
+from core import storages
+from core.storages import MediaStorage
+
+
+@pytest.fixture
+def media_storage():
+    """签名只在本地计算，不需要真实的存储服务"""
+    return MediaStorage(
+        bucket_name='huijia-test',
+        endpoint_url='http://127.0.0.1:9',
+        access_key='testing',
+        secret_key='testing',
+        region_name='us-east-1',
+        custom_domain=None,
+        querystring_expire=3600,
+        client_config=BotocoreConfig(signature_version='s3v4', s3={'addressing_style': 'path'}),
+    )
+
+
+@pytest.fixture
+def fake_clock(monkeypatch):
+    clock = {'now': 1_000_000_000.0}
+    monkeypatch.setattr(storages.time, 'time', lambda: clock['now'])
+    return clock
+
+
+class TestSignedURLCache:
+    def test_reuses_signature_within_window(self, media_storage, fake_clock):
+        """
+        同一窗口内同一对象只签名一次，URL 保持不变；进入下一个窗口后重新签名
+        """
+        client = media_storage.connection.meta.client
+        calls = []
+        original = client.generate_presigned_url
+
+        def counting(*args, **kwargs):
+            calls.append(kwargs['Params']['Key'])
+            return original(*args, **kwargs)
+
+        client.generate_presigned_url = counting
+
+        first = media_storage.url('student_ids/a.jpg')
+        fake_clock['now'] += 60
+        assert media_storage.url('student_ids/a.jpg') == first
+        assert 'X-Amz-Signature' in first
+        assert len(calls) == 1
+
+        media_storage.url('student_ids/b.jpg')
+        assert len(calls) == 2
+
+        fake_clock['now'] += 1800
+        media_storage.url('student_ids/a.jpg')
+        assert len(calls) == 3
+
+    def test_shared_cache_across_instances(self, media_storage, fake_clock):
+        """
+        另一个存储实例从 Django cache 拿到同一个 URL（跨 worker 需要配置 REDIS_URL 共享缓存）
+        """
+        first = media_storage.url('student_ids/a.jpg')
+        other = MediaStorage(**{
+            key: getattr(media_storage, key) for key in (
+                'bucket_name', 'endpoint_url', 'access_key', 'secret_key', 'region_name',
+                'custom_domain', 'querystring_expire', 'client_config',
+            )
+        })
+        fake_clock['now'] += 5
+        assert other.url('student_ids/a.jpg') == first
+
+    def test_explicit_arguments_bypass_cache(self, media_storage, fake_clock):
+        """
+        指定了有效期或额外参数时不走缓存
+        """
+        first = media_storage.url('student_ids/a.jpg')
+        fake_clock['now'] += 1
+        assert media_storage.url('student_ids/a.jpg', expire=60) != first
+        assert media_storage.url(
+            'student_ids/a.jpg', parameters={'ResponseContentDisposition': 'attachment'}
+        ) != first
+
+    def test_window_setting_read_at_call_time(self, media_storage, fake_clock, settings):
+        """
+        MEDIA_URL_CACHE_WINDOW 在每次生成 URL 时读取，修改设置后立即生效
+        """
+        client = media_storage.connection.meta.client
+        calls = []
+        original = client.generate_presigned_url
+        client.generate_presigned_url = lambda *a, **kw: calls.append(1) or original(*a, **kw)
+
+        settings.MEDIA_URL_CACHE_WINDOW = 10
+        media_storage.url('student_ids/a.jpg')
+        fake_clock['now'] += 10
+        media_storage.url('student_ids/a.jpg')
+        assert len(calls) == 2
@@ -0,0 +1,95 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.urls import reverse
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from core import throttling
+from core.tests.factories import PostFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(params=['local', 'cache'])
+def backend(request, settings):
+    settings.THROTTLE_BACKEND = request.param
+    throttling.get_store().clear()
+    yield request.param
+    throttling.get_store().clear()
+
+
+class TestSlidingWindow:
+    def test_limit_within_window(self, backend):
+        for _ in range(3):
+            assert throttling.check('k', 3, 60, now=1000.0)[0]
+        allowed, wait = throttling.check('k', 3, 60, now=1010.0)
+        assert not allowed
+        # 当前窗口已满，要等到下一个窗口开始（1020）
+        assert wait == pytest.approx(10.0)
+
+    def test_previous_window_is_weighted(self, backend):
+        for _ in range(4):
+            throttling.check('k', 4, 60, now=1000.0)
+        # 下一窗口过了 1/4，上一窗口的 4 次按 3 次计
+        assert throttling.check('k', 4, 60, now=1035.0)[0]
+        assert not throttling.check('k', 4, 60, now=1035.0)[0]
+        # 两个窗口之后计数清零
+        assert throttling.check('k', 4, 60, now=1200.0)[0]
+
+    def test_clear_keeps_other_cache_entries(self, backend):
+        from django.core.cache import cache
+
+        cache.set('unrelated', 1)
+        throttling.check('k', 1, 60, now=1000.0)
+        throttling.get_store().clear()
+        assert throttling.check('k', 1, 60, now=1000.0)[0]
+        assert cache.get('unrelated') == 1
+
+
+    def test_concurrent_requests_do_not_exceed_limit(self, backend):
+        """
+        并发请求先计数再判断，不会在读到同一个旧计数后一起放行；被拒绝的请求不占名额
+        """
+        barrier = threading.Barrier(20)
+
+        def hit():
+            barrier.wait()
+            return throttling.check('k', 5, 60, now=1000.0)[0]
+
+        with ThreadPoolExecutor(max_workers=20) as executor:
+            results = list(executor.map(lambda _: hit(), range(20)))
+        assert results.count(True) == 5
+        assert not throttling.check('k', 5, 60, now=1001.0)[0]
+        assert throttling.check('k', 6, 60, now=1001.0)[0]
+
+
+class TestThrottleIdent:
+    def test_ip_ignores_spoofed_forwarded_for(self):
+        """
+        未配置 NUM_PROXIES 时按 REMOTE_ADDR 计数，伪造 X-Forwarded-For 不能换一个限流 key
+        """
+        factory = APIRequestFactory()
+        throttle = throttling.SlidingWindowThrottle('login', by='ip')
+        keys = {
+            throttle.get_cache_key(Request(factory.post('/', HTTP_X_FORWARDED_FOR=f'10.0.0.{i}')))
+            for i in range(3)
+        }
+        assert keys == {'login:ip:127.0.0.1'}
+
+
+class TestViewThrottles:
+    def test_like_toggle_is_throttled_per_user(self, authenticated_client, settings):
+        settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK,
+            'DEFAULT_THROTTLE_RATES': {'toggle': '2/min'},
+        }
+        post = PostFactory()
+        url = reverse('api_v1:post-like', kwargs={'pk': post.id})
+        assert authenticated_client.post(url).status_code == 200
+        assert authenticated_client.post(url).status_code == 200
+        response = authenticated_client.post(url)
+        assert response.status_code == 429
+        assert int(response['Retry-After']) > 0
+        # 读接口不受影响
+        assert authenticated_client.get(reverse('api_v1:post-detail', kwargs={'pk': post.id})).status_code == 200
@@ -0,0 +1,129 @@
+import pytest
+from django.contrib.admin.sites import site
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APIRequestFactory
+from core.authentication import PrincipalJWTAuthentication, PrincipalRefreshToken, version_cache_key
+from core.models import StudentIDUpload
+from core.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def staff_client(api_client, admin_user):
+    api_client.force_authenticate(user=admin_user)
+    return api_client
+
+
+def make_upload(user=None, **kwargs):
+    return StudentIDUpload.objects.create(
+        user=user or UserFactory(is_verified_user=False),
+        image='student_ids/test.jpg',
+        **kwargs
+    )
+
+
+class TestVerificationReviewQueue:
+    def test_requires_staff(self, authenticated_client):
+        """
+        普通用户不能访问审核队列
+        """
+        response = authenticated_client.get(reverse('api_v1:verification-review-list'))
+        assert response.status_code == 403
+
+    def test_list_pending_pages(self, staff_client):
+        """
+        默认只列出待审核的上传，按上传时间先进先出游标翻页
+        """
+        uploads = [make_upload() for _ in range(3)]
+        make_upload(status='approved')
+        url = reverse('api_v1:verification-review-list')
+
+        response = staff_client.get(url, {'page_size': 2})
+        assert response.status_code == 200
+        assert [row['id'] for row in response.data['results']] == [u.id for u in uploads[:2]]
+        assert response.data['results'][0]['nickname'] == uploads[0].user.nickname
+
+        response = staff_client.get(response.data['next'])
+        assert [row['id'] for row in response.data['results']] == [uploads[2].id]
+        assert response.data['next'] is None
+
+    def test_bulk_decide(self, staff_client):
+        """
+        批量通过/拒绝：通过的用户变为学生证认证用户，已审核的记录不会被重复处理
+        """
+        approved = [make_upload() for _ in range(2)]
+        rejected = make_upload()
+        already = make_upload(status='rejected')
+        url = reverse('api_v1:verification-review-decide')
+
+        response = staff_client.post(url, {
+            'approve': [u.id for u in approved] + [already.id],
+            'reject': [rejected.id],
+            'review_note': '批量审核',
+        }, format='json')
+
+        assert response.status_code == 200
+        assert response.data == {'approved': 2, 'rejected': 1, 'verified_users': 2}
+        for upload in approved:
+            upload.refresh_from_db()
+            upload.user.refresh_from_db()
+            assert upload.status == 'approved'
+            assert upload.review_note == '批量审核'
+            assert upload.user.is_verified_user
+            assert upload.user.verification_method == 'idcard'
+            assert upload.user.verification_submitted_at == upload.uploaded_at
+            assert upload.user.verification_approved_at is not None
+        rejected.refresh_from_db()
+        rejected.user.refresh_from_db()
+        assert rejected.status == 'rejected'
+        assert not rejected.user.is_verified_user
+        already.refresh_from_db()
+        assert already.status == 'rejected'
+
+    def test_decide_invalidates_token_principal(self, staff_client, django_capture_on_commit_callbacks):
+        """
+        批量通过后，用户旧 token 中的认证状态失效；缓存中的版本号在事务提交后才删除
+        """
+        user = UserFactory(is_verified_user=False)
+        upload = make_upload(user=user)
+        old_version = user.token_version
+        token = PrincipalRefreshToken.for_user(user).access_token
+        assert cache.get(version_cache_key(user.pk)) == old_version
+
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            staff_client.post(
+                reverse('api_v1:verification-review-decide'), {'approve': [upload.id]}, format='json'
+            )
+            assert cache.get(version_cache_key(user.pk)) == old_version
+        assert callbacks
+
+        user.refresh_from_db()
+        assert user.token_version > old_version
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        principal, _ = PrincipalJWTAuthentication().authenticate(request)
+        assert principal.is_verified_user is True
+
+    def test_decide_validation(self, staff_client):
+        """
+        approve 与 reject 不能都为空，也不能有重叠
+        """
+        url = reverse('api_v1:verification-review-decide')
+        assert staff_client.post(url, {}, format='json').status_code == 400
+        assert staff_client.post(url, {'approve': [1], 'reject': [1]}, format='json').status_code == 400
+
+    def test_admin_actions(self, client, admin_user):
+        """
+        admin 的批量操作走同一套审核逻辑
+        """
+        upload = make_upload()
+        client.force_login(admin_user)
+        response = client.post(reverse('admin:core_studentidupload_changelist'), {
+            'action': 'approve_selected',
+            '_selected_action': [upload.id],
+        })
+        assert response.status_code == 302
+        upload.refresh_from_db()
+        assert upload.status == 'approved'
+        assert StudentIDUpload in site._registry
@@ -0,0 +1,147 @@
+import time
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from rest_framework.exceptions import AuthenticationFailed
+from core import wechat
+from core.models import User
+from core.wechat import WeChatClient
+from core.wechat_stub import StubServer, fake_session
+
+pytestmark = pytest.mark.django_db
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def errors(kind):
+    return sample('wechat_code2session_errors_total', kind=kind)
+
+
+@pytest.fixture
+def stub_server():
+    server = StubServer()
+    server.start_in_thread()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def stub_client(stub_server, settings):
+    settings.WECHAT_API_BASE = stub_server.base_url
+    wechat.reset_client()
+    yield wechat.get_client()
+    wechat.reset_client()
+
+
+class TestWeChatClient:
+    def test_login_through_stub(self, api_client, stub_client):
+        url = reverse('api_v1:wx-login')
+        before = sample('wechat_code2session_duration_seconds_count', outcome='ok')
+        response = api_client.post(url, {'code': 'abc', 'nickName': '小程序用户'})
+        assert response.status_code == 200
+        assert response.data['access']
+        user = User.objects.get(openid=fake_session('abc')['openid'])
+        assert user.nickname == '小程序用户'
+
+        # 同一个 code 再次登录不会新建用户
+        api_client.post(url, {'code': 'abc'})
+        assert User.objects.filter(openid=user.openid).count() == 1
+        assert sample('wechat_code2session_duration_seconds_count', outcome='ok') == before + 2
+
+    def test_async_login_matches_sync_contract(self, client, api_client, stub_client):
+        payload = {'code': 'async-code', 'nickName': '异步用户'}
+        response = client.post(reverse('api_v1:wx-login-async'), payload, content_type='application/json')
+        assert response.status_code == 200
+        data = response.json()
+        assert set(data) == {'access', 'refresh', 'access_expires', 'user'}
+        assert data['user']['nickname'] == '异步用户'
+
+        sync_response = api_client.post(reverse('api_v1:wx-login'), payload, format='json')
+        assert sync_response.data['user'] == data['user']
+
+        response = client.post(reverse('api_v1:wx-login-async'), {}, content_type='application/json')
+        assert response.status_code == 400
+        # WSGI 下每个请求的事件循环都是临时的，客户端用完即关闭，不缓存
+        assert not wechat._async_clients
+
+    def test_async_login_under_asgi(self, stub_client):
+        """
+        ASGI 下同样可以登录，事件循环上的客户端被复用
+        """
+        async def login():
+            client = AsyncClient()
+            url = reverse('api_v1:wx-login-async')
+            first = await client.post(url, {'code': 'asgi-code'}, content_type='application/json')
+            second = await client.post(url, {'code': 'asgi-code'}, content_type='application/json')
+            return first, second, len(wechat._async_clients)
+
+        first, second, clients = async_to_sync(login)()
+        assert first.status_code == second.status_code == 200
+        assert first.json()['user']['id'] == second.json()['user']['id']
+        assert clients == 1
+
+    def test_invalid_code(self, api_client, stub_client):
+        response = api_client.post(reverse('api_v1:wx-login'), {'code': 'invalid-1'})
+        assert response.status_code == 400
+
+    def test_circuit_breaker_opens(self, stub_server):
+        stub_server.error_rate = 1.0
+        client = WeChatClient('appid', 'secret', api_base=stub_server.base_url,
+                              retries=0, failure_threshold=2, reset_timeout=60)
+        before = errors('request'), errors('circuit_open')
+        for _ in range(2):
+            with pytest.raises(AuthenticationFailed):
+                client.code2session('abc')
+        assert client.breaker.state == client.breaker.OPEN
+
+        with pytest.raises(AuthenticationFailed):
+            client.code2session('abc')
+        assert (errors('request'), errors('circuit_open')) == (before[0] + 2, before[1] + 1)
+
+    def test_retries_only_busy_and_connect_failures(self, stub_server):
+        """
+        微信返回系统繁忙时重试；HTTP 5xx 可能已消耗 js_code，不重放
+        """
+        client = WeChatClient('appid', 'secret', api_base=stub_server.base_url, retries=2, backoff=0)
+        stub_server.busy_responses = 1
+        assert client.code2session('abc') == fake_session('abc')
+        assert stub_server.requests == 2
+
+        stub_server.error_rate = 1.0
+        with pytest.raises(AuthenticationFailed):
+            client.code2session('abc')
+        assert stub_server.requests == 3
+
+        # 连接被拒绝时请求尚未发出，重试后在 deadline 内放弃
+        stub_server.shutdown()
+        stub_server.server_close()
+        client = WeChatClient('appid', 'secret', api_base=stub_server.base_url, retries=5,
+                              backoff=0.3, deadline=0.5)
+        before = errors('request')
+        started = time.monotonic()
+        with pytest.raises(AuthenticationFailed):
+            client.code2session('abc')
+        assert time.monotonic() - started < 1
+        assert errors('request') == before + 1
+
+    def test_half_open_probe_always_records_outcome(self, stub_server, monkeypatch):
+        """
+        半开状态的探测请求抛出意外异常时也记为失败，熔断器重新打开而不是停在半开
+        """
+        client = WeChatClient('appid', 'secret', api_base=stub_server.base_url,
+                              failure_threshold=1, reset_timeout=0)
+        client.breaker.record_failure()
+        monkeypatch.setattr(client.session, 'get', lambda *args, **kwargs: 1 / 0)
+        with pytest.raises(ZeroDivisionError):
+            client.code2session('abc')
+        assert client.breaker.state == client.breaker.OPEN
+
+        monkeypatch.undo()
+        assert client.code2session('abc') == fake_session('abc')
+        assert client.breaker.state == client.breaker.CLOSED
@@ -0,0 +1,172 @@
+"""
+按 scope 配置的滑动窗口限流。
+
+采用滑动窗口计数器：每个 key 只保存上一个和当前固定窗口的计数，
+用上一窗口计数按剩余比例加权估算滑动窗口内的请求数，内存 O(1)，并随窗口过期。
+速率沿用 DRF 的写法，配置在 REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']；
+THROTTLE_BACKEND 选择进程内存储（'local'）或 Django 缓存（'cache'）；
+只有 CACHES['default'] 是共享缓存（设置了 REDIS_URL）时，'cache' 的计数才在 worker 之间共享。
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """
+    '10/min' -> (10, 60)
+    """
+    num, period = rate.split('/')
+    return int(num), DURATIONS[period[0]]
+
+
+class LocalStore:
+    """
+    进程内存储，每个 key 一条 [窗口号, 上一窗口计数, 当前窗口计数, 过期时间]。
+    """
+    PRUNE_EVERY = 1024
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def namespace(self):
+        return None
+
+    @staticmethod
+    def _shift(entry, window_id):
+        last_id, prev, curr, _ = entry
+        if last_id == window_id:
+            return prev, curr
+        if last_id == window_id - 1:
+            return curr, 0
+        return 0, 0
+
+    def hit(self, namespace, key, window_id, duration, now):
+        with self._lock:
+            entry = self._data.get(key)
+            prev, curr = self._shift(entry, window_id) if entry else (0, 0)
+            self._data[key] = [window_id, prev, curr + 1, now + 2 * duration]
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                self._prune(now)
+            return prev, curr + 1
+
+    def release(self, namespace, key, window_id):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] == window_id and entry[2] > 0:
+                entry[2] -= 1
+
+    def _prune(self, now):
+        expired = [key for key, entry in self._data.items() if entry[3] <= now]
+        for key in expired:
+            del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class CacheStore:
+    """
+    基于 Django 缓存的存储，每个窗口一个计数键，两个窗口后过期。
+    键名带代数（generation），clear() 只让限流计数失效，不清空缓存中的其它数据；
+    代数每次 check() 只读一次，一次 check() 共 4 次缓存往返（代数、add、incr、上一窗口），被拒绝时多一次 decr。
+    """
+    prefix = 'throttle'
+    generation_key = f'{prefix}:generation'
+
+    def namespace(self):
+        return f"{self.prefix}:{cache.get(self.generation_key, 0)}"
+
+    def hit(self, namespace, key, window_id, duration, now):
+        curr_key = f"{namespace}:{key}:{window_id}"
+        cache.add(curr_key, 0, 2 * duration)
+        try:
+            curr = cache.incr(curr_key)
+        except ValueError:
+            # 恰好在 add 和 incr 之间过期；用 add 而不是 set，不覆盖并发请求的计数
+            curr = 1 if cache.add(curr_key, 1, 2 * duration) else cache.incr(curr_key)
+        prev = cache.get(f"{namespace}:{key}:{window_id - 1}", 0)
+        return prev, curr
+
+    def release(self, namespace, key, window_id):
+        try:
+            cache.decr(f"{namespace}:{key}:{window_id}")
+        except ValueError:
+            pass
+
+    def clear(self):
+        if not cache.add(self.generation_key, 1, None):
+            cache.incr(self.generation_key)
+
+
+_stores = {'local': LocalStore(), 'cache': CacheStore()}
+
+
+def get_store():
+    return _stores[getattr(settings, 'THROTTLE_BACKEND', 'cache')]
+
+
+def check(key, limit, duration, now=None):
+    """
+    对 key 记一次请求；返回 (是否放行, 被拒绝时建议等待的秒数)。被拒绝的请求不计数。
+
+    先原子地给当前窗口加一，再用加一之后的值判断，并发请求不会都在读到旧计数后一起放行；
+    被拒绝时再减回去。
+    """
+    store = get_store()
+    now = time.time() if now is None else now
+    window_id = int(now // duration)
+    elapsed = (now % duration) / duration
+
+    namespace = store.namespace()
+    prev, curr = store.hit(namespace, key, window_id, duration, now)
+    if prev * (1 - elapsed) + curr <= limit:
+        return True, None
+    store.release(namespace, key, window_id)
+
+    # 当前窗口已满只能等到下一窗口；否则等上一窗口的权重衰减到有余量
+    if curr > limit or not prev:
+        wait = (1 - elapsed) * duration
+    else:
+        needed = 1 - (limit - curr) / prev
+        wait = max(needed - elapsed, 0) * duration
+    return False, wait
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """
+    DRF 限流类。by='user' 时登录用户按用户 id、匿名请求按 IP 计数；by='ip' 时总是按 IP 计数。
+    IP 由 DRF 的 get_ident 取得，只有 REST_FRAMEWORK['NUM_PROXIES'] 层代理追加的 X-Forwarded-For 才被采信，
+    默认 0 即只用 REMOTE_ADDR，客户端伪造的 X-Forwarded-For 不能绕过限流。
+    """
+    def __init__(self, scope, by='user'):
+        self.scope = scope
+        self.by = by
+        self._wait = None
+
+    def get_cache_key(self, request):
+        user = getattr(request, 'user', None)
+        if self.by == 'user' and user is not None and user.is_authenticated:
+            return f"{self.scope}:user:{user.pk}"
+        return f"{self.scope}:ip:{self.get_ident(request)}"
+
+    def allow_request(self, request, view):
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        if not rate:
+            return True
+        limit, duration = parse_rate(rate)
+        allowed, self._wait = check(self.get_cache_key(request), limit, duration)
+        return allowed
+
+    def wait(self):
+        return self._wait
@@ -13,6 +13,7 @@ router.register(r'posts', views.PostViewSet, basename='post')
 router.register(r'actions', views.ActionViewSet, basename='action')
 router.register(r'conversations', views.ConversationViewSet, basename='conversation')
 router.register(r'notifications', views.NotificationViewSet, basename='notification')
+router.register(r'verification-reviews', views.VerificationReviewViewSet, basename='verification-review')
 
 # Nested routers for comments and messages
 posts_router = routers.NestedDefaultRouter(router, r'posts', lookup='post')
@@ -24,8 +25,15 @@ conversations_router.register(r'messages', views.PrivateMessageViewSet, basename
 # API v1 URL patterns
 api_v1_patterns = [
     path('wx/login/', views.WXLoginView.as_view(), name='wx-login'),
+    path('wx/login-async/', views.AsyncWXLoginView.as_view(), name='wx-login-async'),
     path('me/', views.MeView.as_view(), name='me'),
     path('auth/upload-idcard/', views.UploadStudentIDView.as_view(), name='upload-idcard'),  
+    path('auth/upload-idcard/presign/', views.StudentIDPresignView.as_view(), name='upload-idcard-presign'),
+    path('auth/upload-idcard/complete/', views.StudentIDUploadCompleteView.as_view(), name='upload-idcard-complete'),
+    path('auth/upload-idcard/<int:pk>/', views.StudentIDUploadDetailView.as_view(), name='upload-idcard-detail'),
+    path('auth/email/send-code/', views.SendEmailCodeView.as_view(), name='email-send-code'),
+    path('auth/email/verify/', views.VerifyEmailCodeView.as_view(), name='email-verify'),
+    path('profiles/<str:profile_id>/', views.ProfileDownloadView.as_view(), name='profile-download'),
     path('', include(router.urls)),
     path('', include(posts_router.urls)),
     path('', include(conversations_router.urls)),
@@ -0,0 +1,148 @@
+"""
+用户认证（学生身份）相关的业务逻辑。
+
+邮箱认证：生成 6 位验证码，事务提交后交给后台发信队列；校验时按 (email, code, is_used) 复合索引
+查找未过期的验证码，使用后标记为已用。一个邮箱只能认证一个账号。
+过期和已用的验证码由 prune_expired_data 分块清理。
+
+学生证认证：管理员批量审核待审核的 StudentIDUpload，上传状态和用户认证字段
+在同一事务中用集合更新完成，不逐条保存。
+"""
+import queue
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .authentication import invalidate_principals
+from .mailqueue import mail_queue
+from .models import EmailVerification, StudentIDUpload, User
+
+DEFAULT_CODE_TTL = timedelta(minutes=10)
+
+
+def code_ttl():
+    return getattr(settings, 'EMAIL_CODE_TTL', DEFAULT_CODE_TTL)
+
+
+def email_domain_allowed(email):
+    """
+    VERIFICATION_EMAIL_DOMAINS 为空时不限制，否则只接受列出的（学校）邮箱域名及其子域名。
+    """
+    domains = getattr(settings, 'VERIFICATION_EMAIL_DOMAINS', [])
+    if not domains:
+        return True
+    domain = email.rsplit('@', 1)[-1].lower()
+    return any(domain == d or domain.endswith('.' + d) for d in domains)
+
+
+def email_taken(user, email):
+    """
+    邮箱是否已经被其他已认证用户绑定。
+    """
+    return User.objects.filter(email__iexact=email, is_verified_user=True).exclude(pk=user.pk).exists()
+
+
+def send_email_code(user, email):
+    """
+    创建验证码并在事务提交后入队发信；队列已满时删除验证码并抛出 queue.Full。
+    """
+    if email_taken(user, email):
+        raise ValidationError({'email': "该邮箱已被其他账号认证"})
+    code = f"{secrets.randbelow(10 ** 6):06d}"
+    record = EmailVerification.objects.create(user=user, email=email, code=code)
+    minutes = int(code_ttl().total_seconds() // 60)
+
+    def enqueue():
+        try:
+            mail_queue.enqueue(
+                subject="【汇家】邮箱验证码",
+                message=f"你的验证码是 {code}，{minutes} 分钟内有效。如非本人操作请忽略本邮件。",
+                recipient_list=[email],
+            )
+        except queue.Full:
+            EmailVerification.objects.filter(pk=record.pk).delete()
+            raise
+
+    # 回滚时不发信；不在事务中时立即执行，queue.Full 直接抛给调用方
+    transaction.on_commit(enqueue)
+    return record
+
+
+def verify_email_code(user, email, code):
+    """
+    校验验证码，成功后把用户标记为邮箱认证用户并返回 True。
+    """
+    now = timezone.now()
+    record = (
+        EmailVerification.objects
+        .filter(email=email, code=code, is_used=False, sent_at__gte=now - code_ttl(), user=user)
+        .order_by('-sent_at')
+        .first()
+    )
+    if record is None:
+        return False
+
+    with transaction.atomic():
+        # 锁住该邮箱的所有验证码，两个账号同时用同一邮箱认证时串行执行，后者能看到前者的结果
+        list(EmailVerification.objects.select_for_update().filter(email=email).values_list('pk', flat=True))
+        if email_taken(user, email):
+            raise ValidationError({'email': "该邮箱已被其他账号认证"})
+        # 并发提交同一验证码时只有一个请求能把它标记为已用
+        if not EmailVerification.objects.filter(pk=record.pk, is_used=False).update(is_used=True):
+            return False
+        user.email = email
+        user.is_verified_user = True
+        user.verification_method = 'email'
+        user.verification_submitted_at = record.sent_at
+        user.verification_approved_at = now
+        user.save(update_fields=[
+            'email', 'is_verified_user', 'verification_method',
+            'verification_submitted_at', 'verification_approved_at',
+        ])
+    return True
+
+
+def review_uploads(approve_ids=(), reject_ids=(), review_note=''):
+    """
+    批量审核学生证上传：只处理仍为 pending 的记录；通过的上传对应的未认证用户标记为学生证认证用户。
+    返回 {'approved': n, 'rejected': n, 'verified_users': n}。
+    """
+    now = timezone.now()
+    note = review_note or None
+    with transaction.atomic():
+        # 先锁住待审核的行，避免并发审核把同一条记录处理两次
+        locked = dict(
+            StudentIDUpload.objects.select_for_update()
+            .filter(status='pending', id__in=set(approve_ids) | set(reject_ids))
+            .values_list('id', 'user_id')
+        )
+        approved = [pk for pk in approve_ids if pk in locked]
+        rejected = [pk for pk in reject_ids if pk in locked]
+
+        StudentIDUpload.objects.filter(id__in=approved).update(status='approved', review_note=note)
+        StudentIDUpload.objects.filter(id__in=rejected).update(status='rejected', review_note=note)
+
+        user_ids = {locked[pk] for pk in approved}
+        first_upload = (
+            StudentIDUpload.objects
+            .filter(user=OuterRef('pk'), id__in=approved)
+            .order_by('uploaded_at')
+            .values('uploaded_at')[:1]
+        )
+        to_verify = list(
+            User.objects.filter(pk__in=user_ids, is_verified_user=False).values_list('pk', flat=True)
+        )
+        User.objects.filter(pk__in=to_verify).update(
+            is_verified_user=True,
+            verification_method='idcard',
+            verification_submitted_at=Subquery(first_upload),
+            verification_approved_at=now,
+        )
+        # 集合更新绕过了 User.save，需要手动让旧 token 中的认证状态失效
+        invalidate_principals(to_verify)
+    return {'approved': len(approved), 'rejected': len(rejected), 'verified_users': len(to_verify)}
@@ -6,29 +6,55 @@ from django.db.models import Count, Q
 from django.contrib.contenttypes.models import ContentType
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+import json
 import logging
-import requests
+import queue
 import uuid
 import os
 from datetime import datetime
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth import get_user_model
 from rest_framework.views import APIView
-from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.exceptions import AuthenticationFailed, NotFound
+from rest_framework.pagination import CursorPagination
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework.utils.urls import replace_query_param
 from .models import (
     User, Category, Tag, Post, Comment,
-    Action, Conversation, PrivateMessage, Notification, StudentIDUpload
+    Action, Conversation, PrivateMessage, Notification, NotificationCounter,
+    Broadcast, StudentIDUpload
 )
 from .serializers import (
     UserSerializer, CategorySerializer, TagSerializer,
     PostSerializer, CommentSerializer, ActionSerializer,
     ConversationSerializer, PrivateMessageSerializer,
-    NotificationSerializer, StudentIDUploadSerializer
+    NotificationSerializer, BroadcastSerializer, StudentIDUploadSerializer,
+    EmailCodeRequestSerializer, EmailCodeVerifySerializer,
+    DirectUploadRequestSerializer, DirectUploadCompleteSerializer,
+    VerificationReviewSerializer, VerificationDecisionSerializer
 )
+from . import wechat
+from .authentication import PrincipalRefreshToken
+from .eager import EagerLoadingMixin
+from .profiling import ProfilingMixin, profile_path
+from .routers import ReplicaReadMixin
+from .mentions import notify_mentions
+from .throttling import SlidingWindowThrottle
+from .notifications import (
+    notify, notification_page, decode_cursor, unread_total, mark_broadcasts_read
+)
+from .verification import review_uploads, send_email_code, verify_email_code
+from .imaging import create_upload
+from . import dedup, direct_upload
 from .permissions import (
     IsRegistered,
+    IsAuthenticatedUnverified,
     IsAuthenticatedAndVerified,
     IsOwnerOrReadOnly,
     IsSelfOrAdmin
@@ -37,34 +63,17 @@ from .permissions import (
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
-WX_APPID = getattr(settings, "WECHAT_APP_ID", "your_appid")
-WX_SECRET = getattr(settings, "WECHAT_APP_SECRET", "your_secret")
-
 # 封装：生成随机用户名
 def generate_username():
     return "wxuser_" + uuid.uuid4().hex[:10]
 
-# 封装：调用微信接口换 openid + session_key
+# 封装：调用微信接口换 openid + session_key（共享连接池、重试与熔断见 core.wechat）
 def get_wechat_session_info(code):
-    url = "https://api.weixin.qq.com/sns/jscode2session"
-    params = {
-        'appid': WX_APPID,
-        'secret': WX_SECRET,
-        'js_code': code,
-        'grant_type': 'authorization_code'
-    }
-    try:
-        resp = requests.get(url, params=params, timeout=5)
-        resp.raise_for_status()
-        return resp.json()
-    except requests.exceptions.Timeout:
-        raise AuthenticationFailed("请求微信超时")
-    except requests.exceptions.RequestException as e:
-        raise AuthenticationFailed(f"请求微信失败：{str(e)}")
-
-# 封装：签发 JWT 并返回过期时间
+    return wechat.get_client().code2session(code)
+
+# 封装：签发 JWT 并返回过期时间（token 中带有认证状态等身份声明，见 core.authentication）
 def generate_jwt_token_for_user(user):
-    refresh = RefreshToken.for_user(user)
+    refresh = PrincipalRefreshToken.for_user(user)
     access = refresh.access_token
     return {
         'refresh': str(refresh),
@@ -72,9 +81,44 @@ def generate_jwt_token_for_user(user):
         'access_expires': datetime.fromtimestamp(access['exp']).isoformat()
     }
 
+# 封装：老用户登录时补全缺失的资料，返回需要保存的字段
+def fill_missing_profile(user, nickname, avatar, unionid):
+    update_fields = []
+    if nickname and not user.nickname:
+        user.nickname = nickname
+        update_fields.append('nickname')
+    if avatar and not user.avatar:
+        user.avatar = avatar
+        update_fields.append('avatar')
+    if unionid and not user.unionid:
+        user.unionid = unionid
+        update_fields.append('unionid')
+    return update_fields
+
+def wx_user_defaults(openid, nickname, avatar):
+    return {
+        'username': openid,
+        'nickname': nickname or f"微信用户_{openid[-4:]}",
+        'avatar': avatar or getattr(settings, 'DEFAULT_AVATAR_URL', ''),
+        # 'unionid': unionid
+    }
+
+def login_payload(user, request):
+    tokens = generate_jwt_token_for_user(user)
+    return {
+        'access': tokens['access'],
+        'refresh': tokens['refresh'],
+        'access_expires': tokens['access_expires'],
+        'user': UserSerializer(user, context={'request': request}).data
+    }
+
 class WXLoginView(APIView):
     permission_classes = []  
 
+    def get_throttles(self):
+        # 登录前没有用户身份，按 IP 限流
+        return [SlidingWindowThrottle('login', by='ip')]
+
     def post(self, request, *args, **kwargs):
         code = request.data.get('code')
         if not code:
@@ -97,25 +141,13 @@ class WXLoginView(APIView):
         try:
             user, created = User.objects.get_or_create(
                 openid=openid,
-                defaults={
-                    'username': openid,
-                    'nickname': nickname_from_frontend or f"微信用户_{openid[-4:]}",
-                    'avatar': avatar_from_frontend or settings.DEFAULT_AVATAR_URL,
-                    # 'unionid': unionid
-                }
+                defaults=wx_user_defaults(openid, nickname_from_frontend, avatar_from_frontend)
             )
 
             if not created:
-                update_fields = []
-                if nickname_from_frontend and not user.nickname:
-                    user.nickname = nickname_from_frontend
-                    update_fields.append('nickname')
-                if avatar_from_frontend and not user.avatar:
-                    user.avatar = avatar_from_frontend
-                    update_fields.append('avatar')
-                if unionid and not user.unionid:
-                    user.unionid = unionid
-                    update_fields.append('unionid')
+                update_fields = fill_missing_profile(
+                    user, nickname_from_frontend, avatar_from_frontend, unionid
+                )
                 if update_fields:
                     user.save(update_fields=update_fields)
 
@@ -125,15 +157,71 @@ class WXLoginView(APIView):
             logger.error(f"User account creation/login failed: {str(e)}")
             return Response({'error': f'User account processing failed: {str(e)}'}, status=500)
 
-        tokens = generate_jwt_token_for_user(user)
-        user_data = UserSerializer(user, context={'request': request}).data
+        return Response(login_payload(user, request), status=200)
 
-        return Response({
-            'access': tokens['access'],
-            'refresh': tokens['refresh'],
-            'access_expires': tokens['access_expires'],
-            'user': user_data
-        }, status=200)
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncWXLoginView(View):
+    """
+    WXLoginView 的异步版本，请求与响应格式相同。
+    等待微信接口期间不占用 worker 线程，需部署在 ASGI 服务器上才能发挥作用。
+    """
+    async def post(self, request, *args, **kwargs):
+        try:
+            if request.content_type == 'application/json':
+                data = json.loads(request.body or b'{}')
+            else:
+                data = request.POST
+        except ValueError:
+            return JsonResponse({'error': 'Invalid JSON body.'}, status=400)
+
+        throttle = SlidingWindowThrottle('login', by='ip')
+        if not await sync_to_async(throttle.allow_request)(request, self):
+            response = JsonResponse({'detail': 'Request was throttled.'}, status=429)
+            response['Retry-After'] = str(int(throttle.wait()) + 1)
+            return response
+
+        code = data.get('code')
+        if not code:
+            return JsonResponse({'error': 'Code is required.'}, status=400)
+
+        try:
+            async with wechat.async_client(isinstance(request, ASGIRequest)) as client:
+                wx_data = await client.code2session(code)
+        except AuthenticationFailed as e:
+            return JsonResponse({'detail': str(e.detail)}, status=e.status_code)
+        openid = wx_data.get('openid')
+        unionid = wx_data.get('unionid')
+
+        if not openid:
+            return JsonResponse({
+                'error': wx_data.get('errmsg', '未获取到openid'),
+                'detail': wx_data
+            }, status=400, json_dumps_params={'ensure_ascii': False})
+
+        nickname_from_frontend = data.get('nickName')
+        avatar_from_frontend = data.get('avatarUrl')
+
+        try:
+            user, created = await User.objects.aget_or_create(
+                openid=openid,
+                defaults=wx_user_defaults(openid, nickname_from_frontend, avatar_from_frontend)
+            )
+            if not created:
+                update_fields = fill_missing_profile(
+                    user, nickname_from_frontend, avatar_from_frontend, unionid
+                )
+                if update_fields:
+                    await user.asave(update_fields=update_fields)
+
+            logger.info(f"User {user.id} login via WeChat (async): openid={openid}")
+
+        except Exception as e:
+            logger.error(f"User account creation/login failed: {str(e)}")
+            return JsonResponse({'error': f'User account processing failed: {str(e)}'}, status=500)
+
+        # 签发 token（写缓存）和序列化用户都是同步代码，放到线程中执行，不阻塞事件循环
+        payload = await sync_to_async(login_payload)(user, request)
+        return JsonResponse(payload, status=200, json_dumps_params={'ensure_ascii': False})
 
 # 当前用户信息接口
 class MeView(APIView):
@@ -144,7 +232,10 @@ class MeView(APIView):
         data = UserSerializer(user, context={'request': request}).data
         return Response(data, status=200)
 
-class BaseViewSet(viewsets.ModelViewSet):
+class BaseViewSet(ProfilingMixin, ReplicaReadMixin, EagerLoadingMixin, viewsets.ModelViewSet):
+    # action -> 限流 scope，速率见 REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']
+    throttle_scopes = {}
+
     def get_permissions(self):
         # DEBUG 时绕过所有权限，直接放行
         if settings.DEBUG:
@@ -152,6 +243,12 @@ class BaseViewSet(viewsets.ModelViewSet):
         # 否则走正常逻辑
         return super().get_permissions()
 
+    def get_throttles(self):
+        scope = self.throttle_scopes.get(self.action)
+        if scope:
+            return [SlidingWindowThrottle(scope)]
+        return super().get_throttles()
+
 class UserViewSet(BaseViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
@@ -178,6 +275,7 @@ class UserViewSet(BaseViewSet):
 
 class CategoryViewSet(BaseViewSet):
     queryset = Category.objects.all()
+    read_from_replica = True
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     filter_backends = [filters.SearchFilter]
@@ -190,6 +288,7 @@ class CategoryViewSet(BaseViewSet):
 
 class TagViewSet(BaseViewSet):
     queryset = Tag.objects.all()
+    read_from_replica = True
     serializer_class = TagSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     filter_backends = [filters.SearchFilter]
@@ -202,11 +301,14 @@ class TagViewSet(BaseViewSet):
 
 class PostViewSet(BaseViewSet):
     serializer_class = PostSerializer
+    # 匿名浏览为主的读接口，安全方法走只读副本
+    read_from_replica = True
     # permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['title', 'content']
     ordering_fields = ['created_at', 'updated_at']
     ordering = ['-created_at']
+    throttle_scopes = {'create': 'post', 'like': 'toggle', 'favorite': 'toggle'}
 
     def get_permissions(self):
         if self.action in ['like', 'favorite']:
@@ -236,7 +338,8 @@ class PostViewSet(BaseViewSet):
     def perform_create(self, serializer):
         if not self.request.user.is_authenticated:
             raise permissions.NotAuthenticated()
-        serializer.save(author=self.request.user)
+        post = serializer.save(author=self.request.user)
+        notify_mentions(post.content, target=post, actor=post.author, is_anonymous=post.is_anonymous)
 
     def perform_update(self, serializer):
         serializer.save()  # Don't update author on update
@@ -246,7 +349,7 @@ class PostViewSet(BaseViewSet):
         post = self.get_object()
         post_content_type = ContentType.objects.get_for_model(Post)
         action, created = Action.objects.get_or_create(
-            user=request.user,
+            user_id=request.user.id,
             content_type=post_content_type,
             object_id=post.id,
             action_type='like'
@@ -256,9 +359,10 @@ class PostViewSet(BaseViewSet):
             liked = False
         else:
             liked = True
-        
-        # Refresh post to get updated counts
-        post.refresh_from_db()
+            if post.author_id:
+                notify(post.author, 'like', target=post, actor=request.user)
+
+        # 帖子序列化结果不含计数，直接复用 get_object() 预加载的作者和标签
         serializer = self.get_serializer(post)
         return Response({
             'status': 'unliked' if not liked else 'liked',
@@ -270,7 +374,7 @@ class PostViewSet(BaseViewSet):
         post = self.get_object()
         post_content_type = ContentType.objects.get_for_model(Post)
         action, created = Action.objects.get_or_create(
-            user=request.user,
+            user_id=request.user.id,
             content_type=post_content_type,
             object_id=post.id,
             action_type='favorite'
@@ -280,9 +384,8 @@ class PostViewSet(BaseViewSet):
             favorited = False
         else:
             favorited = True
-        
-        # Refresh post to get updated counts
-        post.refresh_from_db()
+
+        # 帖子序列化结果不含计数，直接复用 get_object() 预加载的作者和标签
         serializer = self.get_serializer(post)
         return Response({
             'status': 'unfavorited' if not favorited else 'favorited',
@@ -305,20 +408,31 @@ class PostViewSet(BaseViewSet):
 
 class CommentViewSet(BaseViewSet):
     serializer_class = CommentSerializer
+    read_from_replica = True
     # permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
     filter_backends = [filters.OrderingFilter]
     ordering_fields = ['created_at']
     ordering = ['-created_at']
+    throttle_scopes = {'create': 'comment'}
 
     def get_queryset(self):
         return Comment.objects.filter(post_id=self.kwargs['post_pk'])
 
     def perform_create(self, serializer):
         post = get_object_or_404(Post, pk=self.kwargs['post_pk'])
-        serializer.save(
+        comment = serializer.save(
             author=self.request.user,
             post=post
         )
+        # 回复通知被回复的评论作者，其余通知帖子作者；同一帖子的评论通知会被聚合
+        if comment.parent_id:
+            notify(comment.parent.author, 'reply', target=comment,
+                   actor=comment.author, is_anonymous=comment.is_anonymous)
+        elif post.author_id:
+            notify(post.author, 'comment', target=post,
+                   actor=comment.author, is_anonymous=comment.is_anonymous)
+        notify_mentions(comment.content, target=comment,
+                        actor=comment.author, is_anonymous=comment.is_anonymous)
 
     def perform_update(self, serializer):
         serializer.save()  # Don't update author on update
@@ -341,7 +455,7 @@ class ActionViewSet(BaseViewSet):
     http_method_names = ['get', 'post']  # Only allow GET and POST
 
     def get_queryset(self):
-        return Action.objects.filter(user=self.request.user)
+        return Action.objects.filter(user_id=self.request.user.id)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -358,7 +472,7 @@ class ConversationViewSet(BaseViewSet):
     ordering = ['-updated_at']
 
     def get_queryset(self):
-        return Conversation.objects.filter(participants=self.request.user)
+        return Conversation.objects.filter(participants__id=self.request.user.id)
 
     def perform_create(self, serializer):
         # Get participant IDs from request data
@@ -398,7 +512,7 @@ class ConversationViewSet(BaseViewSet):
         conversation = self.get_object()
         PrivateMessage.objects.filter(
             conversation=conversation,
-            receiver=request.user,
+            receiver_id=request.user.id,
             is_read=False
         ).update(is_read=True)
         return Response({'status': 'all messages marked as read'})
@@ -409,10 +523,11 @@ class PrivateMessageViewSet(BaseViewSet):
     filter_backends = [filters.OrderingFilter]
     ordering_fields = ['sent_at']
     ordering = ['-sent_at']
+    throttle_scopes = {'create': 'message'}
 
     def get_queryset(self):
         return PrivateMessage.objects.filter(
-            Q(sender=self.request.user) | Q(receiver=self.request.user),
+            Q(sender_id=self.request.user.id) | Q(receiver_id=self.request.user.id),
             conversation_id=self.kwargs['conversation_pk']
         )
 
@@ -420,7 +535,7 @@ class PrivateMessageViewSet(BaseViewSet):
         conversation = get_object_or_404(
             Conversation,
             pk=self.kwargs['conversation_pk'],
-            participants=self.request.user
+            participants__id=self.request.user.id
         )
         receiver_id = self.request.data.get('receiver')
         if not receiver_id:
@@ -445,7 +560,7 @@ class PrivateMessageViewSet(BaseViewSet):
     @action(detail=True, methods=['post'])
     def mark_as_read(self, request, pk=None, conversation_pk=None):
         message = self.get_object()
-        if message.receiver == request.user:
+        if message.receiver_id == request.user.id:
             message.is_read = True
             message.save()
             return Response({'status': 'marked as read'})
@@ -460,37 +575,265 @@ class NotificationViewSet(BaseViewSet):
     filter_backends = [filters.OrderingFilter]
     ordering_fields = ['created_at']
     ordering = ['-created_at']
-    http_method_names = ['get', 'post', 'delete']  # Only allow GET, POST, and DELETE
+    http_method_names = ['get', 'post', 'patch', 'delete']
+    page_size = 20
+    max_page_size = 100
 
     def get_queryset(self):
-        return Notification.objects.filter(recipient=self.request.user)
+        return Notification.objects.filter(recipient_id=self.request.user.id)
+
+    def list(self, request, *args, **kwargs):
+        # 个人通知与系统公告在读取时按时间合并，公告不为每个用户落库；按游标分页。
+        # 带 cursor 或 page_size 参数（首页可传空的 cursor=）时返回 {'next', 'results'}；
+        # 不带时保持旧客户端使用的数组格式，最多 max_page_size 条，下一页地址放在 Link 头中
+        paginated = 'cursor' in request.query_params or 'page_size' in request.query_params
+        try:
+            cursor = request.query_params.get('cursor')
+            cursor = decode_cursor(cursor) if cursor else None
+            default = self.page_size if paginated else self.max_page_size
+            limit = max(1, min(int(request.query_params.get('page_size', default)), self.max_page_size))
+        except ValueError:
+            raise NotFound("Invalid cursor or page size.")
+        newest_first = request.query_params.get('ordering', '-created_at') != 'created_at'
+        items, next_cursor = notification_page(
+            request.user, self.filter_queryset(self.get_queryset()), cursor, limit, newest_first
+        )
+
+        watermark = NotificationCounter.for_user(request.user.id).broadcast_watermark
+        broadcast_context = {**self.get_serializer_context(), 'broadcast_watermark': watermark}
+        results = [
+            BroadcastSerializer(item, context=broadcast_context).data if isinstance(item, Broadcast)
+            else self.get_serializer(item).data
+            for item in items
+        ]
+        next_url = None
+        if next_cursor:
+            next_url = replace_query_param(request.build_absolute_uri(), 'cursor', next_cursor)
+        if not paginated:
+            headers = {'Link': f'<{next_url}>; rel="next"'} if next_url else None
+            return Response(results, headers=headers)
+        return Response({'next': next_url, 'results': results})
+
+    @action(detail=False, methods=['get'], url_path='unread-count')
+    def unread_count(self, request):
+        return Response({'unread_count': unread_total(request.user)})
 
     @action(detail=False, methods=['post'])
     def mark_all_as_read(self, request):
-        self.get_queryset().update(is_read=True)
+        # 按实际更新的行数扣减，避免覆盖并发新增的未读通知
+        updated = self.get_queryset().filter(is_read=False).update(is_read=True)
+        NotificationCounter.decr(request.user.id, updated)
+        mark_broadcasts_read(request.user)
         return Response({'status': 'all marked as read'})
 
+    @action(detail=False, methods=['post'])
+    def mark_broadcasts_as_read(self, request):
+        upto = request.data.get('broadcast_id')
+        try:
+            # 接受列表中的 "b:<id>"，也兼容纯数字
+            upto = int(str(upto).removeprefix('b:')) if upto is not None else None
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'broadcast_id must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        mark_broadcasts_read(request.user, upto)
+        return Response({'status': 'broadcasts marked as read'})
+
     @action(detail=True, methods=['post'])
     def mark_as_read(self, request, pk=None):
         notification = self.get_object()
-        notification.is_read = True
-        notification.save()
+        updated = Notification.objects.filter(pk=notification.pk, is_read=False).update(is_read=True)
+        NotificationCounter.decr(request.user.id, updated)
         return Response({'status': 'marked as read'})
 
+    def perform_update(self, serializer):
+        # is_read 与 mark_as_read 一样用条件更新，按实际变化的行数调整未读计数
+        is_read = serializer.validated_data.pop('is_read', None)
+        notification = serializer.save()
+        if is_read is None:
+            return
+        updated = Notification.objects.filter(
+            pk=notification.pk, is_read=not is_read
+        ).update(is_read=is_read)
+        if is_read:
+            NotificationCounter.decr(notification.recipient_id, updated)
+        elif updated:
+            NotificationCounter.incr(notification.recipient_id, updated)
+        notification.is_read = is_read
+
+    def perform_destroy(self, instance):
+        was_unread = not instance.is_read
+        instance.delete()
+        if was_unread:
+            NotificationCounter.decr(instance.recipient_id)
+
     def get_permissions(self):
         # 所有通知操作：必须登录（注册用户）
         return [permissions.IsAuthenticated(), IsRegistered()]
 
+def upload_status(instance):
+    """
+    上传接口和进度查询返回的内容。原图在后台处理完成后会被删除，
+    处理完成（processed_at 有值）之前不返回图片地址，客户端用 id 轮询进度。
+    """
+    processed = instance.processed_at is not None
+    return {
+        'id': instance.id,
+        'status': instance.status,
+        'processed_at': instance.processed_at,
+        'image_url': instance.image.url if processed else None,
+        'thumbnail_url': instance.thumbnail.url if processed and instance.thumbnail else None,
+    }
+
 class UploadStudentIDView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, *args, **kwargs):
+        # 在解析请求体之前安装，上传过程中边接收边计算哈希
+        dedup.install_hashing_handler(request)
         serializer = StudentIDUploadSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
-            instance = serializer.save()
-            return Response({
-                'id': instance.id,
-                'image_url': instance.image.url,
-                'status': instance.status
-            }, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+            image = serializer.validated_data['image']
+            # 原图已落盘，压缩和缩略图交给后台线程，接口立即返回；重复内容直接复用已有结果
+            instance = create_upload(
+                request.user, image, dedup.upload_digest(request, 'image', image)
+            )
+            return Response(upload_status(instance), status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+class StudentIDUploadDetailView(APIView):
+    """
+    查询自己的学生证上传的处理进度，处理完成后返回最终图片地址。
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        instance = get_object_or_404(StudentIDUpload, pk=pk, user_id=request.user.id)
+        return Response(upload_status(instance))
+
+class ReviewQueuePagination(CursorPagination):
+    # 先进先出；游标分页不需要 COUNT，翻页时也不会因为前面的记录被审核掉而跳过数据
+    ordering = ('uploaded_at', 'id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+class VerificationReviewViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    管理员的学生证审核队列：默认列出待审核的上传（?status= 可查看其它状态），
+    decide 批量通过/拒绝。
+    """
+    serializer_class = VerificationReviewSerializer
+    permission_classes = [permissions.IsAdminUser]
+    pagination_class = ReviewQueuePagination
+
+    def get_queryset(self):
+        queryset = StudentIDUpload.objects.select_related('user')
+        if self.action == 'list':
+            queryset = queryset.filter(status=self.request.query_params.get('status', 'pending'))
+        return queryset
+
+    @action(detail=False, methods=['post'])
+    def decide(self, request):
+        serializer = VerificationDecisionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        result = review_uploads(data['approve'], data['reject'], data['review_note'])
+        return Response(result)
+
+class ProfileDownloadView(APIView):
+    """
+    下载 core.profiling 保存的 pstats 文件，id 来自响应头 X-Profile-Id 或日志。
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, profile_id):
+        path = profile_path(profile_id)
+        if path is None or not path.exists():
+            return Response({'detail': "Profile not found."}, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(path.open('rb'), as_attachment=True, filename=path.name)
+
+class StudentIDPresignView(APIView):
+    """
+    申请学生证图片直传对象存储的预签名地址，图片不再经过 Django worker。
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        if not direct_upload.is_available():
+            return Response(
+                {'detail': "Direct upload is not available, use upload-idcard instead."},
+                status=status.HTTP_501_NOT_IMPLEMENTED,
+            )
+        serializer = DirectUploadRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(direct_upload.presign(request.user, **serializer.validated_data))
+
+class StudentIDUploadCompleteView(APIView):
+    """
+    直传完成后的回调：校验对象大小和类型，创建 StudentIDUpload。
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        if not direct_upload.is_available():
+            return Response(
+                {'detail': "Direct upload is not available, use upload-idcard instead."},
+                status=status.HTTP_501_NOT_IMPLEMENTED,
+            )
+        serializer = DirectUploadCompleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        instance, created = direct_upload.complete(
+            request.user, serializer.validated_data['upload_token']
+        )
+        return Response(
+            upload_status(instance),
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+
+class SendEmailCodeView(APIView):
+    """
+    发送邮箱认证验证码，邮件由后台队列发送，接口立即返回。
+    """
+    permission_classes = [IsAuthenticatedUnverified]
+
+    def get_throttles(self):
+        return [SlidingWindowThrottle('email_send')]
+
+    def post(self, request, *args, **kwargs):
+        serializer = EmailCodeRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            send_email_code(request.user, serializer.validated_data['email'])
+        except queue.Full:
+            logger.error("Mail queue is full, email code not sent")
+            return Response(
+                {'error': '发送繁忙，请稍后重试'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        return Response({'status': 'code sent'}, status=status.HTTP_202_ACCEPTED)
+
+class VerifyEmailCodeView(APIView):
+    permission_classes = [IsAuthenticatedUnverified]
+
+    def get_throttles(self):
+        # 限制猜测验证码的次数
+        return [SlidingWindowThrottle('email_verify')]
+
+    def post(self, request, *args, **kwargs):
+        serializer = EmailCodeVerifySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if not verify_email_code(
+            request.user,
+            serializer.validated_data['email'],
+            serializer.validated_data['code'],
+        ):
+            return Response(
+                {'error': '验证码错误或已过期'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response({
+            'status': 'verified',
+            'user': UserSerializer(request.user, context={'request': request}).data
+        })
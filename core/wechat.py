@@ -0,0 +1,330 @@
+"""
+微信 jscode2session 客户端。
+
+进程内共享一个 requests.Session 连接池（异步视图使用 httpx.AsyncClient），避免每次登录都重新握手；
+js_code 只能使用一次，已经发出的请求不能重放，因此只在建立连接失败和微信明确返回系统繁忙时
+按指数退避重试，所有尝试加上退避不超过 deadline 秒。连续失败后由熔断器直接拒绝请求，
+调用耗时和错误计数记录在 core.metrics 的 Prometheus 指标中，随 /metrics 导出。
+"""
+import asyncio
+import logging
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager
+
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from rest_framework.exceptions import AuthenticationFailed
+from urllib3.exceptions import NewConnectionError
+
+from .metrics import WECHAT_ERRORS, WECHAT_LATENCY
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_API_BASE = "https://api.weixin.qq.com"
+# 微信返回 -1 表示系统繁忙、请求未被处理，可以重试
+BUSY_ERRCODE = -1
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+class CallFailed(Exception):
+    def __init__(self, kind, message):
+        super().__init__(message)
+        self.kind = kind
+        self.message = message
+
+
+def _connect_failed(exc):
+    """
+    requests 异常是否发生在建立连接阶段（请求尚未发出）。
+    """
+    if isinstance(exc, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(exc.args[0], 'reason', None) if exc.args else None
+    return isinstance(exc, requests.exceptions.ConnectionError) and isinstance(reason, NewConnectionError)
+
+
+class CircuitBreaker:
+    """
+    连续失败 failure_threshold 次后熔断 reset_timeout 秒；
+    之后放行一个探测请求，成功则恢复，失败则继续熔断。
+    """
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return
+            raise CircuitOpen()
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self.state = self.CLOSED
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class WeChatClient:
+    def __init__(self, appid, secret, api_base=DEFAULT_API_BASE, pool_size=20,
+                 timeout=(3.05, 5), retries=2, backoff=0.2, deadline=5,
+                 failure_threshold=5, reset_timeout=30):
+        self.appid = appid
+        self.secret = secret
+        self.api_base = api_base.rstrip('/')
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.deadline = deadline
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+        # 重试由 code2session 自己控制，适配器不做任何重试
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            appid=getattr(settings, 'WECHAT_APP_ID', None),
+            secret=getattr(settings, 'WECHAT_APP_SECRET', None),
+            api_base=getattr(settings, 'WECHAT_API_BASE', DEFAULT_API_BASE),
+            pool_size=getattr(settings, 'WECHAT_HTTP_POOL_SIZE', 20),
+            timeout=getattr(settings, 'WECHAT_HTTP_TIMEOUT', (3.05, 5)),
+            retries=getattr(settings, 'WECHAT_HTTP_RETRIES', 2),
+            deadline=getattr(settings, 'WECHAT_HTTP_DEADLINE', 5),
+            failure_threshold=getattr(settings, 'WECHAT_BREAKER_THRESHOLD', 5),
+            reset_timeout=getattr(settings, 'WECHAT_BREAKER_RESET', 30),
+        )
+
+    @property
+    def url(self):
+        return f"{self.api_base}/sns/jscode2session"
+
+    def params(self, code):
+        return {
+            'appid': self.appid,
+            'secret': self.secret,
+            'js_code': code,
+            'grant_type': 'authorization_code'
+        }
+
+    def check_breaker(self):
+        try:
+            self.breaker.before_call()
+        except CircuitOpen:
+            WECHAT_ERRORS.labels('circuit_open').inc()
+            raise AuthenticationFailed("微信服务暂时不可用，请稍后重试")
+
+    def delay_before(self, attempt, started):
+        """
+        第 attempt 次尝试前的退避秒数；剩余时间不够再试一次时返回 None。
+        """
+        delay = self.backoff * (2 ** (attempt - 1)) if attempt else 0
+        return delay if self.deadline - (time.monotonic() - started) > delay else None
+
+    def attempt_timeout(self, started):
+        """
+        本次尝试的 (连接, 读取) 超时，不超过剩余的 deadline。
+        """
+        remaining = self.deadline - (time.monotonic() - started)
+        connect, read = self.timeout
+        return min(connect, remaining), min(read, remaining)
+
+    def code2session(self, code):
+        """
+        用小程序登录 code 换取 openid / session_key，返回微信原始 JSON。
+        网络错误、5xx 或熔断时抛出 AuthenticationFailed。
+        """
+        self.check_breaker()
+        started = time.monotonic()
+        outcome = 'unexpected'
+        try:
+            data = self._fetch(code, started)
+            outcome = 'busy' if data.get('errcode') == BUSY_ERRCODE else 'ok'
+            return data
+        except CallFailed as e:
+            outcome = e.kind
+            raise AuthenticationFailed(e.message)
+        finally:
+            # 任何异常都要记录结果，否则半开状态的探测请求结束后熔断器不会离开半开状态
+            self.record(outcome, started)
+
+    def _fetch(self, code, started):
+        data = error = None
+        for attempt in range(self.retries + 1):
+            delay = self.delay_before(attempt, started)
+            if delay is None:
+                break
+            time.sleep(delay)
+            try:
+                resp = self.session.get(
+                    self.url, params=self.params(code), timeout=self.attempt_timeout(started)
+                )
+            except requests.exceptions.RequestException as e:
+                timed_out = isinstance(e, requests.exceptions.Timeout)
+                error = CallFailed(
+                    'timeout' if timed_out else 'request',
+                    "请求微信超时" if timed_out else f"请求微信失败：{str(e)}",
+                )
+                if _connect_failed(e):
+                    continue
+                raise error
+            try:
+                resp.raise_for_status()
+                data = resp.json()
+            except (requests.exceptions.RequestException, ValueError) as e:
+                raise CallFailed('request', f"请求微信失败：{str(e)}")
+            if data.get('errcode') != BUSY_ERRCODE:
+                return data
+        if data is not None:
+            return data
+        raise error
+
+    def record(self, outcome, started):
+        if outcome == 'ok':
+            self.breaker.record_success()
+            WECHAT_LATENCY.labels('ok').observe(time.monotonic() - started)
+            return
+        self.breaker.record_failure()
+        WECHAT_ERRORS.labels(outcome).inc()
+        WECHAT_LATENCY.labels('error').observe(time.monotonic() - started)
+        logger.warning(f"WeChat jscode2session failed: {outcome}")
+
+
+class AsyncWeChatClient:
+    """
+    WeChatClient 的异步版本，供 AsyncWXLoginView 使用。
+    与同步客户端共用配置、熔断器和指标；httpx.AsyncClient 绑定在创建它的事件循环上。
+    """
+    def __init__(self, sync_client):
+        self.sync_client = sync_client
+        connect, read = sync_client.timeout
+        self.http = httpx.AsyncClient(
+            timeout=httpx.Timeout(read, connect=connect),
+            limits=httpx.Limits(
+                max_connections=sync_client.pool_size,
+                max_keepalive_connections=sync_client.pool_size,
+            ),
+        )
+
+    async def aclose(self):
+        await self.http.aclose()
+
+    async def code2session(self, code):
+        client = self.sync_client
+        client.check_breaker()
+        started = time.monotonic()
+        outcome = 'unexpected'
+        try:
+            data = await self._fetch(code, started)
+            outcome = 'busy' if data.get('errcode') == BUSY_ERRCODE else 'ok'
+            return data
+        except CallFailed as e:
+            outcome = e.kind
+            raise AuthenticationFailed(e.message)
+        finally:
+            client.record(outcome, started)
+
+    async def _fetch(self, code, started):
+        client = self.sync_client
+        data = error = None
+        for attempt in range(client.retries + 1):
+            delay = client.delay_before(attempt, started)
+            if delay is None:
+                break
+            await asyncio.sleep(delay)
+            connect, read = client.attempt_timeout(started)
+            try:
+                resp = await self.http.get(
+                    client.url, params=client.params(code), timeout=httpx.Timeout(read, connect=connect)
+                )
+            # 连接阶段失败时请求尚未发出，可以重试
+            except httpx.ConnectTimeout:
+                error = CallFailed('timeout', "请求微信超时")
+                continue
+            except httpx.ConnectError as e:
+                error = CallFailed('request', f"请求微信失败：{str(e)}")
+                continue
+            except httpx.TimeoutException:
+                raise CallFailed('timeout', "请求微信超时")
+            except httpx.HTTPError as e:
+                raise CallFailed('request', f"请求微信失败：{str(e)}")
+            try:
+                resp.raise_for_status()
+                data = resp.json()
+            except (httpx.HTTPError, ValueError) as e:
+                raise CallFailed('request', f"请求微信失败：{str(e)}")
+            if data.get('errcode') != BUSY_ERRCODE:
+                return data
+        if data is not None:
+            return data
+        raise error
+
+
+_client = None
+_client_lock = threading.Lock()
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_client():
+    """
+    进程内共享的客户端；fork 之后各 worker 在首次使用时各自创建连接池。
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = WeChatClient.from_settings()
+    return _client
+
+
+@asynccontextmanager
+async def async_client(long_lived):
+    """
+    异步视图使用的客户端。long_lived（ASGI，事件循环与进程同寿命）时复用当前循环上的客户端；
+    WSGI 下运行异步视图时每个请求都有一个临时事件循环，客户端用完即关闭，不遗留连接。
+    """
+    if not long_lived:
+        client = AsyncWeChatClient(get_client())
+        try:
+            yield client
+        finally:
+            await client.aclose()
+        return
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = AsyncWeChatClient(get_client())
+    yield client
+
+
+def reset_client():
+    global _client
+    with _client_lock:
+        _client = None
+        _async_clients.clear()
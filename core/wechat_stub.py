@@ -0,0 +1,95 @@
+"""
+本地 jscode2session 替身服务，用于离线压测登录接口和测试 WeChatClient。
+
+openid 由 code 确定性生成，同一个 code 总是映射到同一个用户；
+可配置固定延迟、错误率和接下来若干次返回"系统繁忙"来模拟微信侧的抖动。
+"""
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def fake_session(code):
+    digest = hashlib.sha1(code.encode()).hexdigest()
+    return {
+        'openid': f"stub_{digest[:24]}",
+        'session_key': digest[24:40],
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # 头部和正文分两次写出，关闭 Nagle 避免与延迟 ACK 叠加出 40ms 的额外等待
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != '/sns/jscode2session':
+            self._send(404, {'errcode': 404, 'errmsg': 'not found'})
+            return
+
+        busy = self.server.take_request()
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if self.server.error_rate and random.random() < self.server.error_rate:
+            self._send(503, {'errcode': -1, 'errmsg': 'system busy'})
+            return
+        if busy:
+            self._send(200, {'errcode': -1, 'errmsg': 'system busy'})
+            return
+
+        code = parse_qs(url.query).get('js_code', [''])[0]
+        if not code or code.startswith('invalid'):
+            self._send(200, {'errcode': 40029, 'errmsg': 'invalid code'})
+            return
+        self._send(200, fake_session(code))
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, error_rate=0.0, verbose=False):
+        super().__init__((host, port), StubHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.verbose = verbose
+        self.requests = 0
+        self.busy_responses = 0
+        self._lock = threading.Lock()
+
+    def take_request(self):
+        """
+        统计请求数，返回本次是否应答系统繁忙（busy_responses 次数用完为止）。
+        """
+        with self._lock:
+            self.requests += 1
+            if self.busy_responses > 0:
+                self.busy_responses -= 1
+                return True
+            return False
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start_in_thread(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
@@ -31,6 +31,15 @@ SECRET_KEY = os.getenv('SECRET_KEY')
 
 WECHAT_APP_ID = os.getenv('WECHAT_APP_ID')
 WECHAT_APP_SECRET = os.getenv('WECHAT_APP_SECRET')
+# 本地压测时指向 wechat_stub_server，例如 http://127.0.0.1:8765
+WECHAT_API_BASE = os.getenv('WECHAT_API_BASE', 'https://api.weixin.qq.com')
+WECHAT_HTTP_POOL_SIZE = int(os.getenv('WECHAT_HTTP_POOL_SIZE', 20))
+WECHAT_HTTP_TIMEOUT = (3.05, 5)  # (连接, 读取) 秒
+# 只重试连接失败和微信返回的系统繁忙，js_code 已发出的请求不会重放
+WECHAT_HTTP_RETRIES = 2
+WECHAT_HTTP_DEADLINE = 5  # 一次登录中所有尝试加上退避的总时长上限（秒）
+WECHAT_BREAKER_THRESHOLD = 5  # 连续失败多少次后熔断
+WECHAT_BREAKER_RESET = 30  # 熔断持续秒数
 
 ALLOWED_HOSTS = []
 
@@ -89,6 +98,8 @@ AWS_S3_CLIENT_CONFIG = BotocoreConfig(
 AWS_S3_FILE_OVERWRITE = True
 AWS_DEFAULT_ACL = None  # This is usually handled by the custom storage classes' default_acl
 AWS_QUERYSTRING_AUTH = True
+# MediaStorage 在该时间窗口（秒）内复用预签名 URL，见 core.storages.SignedURLCacheMixin
+MEDIA_URL_CACHE_WINDOW = 1800
 
 # STORAGES = {
 #     "default": {
@@ -137,6 +148,9 @@ INTERNAL_IPS = [
 ]
 
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
+    'core.slowlog.SlowQueryMiddleware',
+    'core.routers.ReplicaRoutingMiddleware',
     "debug_toolbar.middleware.DebugToolbarMiddleware",
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -175,9 +189,76 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
+    # 只读副本：开发和测试中用第二个 SQLite 文件代替，数据不会自动同步；
+    # 只有列在 DATABASE_REPLICAS 中才会被路由使用
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db_replica.sqlite3',
+        'TEST': {'NAME': BASE_DIR / 'test_db_replica.sqlite3'},
+    },
 }
 
+# 读写分离（core.routers）：安全方法的读请求发往这些副本；用户写入后 REPLICA_STICKY_SECONDS 秒内读主库
+# 粘滞标记放在缓存中，配置了副本时必须设置 REDIS_URL，否则启动时报错
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+DATABASE_REPLICAS = []
+REPLICA_STICKY_SECONDS = 5
+
+# 缓存：JWT 中权限声明的版本号、限流计数等需要在 worker 之间共享的状态放在这里。
+# 多进程/多机部署必须设置 REDIS_URL 使用共享缓存；未设置时为进程内缓存，只适合开发和测试。
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+# token 版本号的缓存秒数：撤销认证/权限后，所有 worker 最迟这么久之后按数据库最新状态认证
+TOKEN_VERSION_CACHE_TIMEOUT = 60
+
+# 生产数据库（DB_PROFILE=production）：PostgreSQL，默认用 psycopg 3 自带的连接池，
+# 每个进程维护 DB_POOL_MIN_SIZE ~ DB_POOL_MAX_SIZE 个连接，请求之间复用；
+# 前面已有 PgBouncer 等外部连接池时设 DB_POOL=false，改用持久连接（CONN_MAX_AGE）。
+# Django 不允许连接池与持久连接同时开启。两种方式都开启健康检查，取出连接时先确认可用。
+# 每请求的建连开销可用 python manage.py bench_db_connections 对比。
+if os.getenv('DB_PROFILE') == 'production':
+    DB_POOL = os.getenv('DB_POOL', 'true').lower() == 'true'
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('POSTGRES_DB', 'huijia'),
+            'USER': os.getenv('POSTGRES_USER', 'huijia'),
+            'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+            'HOST': os.getenv('POSTGRES_HOST', 'localhost'),
+            'PORT': os.getenv('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': 0 if DB_POOL else int(os.getenv('DB_CONN_MAX_AGE', 600)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', 5)),
+                **({'pool': {
+                    'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+                    'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+                    # 等待空闲连接的最长秒数，超时抛出 PoolTimeout
+                    'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+                    # 空闲超过 max_idle 秒的连接关闭（不低于 min_size），连接最长使用 max_lifetime 秒
+                    'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', 300)),
+                    'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', 1800)),
+                }} if DB_POOL else {}),
+            },
+        }
+    }
+    # 只读副本：POSTGRES_REPLICA_HOSTS=host1,host2，连接参数与主库相同
+    for i, host in enumerate(h.strip() for h in os.getenv('POSTGRES_REPLICA_HOSTS', '').split(',') if h.strip()):
+        DATABASES[f'replica_{i}'] = {**DATABASES['default'], 'HOST': host}
+    DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -224,10 +305,26 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.PrincipalJWTAuthentication',
     ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # 各 scope 的限流速率，见 core.throttling；登录按 IP，其余按用户
+    'DEFAULT_THROTTLE_RATES': {
+        'login': '30/min',
+        'post': '30/hour',
+        'comment': '120/hour',
+        'toggle': '300/min',
+        'message': '120/min',
+        'email_send': '5/hour',
+        'email_verify': '20/hour',
+    },
+    # 按 IP 限流时信任的反向代理层数：0 表示只用 REMOTE_ADDR（忽略客户端可伪造的 X-Forwarded-For），
+    # 部署在一层 nginx/负载均衡之后设为 1
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', 0)),
 }
+# 限流计数存储：'cache' 为 CACHES['default']（设置 REDIS_URL 时多进程共享，否则每个进程各自计数），
+# 'local' 为进程内存储
+THROTTLE_BACKEND = 'cache'
 # 开发模式下，为了调试方便，一律允许匿名访问
 if DEBUG:
     REST_FRAMEWORK['DEFAULT_PERMISSION_CLASSES'] = [
@@ -254,8 +351,67 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': False,
     'BLACKLIST_AFTER_ROTATION': True,
+    'TOKEN_OBTAIN_SERIALIZER': 'core.authentication.PrincipalTokenObtainPairSerializer',
+}
+
+# 通知聚合：窗口内对同一目标的点赞/评论合并为一条通知
+NOTIFICATION_AGGREGATE_TYPES = ('like', 'comment')
+NOTIFICATION_AGGREGATION_WINDOW = timedelta(hours=24)
+# @ 提及昵称索引的整体重建周期（秒）
+MENTION_INDEX_TTL = 600
+
+# 数据保留策略，由 prune_expired_data 命令执行；None 表示永久保留
+DATA_RETENTION = {
+    'notification_read': timedelta(days=90),
+    'notification_max': timedelta(days=365),
+    'message_both_deleted': timedelta(days=30),
+    'message_max': None,
+    'email_code': timedelta(hours=1),
 }
 
+# 邮箱认证
+EMAIL_CODE_TTL = timedelta(minutes=10)
+# 允许用于认证的学校邮箱域名，为空表示不限制
+VERIFICATION_EMAIL_DOMAINS = [
+    d.strip() for d in os.getenv('VERIFICATION_EMAIL_DOMAINS', '').split(',') if d.strip()
+]
+# 邮件由 core.mailqueue 后台线程发送；开发环境打印到控制台
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'noreply@huijia.local')
+EMAIL_QUEUE_EAGER = False
+
+# 学生证图片后台处理（core.imaging）
+STUDENT_ID_MAX_DIMENSION = 2048
+STUDENT_ID_THUMBNAIL_SIZE = 400
+STUDENT_ID_JPEG_QUALITY = 85
+IMAGE_PROCESSING_WORKERS = int(os.getenv('IMAGE_PROCESSING_WORKERS', 2))
+IMAGE_PROCESSING_EAGER = False
+
+# 学生证图片直传对象存储（core.direct_upload）：大小上限和预签名地址有效期（秒）
+DIRECT_UPLOAD_MAX_SIZE = 10 * 1024 * 1024
+DIRECT_UPLOAD_EXPIRES = 600
+
+# Prometheus 指标（core.metrics）：抓取 /metrics 需带 Authorization: Bearer <METRICS_TOKEN>，
+# 或来源地址（REMOTE_ADDR，经反向代理时是代理的地址）在 METRICS_ALLOWED_IPS 中，都未配置时拒绝访问；
+# 多进程部署另需设置环境变量 PROMETHEUS_MULTIPROC_DIR
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.getenv('METRICS_ALLOWED_IPS', '').split(',') if ip.strip()]
+
+# bench_api 的结果文件（JSON Lines），每次运行追加一行，便于对比
+BENCHMARK_RESULTS_PATH = BASE_DIR / 'benchmarks' / 'results.jsonl'
+
+# 请求性能分析（core.profiling）：管理员带 X-Profile 头的请求，以及按比例抽样的请求
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+PROFILING_DIR = BASE_DIR / 'profiles'
+PROFILING_MAX_FILES = int(os.getenv('PROFILING_MAX_FILES', 200))
+
+# 慢查询日志（core.slowlog）：超过该耗时（毫秒）的查询按指纹聚合到 SlowQuery，None 表示关闭；
+# 环境变量设为空或 off 时关闭
+SLOW_QUERY_THRESHOLD_MS = os.getenv('SLOW_QUERY_THRESHOLD_MS', '200').strip()
+SLOW_QUERY_THRESHOLD_MS = (
+    None if SLOW_QUERY_THRESHOLD_MS.lower() in ('', 'off') else float(SLOW_QUERY_THRESHOLD_MS)
+)
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,